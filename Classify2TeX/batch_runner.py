@@ -0,0 +1,201 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+import contextlib
+import argparse
+import html
+import json
+import os
+import time
+import traceback
+import pandas as pd
+
+
+def _start_worker(n_threads):
+    '''
+    Runs in every worker process before its first dataset: limits the threads of the numerical libraries (OpenMP of XGBoost
+    and scikit-learn, BLAS) to the share of the core budget of one worker. The environment variables are read by the libraries
+    loaded later (Classify2TeX is imported by the first job), threadpoolctl limits the ones already loaded (numpy's BLAS).
+    '''
+    for variable in ['OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS']:
+        os.environ[variable] = str(n_threads)
+    from threadpoolctl import threadpool_limits
+    threadpool_limits(n_threads)
+
+
+def _run_dataset(entry, report):
+    '''
+    Runs Classify2TeX on one dataset of the batch (in a worker process) and returns its summary (a dict, see BatchRunner.run).
+    The output of the run is written to Results/<name>/run.log.
+    '''
+    start = time.perf_counter()
+    summary = {'dataset': entry['name'], 'path': entry['path'], 'target': entry['target'], 'status': 'ok'}
+    os.makedirs(f"Results/{entry['name']}", exist_ok=True)
+    with open(f"Results/{entry['name']}/run.log", 'w') as log, contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        try:
+            from .classify_2_tex import Classify2TeX  # imported in the worker, after its thread limits are set
+            dataframe = pd.read_csv(entry['path'])
+            summary.update({'rows': len(dataframe), 'columns': len(dataframe.columns) - 1})
+            classify = Classify2TeX(dataframe, entry['target'], dataset_name=entry['name'], **entry['settings'])
+            classify.perform_model_selection()
+
+            metric = classify.metric
+            scores = {model: params[metric].max() for model, params in
+                      [('XGBoost', classify.params_xgb), ('RandomForest', classify.params_rf), ('DecisionTree', classify.params_dt)]}
+            best_model = max(scores, key=scores.get)
+            summary.update({'metric': metric, 'best_model': best_model, 'best_score': scores[best_model]})
+            summary.update({f'{model}_{metric}': score for model, score in scores.items()})
+
+            if report:
+                result = classify.generate_report().result()  # None if the PDF did not change
+                summary['report'] = result.get('path', result.get('pdf')) if result is not None \
+                    else f"Results/{entry['name']}/report.pdf"
+        except Exception as exception:
+            traceback.print_exc()
+            summary['status'] = f'failed: {type(exception).__name__}: {exception}'
+    summary['wall_time_s'] = round(time.perf_counter() - start, 3)
+    return summary
+
+
+class BatchRunner:
+    '''
+    Runs Classify2TeX (preprocessing, tuning, XAI and the report) over several datasets in one pool of worker processes
+    sharing a core budget, and writes an index comparing the best models of the datasets (Results/index.csv and Results/index.html).
+
+    The manifest lists the datasets: a list of dicts, a DataFrame, or the path of a .csv or .json file with the same fields:
+    - path - the CSV file of the dataset,
+    - target - the name of the target column,
+    - name (optional) - the name of the dataset, used for Results/<name> (the file name without the extension by default),
+    - settings (optional) - the arguments of Classify2TeX, a dict (a JSON object in a .csv manifest).
+
+    The datasets run in max_parallel worker processes, started once and reused for the next datasets (the libraries are imported
+    once per worker), the largest datasets first so that the small ones fill the workers at the end. Every worker may use
+    n_jobs // max_parallel threads. The workers are started with spawn (their thread limits are set before the libraries start
+    their thread pools), so a script using BatchRunner must be guarded with if __name__ == '__main__'.
+    The figures of a dataset are rendered in its worker (figure_workers=0) and its SHAP values use the threads of the worker
+    (shap_workers=n_jobs // max_parallel) unless its settings say otherwise.
+    A failing dataset does not stop the batch, its status in the index is the error (the traceback is in Results/<name>/run.log).
+    '''
+    def __init__(self, manifest, n_jobs=None, max_parallel=None, report=True, index_path='Results/index'):
+        '''
+        Args:
+            - manifest - the datasets (see the class docstring)
+            - n_jobs - the core budget of the batch, the number of CPUs if None
+            - max_parallel - the number of datasets run at the same time, min(number of datasets, n_jobs) if None
+            - report - if True, the report of every dataset is generated
+            - index_path - the index is written to <index_path>.csv and <index_path>.html
+        '''
+        self.entries = self.read_manifest(manifest)
+        self.n_jobs = n_jobs if n_jobs is not None else os.cpu_count()
+        self.max_parallel = max_parallel if max_parallel is not None else max(1, min(len(self.entries), self.n_jobs))
+        self.report = report
+        self.index_path = index_path
+        self.index = None
+
+    @staticmethod
+    def read_manifest(manifest):
+        '''
+        Returns the entries of the manifest as a list of dicts with all the fields (name and settings filled in).
+        '''
+        if isinstance(manifest, str):
+            if manifest.endswith('.json'):
+                with open(manifest) as file:
+                    manifest = json.load(file)
+            else:
+                manifest = pd.read_csv(manifest)
+        if isinstance(manifest, pd.DataFrame):
+            manifest = [{key: value for key, value in row.items() if not pd.isna(value)} for row in manifest.to_dict('records')]
+
+        entries = []
+        for entry in manifest:
+            if 'path' not in entry or 'target' not in entry:
+                raise ValueError(f'Every dataset of the manifest needs a path and a target, got {entry}.')
+            settings = entry.get('settings', {})
+            if isinstance(settings, str):
+                settings = json.loads(settings)
+            entries.append({
+                'path': entry['path'],
+                'target': entry['target'],
+                'name': entry.get('name', os.path.splitext(os.path.basename(entry['path']))[0]),
+                'settings': {'figure_workers': 0, **settings},
+            })
+
+        names = [entry['name'] for entry in entries]
+        if len(set(names)) != len(names):
+            raise ValueError('The names of the datasets in the manifest should be unique.')
+        return entries
+
+    def run(self):
+        '''
+        Runs all the datasets and writes the index. Returns the index, a DataFrame with one row per dataset (in the order of
+        the manifest): the dataset, its path and target, the number of rows and features, the status, the metric,
+        the best model and its score, the best score of every model, the path of the report and the wall time.
+        '''
+        start = time.perf_counter()
+        n_threads = max(1, self.n_jobs // self.max_parallel)
+        order = sorted(range(len(self.entries)), key=lambda i: os.path.getsize(self.entries[i]['path']) if os.path.exists(self.entries[i]['path']) else 0,
+                       reverse=True)
+
+        summaries = [None] * len(self.entries)
+        with ProcessPoolExecutor(max_workers=self.max_parallel, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_start_worker, initargs=(n_threads,)) as executor:
+            # the SHAP workers of a dataset share the threads of its worker
+            futures = {executor.submit(_run_dataset, {**self.entries[i], 'settings': {'shap_workers': n_threads, **self.entries[i]['settings']}}, self.report): i
+                       for i in order}
+            for n_done, future in enumerate(as_completed(futures), start=1):
+                summary = future.result()
+                summaries[futures[future]] = summary
+                result = f"best: {summary['best_model']} {summary['metric']} {summary['best_score']:.4f}" if summary['status'] == 'ok' else summary['status']
+                print(f"[{n_done}/{len(self.entries)}] {summary['dataset']} finished in {summary['wall_time_s']:.1f} s ({result})")
+
+        self.index = pd.DataFrame(summaries)
+        self.write_index()
+        print(f'{len(self.entries)} datasets finished in {time.perf_counter() - start:.1f} s, the index is in {self.index_path}.csv and {self.index_path}.html')
+        return self.index
+
+    def write_index(self):
+        '''
+        Writes the index to <index_path>.csv and to <index_path>.html (a table with the links to the reports).
+        '''
+        directory = os.path.dirname(self.index_path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        self.index.to_csv(f'{self.index_path}.csv', index=False)
+
+        table = self.index.copy()
+        for column in table.columns:
+            if pd.api.types.is_float_dtype(table[column]):
+                table[column] = table[column].round(4)
+        table = table.astype(object).where(table.notna(), '').astype(str).applymap(html.escape)
+        if 'report' in table.columns:
+            links = [os.path.relpath(path, directory) if path != '' else '' for path in self.index['report'].fillna('')]
+            table['report'] = [f'<a href="{html.escape(link)}">{html.escape(link)}</a>' if link != '' else '' for link in links]
+        with open(f'{self.index_path}.html', 'w', encoding='utf-8') as file:
+            file.write('\n'.join([
+                '<!DOCTYPE html>',
+                '<html lang="en">',
+                '<head><meta charset="utf-8"><title>Classify2TeX batch</title><style>'
+                'body { font-family: sans-serif; margin: 2em; } table { border-collapse: collapse; } '
+                'th, td { border: 1px solid #999; padding: 3px 8px; text-align: center; }</style></head>',
+                f'<body>\n<h1>Classify2TeX batch</h1>\n<p>Best models of {len(self.index)} datasets, generated on {time.strftime("%Y-%m-%d %H:%M")}.</p>',
+                table.to_html(index=False, escape=False, border=0),
+                '</body>',
+                '</html>',
+            ]))
+
+
+def main():
+    '''
+    Command line entry point: python -m Classify2TeX.batch_runner manifest.csv [--n-jobs N] [--max-parallel N] [--no-report]
+    '''
+    parser = argparse.ArgumentParser(description='Runs Classify2TeX over the datasets of a manifest (.csv or .json) and writes an index of the best models.')
+    parser.add_argument('manifest', help='the manifest, with the fields path, target, name (optional) and settings (optional, JSON)')
+    parser.add_argument('--n-jobs', type=int, default=None, help='the core budget of the batch (the number of CPUs by default)')
+    parser.add_argument('--max-parallel', type=int, default=None, help='the number of datasets run at the same time')
+    parser.add_argument('--no-report', action='store_true', help='do not generate the reports')
+    parser.add_argument('--index', default='Results/index', help='the index is written to INDEX.csv and INDEX.html')
+    arguments = parser.parse_args()
+    BatchRunner(arguments.manifest, n_jobs=arguments.n_jobs, max_parallel=arguments.max_parallel,
+                report=not arguments.no_report, index_path=arguments.index).run()
+
+
+if __name__ == '__main__':
+    main()
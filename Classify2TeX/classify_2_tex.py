@@ -1,10 +1,14 @@
-from .optimization.optimizer_all_models import OptimizerAllModels
-from .preprocessing.data_preprocessor import DataPreprocessor
-from .report.report_generator import ReportGenerator
-from .xai.explain_decision_tree import ExplainDecisionTree
+# The preprocessing, the tuners, the report and the XAI (scikit-learn, XGBoost, SHAP, seaborn, dtreeviz...) are imported
+# by the methods using them, so importing Classify2TeX is fast (see benchmarks/import_time.py)
+from .preprocessing.preprocessing_cache import PreprocessingCache
+from .performance_profiler import PerformanceProfiler
+from .report.eda_statistics import EDAStatistics
+from .report.figure_renderer import FigureRenderer
 
 class Classify2TeX:
-    def __init__(self, dataframe, target_column_name, test_size=0.2, random_state=42, n_iter=[0, 0, 0], cv=5, n_repeats=1, metric = 'roc_auc'):
+    def __init__(self, dataframe, target_column_name, test_size=0.2, random_state=42, n_iter=[0, 0, 0], cv=5, n_repeats=1, metric = 'roc_auc', sparse_one_hot=False, native_categorical=False, balance_strategy='resample', dataset_name=None, use_cache=True, track_memory=False, performance_callback=None,
+                 feature_selection=None, feature_selection_top_k=None, feature_selection_threshold=0.99, figure_workers=2, report_top_k_trials=None, pdf_compiler=None, report_format='latex',
+                 shap_workers=None, tree_shap_time_budget=30, shap_background=None, shap_background_size=32, smote_n_jobs=None, smote_max_index_size=None):
         """
         Initialize the Auto2Class for automated binary classification model selection.
 
@@ -17,6 +21,49 @@ class Classify2TeX:
             cv: Number of cross-validation splits.
             n_repeats: Number of times to repeat cross-validation for stability.
             metric: The evaluation metric be optimized during model selection (default is 'roc_auc').
+            sparse_one_hot: If True, one-hot encoded columns are kept sparse and the scikit-learn models are trained on a sparse matrix,
+                XGBoost on the dense columns, as it reads the zeros missing from a sparse matrix as missing values (default is False).
+            native_categorical: If True, categorical columns are kept as category dtype and handled natively by XGBoost,
+                the scikit-learn models still get them one-hot or label encoded (default is False).
+            balance_strategy: How imbalanced classes are handled: 'resample' changes the rows (undersampling, oversampling or SMOTE),
+                'weights' keeps the rows and passes per-row sample weights to the models' fit (default is 'resample').
+            dataset_name: The name of the dataset, used for the Results/<dataset_name> folder (default is None, it can also be given to generate_report).
+            use_cache: If True and dataset_name is given, the preprocessed dataset is cached in Results/<dataset_name>/Preprocessing/cache
+                and reused while the data, the target and the preprocessing settings do not change (default is True).
+            track_memory: If True, the peak memory used by the preprocessing is measured with tracemalloc and reported,
+                it makes the preprocessing (not the model selection) slower, up to about two times (default is False).
+            performance_callback: A function called with a dict (stage, level, wall_time_s, cpu_time_s, peak_rss_mb) after every
+                stage of the pipeline, e.g. to export the metrics (default is None). All the records are returned by get_performance.
+            feature_selection: If set, the features are screened before the model selection and only the most important ones are
+                used by the tuners: 'xgboost' ranks them by the gain of a shallow XGBoost model, 'mutual_info' by the mutual
+                information with the target, both estimated on a sample of the rows (default is None, all the features are used).
+            feature_selection_top_k: The number of features kept by the screening (default is None, feature_selection_threshold is used).
+            feature_selection_threshold: The kept features cover this fraction of the total importance, if feature_selection_top_k
+                is not given (default is 0.99).
+            figure_workers: The number of worker processes rendering the figures of the report. If dataset_name is given, the EDA figures
+                are rendered while the models are tuned. 0 renders the figures in the main process (default is 2).
+            report_top_k_trials: The number of the best trials (by metric) of every model shown in the tables of the report,
+                all the trials are saved in the CSV files linked from the report (default is None, all the trials are shown).
+            pdf_compiler: A PDFCompiler: generate_report then writes the .tex, starts the compilation of the PDF in the background and returns
+                without waiting for it. One PDFCompiler(max_workers=...) can be shared by the Classify2TeX instances of several datasets,
+                it limits how many PDFs are compiled at the same time (default is None, generate_report waits for the PDF).
+            report_format: 'latex' writes the LaTeX report and compiles it to PDF, 'html' writes a self-contained HTML report
+                (report.html, with the figures embedded), which needs no LaTeX toolchain (default is 'latex').
+            shap_workers: The number of worker processes computing the SHAP values of the best Random Forest and Decision Tree models
+                for the report, the trees and the rows are split between them, and the permutation importance of the best models,
+                the features are split between them (default is None, a worker per CPU). The permutation importance workers are spawned,
+                so with more than one worker a script must be guarded with if __name__ == '__main__'.
+            tree_shap_time_budget: The Random Forest and Decision Tree models are explained on a seeded sample of the rows,
+                as many as the SHAP workers explain in about this many seconds, or on all the rows if they fit (default is 30).
+            shap_background: If 'kmeans' (weighted centroids) or 'stratified' (weighted representative rows of every class), the SHAP values
+                of the best XGBoost model are computed against the rows summarized into shap_background_size weighted points
+                (interventional TreeSHAP), and the report compares the accuracy and the time of the summarized backgrounds
+                (default is None, the path-dependent values computed by the booster, without a background).
+            shap_background_size: The number of points of the summarized SHAP background (default is 32).
+            smote_n_jobs: The number of parallel jobs of the SMOTE neighbor search, used for extremely imbalanced classes
+                (default is None, one job; -1 uses all the processors).
+            smote_max_index_size: If set, SMOTE searches the nearest neighbors (exactly) among a seeded random subset of at most this many
+                minority rows instead of the whole minority class, so its cost stops growing quadratically with the class (default is None).
         """
         self.dataframe = dataframe
         self.target_column_name = target_column_name
@@ -26,6 +73,30 @@ class Classify2TeX:
         self.test_size = test_size
         self.random_state = random_state
         self.cv = cv
+        self.sparse_one_hot = sparse_one_hot
+        self.native_categorical = native_categorical
+        self.balance_strategy = balance_strategy
+        self.dataset_name = dataset_name
+        self.use_cache = use_cache
+        self.track_memory = track_memory
+        self.feature_selection = feature_selection
+        self.feature_selection_top_k = feature_selection_top_k
+        self.feature_selection_threshold = feature_selection_threshold
+        self.profiler = PerformanceProfiler(callback=performance_callback)  # time and memory of the stages
+        self.report_top_k_trials = report_top_k_trials
+        self.pdf_compiler = pdf_compiler
+        self.report_format = report_format
+        self.shap_workers = shap_workers
+        self.tree_shap_time_budget = tree_shap_time_budget
+        self.shap_background = shap_background
+        self.shap_background_size = shap_background_size
+        self.smote_n_jobs = smote_n_jobs
+        self.smote_max_index_size = smote_max_index_size
+        self.figure_renderer = FigureRenderer(n_jobs=figure_workers)  # renders the figures of the report in worker processes
+        self.eda_statistics = None
+        self.preprocessing_decisions = None
+        self.preprocessing_pipeline = None
+        self.optimizer = None
         self.params_rf = None
         self.params_dt = None
         self.params_xgb = None
@@ -36,6 +107,9 @@ class Classify2TeX:
         for i in self.n_iter:
             if i < 0:
                 raise ValueError("n_iter should be greater than or equal to 0.")
+
+        if self.shap_background not in [None, 'kmeans', 'stratified']:
+            raise ValueError("shap_background should be None, 'kmeans' or 'stratified'.")
         
 
     def perform_model_selection(self):
@@ -46,10 +120,21 @@ class Classify2TeX:
         This method preprocesses the data, performs model optimization, and stores the best 
         hyperparameters for each model.
         """
+        # The EDA figures depend only on the data, they are rendered in the background while the models are tuned
+        from .optimization.optimizer_all_models import OptimizerAllModels
+        from .report.report_generator import ReportGenerator
+
+        if self.dataset_name is not None:
+            with self.profiler.stage('EDA statistics'):
+                self.eda_statistics = EDAStatistics().fit(self.dataframe)
+            ReportGenerator.submit_eda_figures(self.figure_renderer, self.eda_statistics, self.dataset_name)
+
         # Preprocess the data
-        preprocessed_data = DataPreprocessor(self.dataframe, self.target_column_name).preprocess()
-        self.optimizer = OptimizerAllModels(preprocessed_data, self.random_state, self.n_iter, self.cv, self.n_repeats, self.metric)
-        self.optimizer.perform_analysis()
+        preprocessed_data, sample_weight = self.preprocess()
+        with self.profiler.stage('Model selection'):
+            self.optimizer = OptimizerAllModels(preprocessed_data, self.random_state, self.n_iter, self.cv, self.n_repeats, self.metric,
+                                                sample_weight=sample_weight, profiler=self.profiler)
+            self.optimizer.perform_analysis()
 
         # Store the best hyperparameters for each model after optimization
         self.params_rf = self.optimizer.params_rf
@@ -57,21 +142,115 @@ class Classify2TeX:
         self.params_xgb = self.optimizer.params_xgb
         return 
     
-    def generate_report(self, dataset_name):
+    def preprocess(self):
+        """
+        Preprocess the data, or load the preprocessed data from the cache if it was already preprocessed with the same settings.
+
+        Returns:
+            The preprocessed dataset (with the 'target' column) and the sample weights (None if the classes were not balanced with weights).
+        """
+        with self.profiler.stage('Preprocessing'):
+            return self._preprocess()
+
+    def _preprocess(self):
+        """
+        See preprocess, the work is done here so that preprocess can measure it as one stage.
+        """
+        from .preprocessing.data_preprocessor import DataPreprocessor
+        from .preprocessing.preprocessing_pipeline import PreprocessingPipeline
+
+        settings = {
+            'sparse_one_hot': self.sparse_one_hot,
+            'native_categorical': self.native_categorical,
+            'balance_strategy': self.balance_strategy,
+            'feature_selection': self.feature_selection,
+            'feature_selection_top_k': self.feature_selection_top_k,
+            'feature_selection_threshold': self.feature_selection_threshold,
+            'smote_n_jobs': self.smote_n_jobs,
+            'smote_max_index_size': self.smote_max_index_size,
+        }
+
+        cache, key = None, None
+        if self.use_cache and self.dataset_name is not None:
+            cache = PreprocessingCache(f'Results/{self.dataset_name}/Preprocessing/cache')
+            with self.profiler.stage('Cache lookup'):
+                key = cache.key(self.dataframe, self.target_column_name, settings)
+                cached = cache.load(key)
+            if cached is not None:
+                print(f'---------------Preprocessed dataset loaded from the cache ({key[:12]})---------------')
+                preprocessed_data, sample_weight, self.preprocessing_decisions = cached
+                self.preprocessing_pipeline = PreprocessingPipeline.from_decisions(self.preprocessing_decisions)
+                return preprocessed_data, sample_weight
+
+        preprocessor = DataPreprocessor(self.dataframe, self.target_column_name, track_memory=self.track_memory, profiler=self.profiler, **settings)
+        preprocessed_data = preprocessor.preprocess()
+        self.preprocessing_decisions = preprocessor.decisions
+        self.preprocessing_pipeline = PreprocessingPipeline.from_decisions(self.preprocessing_decisions)
+
+        if cache is not None:
+            with self.profiler.stage('Saving to the cache'):
+                cache.save(key, preprocessed_data, preprocessor.sample_weight, preprocessor.decisions)
+
+        return preprocessed_data, preprocessor.sample_weight
+
+    def generate_report(self, dataset_name=None):
         """
         Generate a report containing the results and information about dataeset.
+        Returns the Future of the PDF compilation: if pdf_compiler was given, the PDF is still being compiled in the background,
+        its result is a dict with the paths of the PDF and of the compiler's log and the compilation time (None if the PDF did not change).
+        With report_format='html' the Future is finished, its result is a dict with the path of report.html.
         """
+        dataset_name = dataset_name if dataset_name is not None else self.dataset_name
+        if dataset_name is None:
+            raise ValueError("dataset_name should be given, either here or when creating Classify2TeX.")
+
         if self.optimizer is None:
             raise ValueError("Model selection has not been performed. Please run perform_model_selection() first.")
+        from .report.report_generator import ReportGenerator
+        from .xai.tree_shap_engine import TreeSHAPEngine
+        from .xai.permutation_importance import PermutationImportance
 
-        self.report_generator = ReportGenerator(self.dataframe, dataset_name, self.optimizer)
-        self.report_generator.generate_report()
+        with self.profiler.stage('Report'):
+            self.report_generator = ReportGenerator(self.dataframe, dataset_name, self.optimizer, preprocessing_pipeline=self.preprocessing_pipeline,
+                                                    profiler=self.profiler, figure_renderer=self.figure_renderer, eda_statistics=self.eda_statistics,
+                                                    top_k_trials=self.report_top_k_trials, pdf_compiler=self.pdf_compiler,
+                                                    report_format=self.report_format, shap_engine=TreeSHAPEngine(n_jobs=self.shap_workers),
+                                                    tree_shap_time_budget=self.tree_shap_time_budget,
+                                                    permutation_importance=PermutationImportance(n_jobs=self.shap_workers, random_state=self.random_state),
+                                                    shap_background=self.shap_background, shap_background_size=self.shap_background_size)
+            try:
+                compilation = self.report_generator.generate_report()
+            finally:
+                self.figure_renderer.shutdown()  # the worker processes are not kept after the report
+        self.profiler.to_dataframe().to_csv(f'Results/{dataset_name}/pipeline_performance.csv', index=False)
 
-        print("Report generated successfully.")
-        return
+        print("Report generated successfully." if compilation.done() else "Report generated, the PDF is being compiled in the background.")
+        return compilation
     
-    def build_best_decision_tree(self):
-        print("Below you can see how the best Decision Tree model takes decisions on each node.")
-        explainer_dt = ExplainDecisionTree(self.optimizer.best_dt_instance)
-        tree = explainer_dt.build_tree(self.optimizer.X_train, self.optimizer.y_train)
-        return tree
\ No newline at end of file
+    def get_performance(self):
+        """
+        Returns the wall time, CPU time and peak RSS of every stage run so far (preprocessing handlers, tuners, report parts)
+        as a DataFrame, one row per stage. The same records are passed to performance_callback.
+        """
+        return self.profiler.to_dataframe()
+
+    def build_best_decision_tree(self, max_rows=5000, max_depth=4, dataset_name=None):
+        """
+        Draws the best Decision Tree model, the distributions in its nodes computed from a stratified sample of max_rows training rows
+        (and a row of every node shown), the nodes up to max_depth (all of them if None), and saves it to
+        Results/<dataset_name>/XAI/DecisionTree/decision_tree_depth_<max_depth>.svg. The drawing is reused while the tree,
+        the rows and the depth do not change. Returns the path of the SVG file (e.g. shown in a notebook with IPython.display.SVG(path)).
+        """
+        from .xai.explain_decision_tree import ExplainDecisionTree
+
+        dataset_name = dataset_name if dataset_name is not None else self.dataset_name
+        if dataset_name is None:
+            raise ValueError("dataset_name should be given, either here or when creating Classify2TeX.")
+        if self.optimizer is None:
+            raise ValueError("Model selection has not been performed. Please run perform_model_selection() first.")
+
+        explainer_dt = ExplainDecisionTree(self.optimizer.best_dt_instance, random_state=self.random_state)
+        with self.profiler.stage('Decision Tree visualization'):
+            path = explainer_dt.save_tree(self.optimizer.X_train_encoded, self.optimizer.y_train, dataset_name, max_rows=max_rows, max_depth=max_depth)
+        print(f"The best Decision Tree model, how it takes decisions on each node, is drawn in {path}.")
+        return path
\ No newline at end of file
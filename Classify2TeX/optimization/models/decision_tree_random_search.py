@@ -2,11 +2,12 @@ from sklearn.tree import DecisionTreeClassifier
 from sklearn.pipeline import Pipeline
 import pandas as pd
 from .optimization_algorithms.random_search_with_metrics import RandomSearchWithMetrics
+from ...preprocessing.feature_type_extractor import FeatureTypeExtractor
 from sklearn.metrics import f1_score, roc_auc_score, accuracy_score
 from sklearn.model_selection import train_test_split
 
 class DecisionTreeRandomSearch:
-    def __init__(self, dataset, n_iter=10, cv=5, random_state=42, n_repeats=2):
+    def __init__(self, dataset, n_iter=10, cv=5, random_state=42, n_repeats=2, sample_weight=None):
         """
         Initialize the DecisionTreeRandomSearch class.
 
@@ -16,11 +17,14 @@ class DecisionTreeRandomSearch:
             cv (int): Number of cross-validation splits.
             random_state (int): Random seed for reproducibility.
             n_repeats (int): Number of times to repeat cross-validation for stability.
+            sample_weight (np.ndarray or None): Per-row sample weights passed to fit, aligned with the rows of the dataset.
         """
         # Separate features (X) and target variable (y)
         self.X = dataset.drop(columns=['target'])  # Assumes 'target' is the column name for labels
+        self.X = FeatureTypeExtractor().to_model_input(self.X)  # sparse columns are passed to the model as a CSR matrix
         self.y = dataset['target']  # Target variable
         self.history = None  # Stores results of random search
+        self.sample_weight = sample_weight  # Per-row sample weights or None
         self.random_state = random_state  # Seed for reproducibility
 
         # Define a pipeline with a DecisionTreeClassifier (additional preprocessing steps can be added here)
@@ -49,7 +53,8 @@ class DecisionTreeRandomSearch:
             n_iter=n_iter,  # Number of search iterations
             cv=cv,  # Number of cross-validation splits
             random_state=random_state,  # Seed for reproducibility
-            n_repeats=n_repeats  # Stability through repeated cross-validation
+            n_repeats=n_repeats,  # Stability through repeated cross-validation
+            sample_weight=sample_weight  # Per-row sample weights
         )
 
         self.classifiers = []
@@ -79,12 +84,18 @@ class DecisionTreeRandomSearch:
         X_train, X_test, y_train, y_test = train_test_split(
             self.X, self.y, test_size=0.2, random_state=self.random_state, stratify=self.y
         )
+        # Split the sample weights in the same way (the same random_state and stratification give the same split)
+        weight_train = None
+        if self.sample_weight is not None:
+            weight_train, _ = train_test_split(
+                self.sample_weight, test_size=0.2, random_state=self.random_state, stratify=self.y
+            )
 
         # Initialize DecisionTreeClassifier with default parameters
         clf = DecisionTreeClassifier(random_state=self.random_state)
 
         # Train the model on the training set
-        clf.fit(X_train, y_train)
+        clf.fit(X_train, y_train, sample_weight=weight_train)
 
         # Make predictions on the test set
         y_pred = clf.predict(X_test)
@@ -5,7 +5,7 @@ import numpy as np
 import random
 
 class RandomSearchWithMetrics:
-    def __init__(self, pipeline, params, X, y, n_iter=10, cv=5, random_state=42, n_repeats=5):
+    def __init__(self, pipeline, params, X, y, n_iter=10, cv=5, random_state=42, n_repeats=5, feature_names=None, sample_weight=None):
         """
         Initialize the RandomSearchWithMetrics class.
 
@@ -18,6 +18,8 @@ class RandomSearchWithMetrics:
             cv: Number of cross-validation splits (default 5).
             random_state: Random seed for reproducibility (default 42).
             n_repeats: Number of times to repeat cross-validation for stability (default 5).
+            feature_names: Names of the features, set on the trained XGBoost boosters when X is a sparse matrix (default None).
+            sample_weight: Per-row sample weights passed to the classifier's fit, in every fold and in the final fit (default None).
         """
         self.pipeline = pipeline
         self.params = params
@@ -29,6 +31,9 @@ class RandomSearchWithMetrics:
         self.n_repeats = n_repeats  # For repeated cross-validation to ensure stable metrics
         self.history = pd.DataFrame()  # In-memory storage for the results
         self.classifiers = []
+        self.feature_names = feature_names
+        # cross_val_predict splits the weights together with the rows of each fold
+        self.fit_params = {'clf__sample_weight': sample_weight} if sample_weight is not None else {}
 
     def generate_random_params(self):
         """
@@ -69,8 +74,8 @@ class RandomSearchWithMetrics:
                 kf = KFold(n_splits=self.cv, shuffle=True, random_state=self.random_state)
 
                 # Perform cross-validation predictions for both labels and probabilities
-                y_pred = cross_val_predict(self.pipeline, self.X, self.y, cv=kf, method='predict')
-                y_probabilities = cross_val_predict(self.pipeline, self.X, self.y, cv=kf, method='predict_proba')
+                y_pred = cross_val_predict(self.pipeline, self.X, self.y, cv=kf, method='predict', fit_params=self.fit_params)
+                y_probabilities = cross_val_predict(self.pipeline, self.X, self.y, cv=kf, method='predict_proba', fit_params=self.fit_params)
                 y_probabilities = y_probabilities[:, 1]  # Get probabilities for the positive class (binary classification)
 
                 # Calculate and append evaluation metrics for binary classification
@@ -79,7 +84,9 @@ class RandomSearchWithMetrics:
                 roc_aucs.append(roc_auc_score(self.y, y_probabilities))  # ROC AUC score
 
                 # Train the model on the entire dataset
-                self.pipeline.fit(self.X, self.y)
+                self.pipeline.fit(self.X, self.y, **self.fit_params)
+                if self.feature_names is not None and hasattr(self.pipeline.named_steps['clf'], 'get_booster'):
+                    self.pipeline.named_steps['clf'].get_booster().feature_names = self.feature_names
                 self.classifiers.append(self.pipeline.named_steps['clf'])  # Append the classifier to the list
 
             # Calculate average metrics across all repeats
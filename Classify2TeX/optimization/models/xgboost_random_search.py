@@ -1,14 +1,14 @@
-from xgboost import XGBClassifier
 from sklearn.pipeline import Pipeline
 import pandas as pd
 import numpy as np
 from sklearn.metrics import f1_score, roc_auc_score, accuracy_score
 from sklearn.model_selection import train_test_split
 from .optimization_algorithms.random_search_with_metrics import RandomSearchWithMetrics
+from ...preprocessing.feature_type_extractor import FeatureTypeExtractor
 
 
 class XGBoostRandomSearch:
-    def __init__(self, dataset, n_iter=10, cv=5, random_state=42, n_repeats=5):
+    def __init__(self, dataset, n_iter=10, cv=5, random_state=42, n_repeats=5, enable_categorical=False, sample_weight=None, tree_method=None):
         """
         Initialize the XGBoostRandomSearch class.
 
@@ -18,16 +18,31 @@ class XGBoostRandomSearch:
             cv: Number of cross-validation folds (int).
             random_state: Random seed for reproducibility (int).
             n_repeats: Number of times to repeat cross-validation for stability (int).
+            enable_categorical: If True, columns of category dtype are handled natively by XGBoost (uses tree_method='hist') (bool).
+            sample_weight: Per-row sample weights passed to fit, aligned with the rows of the dataset (array or None).
+            tree_method: The tree method of XGBoost, e.g. 'hist' to compare the encodings of the categorical features with the same
+                method; None keeps the default of XGBoost ('hist' if enable_categorical) (str or None).
         """
         # Extract features (X) and target (y) from the dataset
         self.y = dataset['target']  # Target variable
         self.X = dataset.drop(columns=['target']) 
+        self.feature_names = list(self.X.columns)  # the names of the features of the booster
+        # sparse columns are densified: XGBoost reads the zeros not stored in a CSR matrix as missing values, so a model trained
+        # on one would predict differently on the dense rows given to it by SHAP, the permutation importance and PreprocessingPipeline
+        self.X = FeatureTypeExtractor().to_dense(self.X)
         self.history = None  # Store results history
+        self.sample_weight = sample_weight  # Per-row sample weights or None
         self.random_state = random_state  # Random seed for reproducibility
 
-        # Define the pipeline: contains only the XGBoost classifier
+        # Native categorical support requires the histogram tree method
+        self.categorical_params = {'enable_categorical': True, 'tree_method': 'hist'} if enable_categorical else {}
+        if tree_method is not None:
+            self.categorical_params['tree_method'] = tree_method
+
+        # Define the pipeline: contains only the XGBoost classifier (xgboost is imported when a model is tuned, not with the package)
+        from xgboost import XGBClassifier
         self.pipeline = Pipeline([
-            ('clf', XGBClassifier(random_state=self.random_state, objective='binary:logistic'))  # Binary classification
+            ('clf', XGBClassifier(random_state=self.random_state, objective='binary:logistic', **self.categorical_params))  # Binary classification
         ])
 
         # Define the hyperparameter search space for XGBoost
@@ -53,7 +68,9 @@ class XGBoostRandomSearch:
             n_iter=n_iter,  # Number of random search iterations
             cv=cv,  # Cross-validation folds
             random_state=random_state,  # Random seed for reproducibility
-            n_repeats=n_repeats  # Repeated CV for stability
+            n_repeats=n_repeats,  # Repeated CV for stability
+            feature_names=self.feature_names,  # Feature names given to the trained boosters
+            sample_weight=sample_weight  # Per-row sample weights
         )
 
         self.classifiers = []
@@ -85,12 +102,20 @@ class XGBoostRandomSearch:
         X_train, X_test, y_train, y_test = train_test_split(
             self.X, self.y, test_size=0.2, random_state=self.random_state, stratify=self.y
         )
+        # Split the sample weights in the same way (the same random_state and stratification give the same split)
+        weight_train = None
+        if self.sample_weight is not None:
+            weight_train, _ = train_test_split(
+                self.sample_weight, test_size=0.2, random_state=self.random_state, stratify=self.y
+            )
         
         # Initialize the XGBoost classifier with default parameters
-        clf = XGBClassifier(random_state=42, objective='binary:logistic')
+        from xgboost import XGBClassifier
+        clf = XGBClassifier(random_state=42, objective='binary:logistic', **self.categorical_params)
 
         # Fit the classifier on the training data
-        clf.fit(X_train, y_train)
+        clf.fit(X_train, y_train, sample_weight=weight_train)
+        clf.get_booster().feature_names = self.feature_names
 
         # Make predictions on the test set
         y_pred = clf.predict(X_test)  # Predicted labels
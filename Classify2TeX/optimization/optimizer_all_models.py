@@ -3,10 +3,12 @@ from .models.xgboost_random_search import XGBoostRandomSearch
 from .models.decision_tree_random_search import DecisionTreeRandomSearch
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import roc_auc_score, accuracy_score, f1_score
+from ..preprocessing.feature_type_extractor import FeatureTypeExtractor
+from ..performance_profiler import PerformanceProfiler
 import pandas as pd
 
 class OptimizerAllModels:
-    def __init__(self, dataset, random_state=42, n_iter=[0, 0, 0], cv=5, n_repeats=1, metric_to_eval = 'roc_auc'):
+    def __init__(self, dataset, random_state=42, n_iter=[0, 0, 0], cv=5, n_repeats=1, metric_to_eval = 'roc_auc', sample_weight=None, profiler=None):
         """
         Initialize the Fit_all_models class.
 
@@ -18,6 +20,8 @@ class OptimizerAllModels:
             random_state: Random seed for reproducibility.
             n_repeats: Number of times to repeat cross-validation for stability.
             metric_to_eval: Metric according to which the evaluation will be performed, possible values (roc_auc, f1, accuracy)
+            sample_weight: Per-row sample weights passed to the models' fit (array aligned with the rows of the dataset), or None.
+            profiler: PerformanceProfiler recording the time and memory of the tuners (a new one if None).
         """
         self.dataset = dataset
         self.test_size = 0.2 # Default test size
@@ -26,13 +30,25 @@ class OptimizerAllModels:
         self.cv = cv
         self.n_repeats = n_repeats
         self.metric_to_eval = metric_to_eval # Metric according to which the evaluation will be performed
+        self.sample_weight = sample_weight # Per-row sample weights (class balancing without resampling)
+        self.profiler = profiler if profiler is not None else PerformanceProfiler()
 
         # Split the dataset into features (X) and target (y)
         self.y = dataset['target']  # Assumes 'target' column is the label
         self.X = dataset.drop(columns=['target']) # Drop the target column in the training set
 
-        self.X_train = self.X.copy()
-        self.y_train = self.y.copy()
+        # the models are trained on the whole dataset, the training data are not changed, so they are not copied
+        self.X_train = self.X
+        self.y_train = self.y
+
+        # Category columns are handled natively by XGBoost, the scikit-learn models get them encoded
+        feature_type_extractor = FeatureTypeExtractor()
+        self.enable_categorical = feature_type_extractor.has_category_columns(self.X)
+        if self.enable_categorical:
+            with self.profiler.stage('Encoding category features'):
+                self.X_train_encoded = feature_type_extractor.encode_category_dtype(self.X_train, sparse_one_hot=feature_type_extractor.has_sparse_columns(self.X_train))
+        else:
+            self.X_train_encoded = self.X_train
 
         # Placeholder for hyperparameters and their metrics for all models
 
@@ -57,44 +73,51 @@ class OptimizerAllModels:
             n_repeats: Number of times to repeat cross-validation for stability.
         """
 
-        # Use the DecisionTreeClassifierRandomSearch class
-        tuner_decision_tree = DecisionTreeRandomSearch(
-            dataset=pd.concat([self.X_train, self.y_train], axis=1),
-            n_iter=self.n_iter[0],
-            cv=self.cv,
-            random_state=self.random_state,
-            n_repeats=self.n_repeats
-        )
-
-        # Use the RandomForestRandomSearch class
-        tuner_rand_forest = RandomForestRandomSearch(
-            dataset=pd.concat([self.X_train, self.y_train], axis=1),
-            n_iter=self.n_iter[1],
-            cv = self.cv,
-            random_state=self.random_state,
-            n_repeats=self.n_repeats
-
-        )
-
-        # Use the XGBoostRandomSearch class
-        tuner_xgboost = XGBoostRandomSearch(
-            dataset=pd.concat([self.X_train, self.y_train], axis=1),
-            n_iter=self.n_iter[2],
-            cv = self.cv,
-            random_state=self.random_state,
-            n_repeats=self.n_repeats
-        )
-
-        # Perform hyperparameter optimization using RandomSearch
+        # Without category columns all the models get the dataset as it is, otherwise the scikit-learn ones get it encoded.
+        # The tuners are created one at a time, so only one of them holds its copy of the features at once.
+        dataset_encoded = pd.concat([self.X_train_encoded, self.y_train], axis=1) if self.enable_categorical else self.dataset
 
+        # Use the DecisionTreeClassifierRandomSearch class
         print("---Performing hyperparameter tuning for DecisionTreeClassifier...")
-        self.params_dt, self.all_clf_dt = tuner_decision_tree.get_results()
+        with self.profiler.stage('Decision Tree tuning'):
+            tuner_decision_tree = DecisionTreeRandomSearch(
+                dataset=dataset_encoded,
+                n_iter=self.n_iter[0],
+                cv=self.cv,
+                random_state=self.random_state,
+                n_repeats=self.n_repeats,
+                sample_weight=self.sample_weight
+            )
+            self.params_dt, self.all_clf_dt = tuner_decision_tree.get_results()
+        del tuner_decision_tree
 
+        # Use the RandomForestRandomSearch class
         print("---Performing hyperparameter tuning for RandomForestClassifier...")
-        self.params_rf, self.all_clf_rf = tuner_rand_forest.get_results()
+        with self.profiler.stage('Random Forest tuning'):
+            tuner_rand_forest = RandomForestRandomSearch(
+                dataset=dataset_encoded,
+                n_iter=self.n_iter[1],
+                cv = self.cv,
+                random_state=self.random_state,
+                n_repeats=self.n_repeats,
+                sample_weight=self.sample_weight
+            )
+            self.params_rf, self.all_clf_rf = tuner_rand_forest.get_results()
+        del tuner_rand_forest, dataset_encoded
 
+        # Use the XGBoostRandomSearch class
         print("---Performing hyperparameter tuning for XGBoostClassifier...")
-        self.params_xgb, self.all_clf_xgb = tuner_xgboost.get_results()
+        with self.profiler.stage('XGBoost tuning'):
+            tuner_xgboost = XGBoostRandomSearch(
+                dataset=self.dataset,
+                n_iter=self.n_iter[2],
+                cv = self.cv,
+                random_state=self.random_state,
+                n_repeats=self.n_repeats,
+                enable_categorical=self.enable_categorical,
+                sample_weight=self.sample_weight
+            )
+            self.params_xgb, self.all_clf_xgb = tuner_xgboost.get_results()
 
     def get_best_results(self):
         """
@@ -0,0 +1,104 @@
+from contextlib import contextmanager
+import pandas as pd
+import sys
+import time
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+class PerformanceProfiler:
+    '''
+    Records the wall time, the CPU time and the peak resident memory (RSS) of the stages of the pipeline
+    (preprocessing handlers, the tuners, SHAP, plots, pdflatex...).
+
+    Stages are measured with the stage context manager and can be nested, e.g. 'Preprocessing' > 'Handling missing values'.
+    On Linux the peak RSS of every stage is measured separately (the peak is reset at the start of the stage),
+    elsewhere it is the peak RSS of the process so far. The CPU time is the CPU time of this process (all its threads),
+    the work done in worker processes (n_jobs) is not included.
+    '''
+    def __init__(self, callback=None):
+        '''
+        Args:
+            - callback - a function called with the record (dict) of every finished stage, e.g. to export the metrics
+        '''
+        self.callback = callback
+        self.records = []  # one dict per finished stage, in the order in which the stages finished
+        self._stack = []  # the running stages, [name, peak RSS of its finished nested stages]
+        self._n_started = 0  # number of stages started so far
+
+    @contextmanager
+    def stage(self, name):
+        '''
+        Measures the code run inside the with block as the stage called name.
+        '''
+        if len(self._stack) > 0:
+            # the peak of the running stage is kept, before it is reset for the nested one
+            self._stack[-1][1] = max(self._stack[-1][1], self._peak_rss())
+        self._reset_peak_rss()
+        self._stack.append([name, 0])
+        path = ' > '.join(stage_name for stage_name, _ in self._stack)
+        start_order = self._n_started
+        self._n_started += 1
+
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall_time, cpu_time = time.perf_counter() - start_wall, time.process_time() - start_cpu
+            _, nested_peak = self._stack.pop()
+            peak = max(self._peak_rss(), nested_peak)
+            if len(self._stack) > 0:
+                self._stack[-1][1] = max(self._stack[-1][1], peak)
+
+            record = {
+                'stage': path,
+                'level': len(self._stack),
+                'wall_time_s': round(wall_time, 3),
+                'cpu_time_s': round(cpu_time, 3),
+                'peak_rss_mb': round(peak / 2**20, 1),
+            }
+            self.records.append({**record, 'start_order': start_order})
+            if self.callback is not None:
+                self.callback(record)
+
+    def to_dict(self):
+        '''
+        Returns the records as a dict: stage -> {level, wall_time_s, cpu_time_s, peak_rss_mb}.
+        '''
+        return {record['stage']: {key: value for key, value in record.items() if key not in ['stage', 'start_order']} for record in self.records}
+
+    def to_dataframe(self):
+        '''
+        Returns the records as a DataFrame, one row per stage, the stages ordered as they started.
+        '''
+        columns = ['stage', 'level', 'wall_time_s', 'cpu_time_s', 'peak_rss_mb']
+        records = sorted(self.records, key=lambda record: record['start_order'])
+        return pd.DataFrame(records, columns=columns)
+
+    def _reset_peak_rss(self):
+        '''
+        Resets the peak RSS of the process (Linux only), so the next reading is the peak of the new stage.
+        '''
+        try:
+            with open('/proc/self/clear_refs', 'w') as file:
+                file.write('5')
+        except OSError:
+            pass
+
+    def _peak_rss(self):
+        '''
+        Returns the peak RSS of the process in bytes, since the last reset if it is supported.
+        '''
+        try:
+            with open('/proc/self/status') as file:
+                for line in file:
+                    if line.startswith('VmHWM:'):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        if resource is None:
+            return float('nan')
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024  # bytes on macOS, kilobytes elsewhere
@@ -1,14 +1,27 @@
 from sklearn.utils import resample
-from imblearn.over_sampling import SMOTE
+from .smote_engine import SMOTEEngine
 import numpy as np
 import pandas as pd
 
 
 class ClassBalanceHandler:
-    def __init__(self):
+    def __init__(self, strategy='resample', n_jobs=None, smote_max_index_size=None):
         """
         A class that selects and applies a method to balance the data based on the number of observations in each class.
+
+        Args:
+            - strategy - 'resample' to balance the classes by resampling the rows (undersampling, oversampling or SMOTE),
+              'weights' to keep the rows as they are and compute per-row sample weights instead (stored in sample_weight).
+            - n_jobs - number of parallel jobs of the SMOTE neighbor search (None means 1, -1 means all processors)
+            - smote_max_index_size - if set, SMOTE searches the neighbors among a random subset of at most this many minority rows
         """
+        if strategy not in ['resample', 'weights']:
+            raise ValueError("strategy should be 'resample' or 'weights'.")
+        self.strategy = strategy
+        self.n_jobs = n_jobs
+        self.smote_max_index_size = smote_max_index_size
+        self.sample_weight = None  # per-row weights, set only by the 'weights' strategy
+        self.method = None  # the balancing method which was applied
 
     def fit_resample(self, X, y):
         """
@@ -29,70 +42,88 @@ class ClassBalanceHandler:
         if ratio <= 2:
             print("Data is already balanced. No resampling applied.")
             return X, y
+        elif self.strategy == 'weights':
+            print("Imbalance detected. Applying sample weights.")
+            self.method = 'sample weights'
+            return self._weights(X, y)
         elif total_samples > 500000:
             print("Large dataset detected. Applying undersampling.")
+            self.method = 'undersampling'
             return self._undersample(X, y)
         elif ratio > 10:
             print("Extreme imbalance detected. Applying SMOTE.")
+            self.method = 'SMOTE'
             return self._smote(X, y)
         else:
             print("Moderate imbalance detected. Applying oversampling.")
+            self.method = 'oversampling'
             return self._oversample(X, y)
 
+    def _weights(self, X, y):
+        """
+        Computes per-row sample weights inversely proportional to the class frequencies, the data is not changed.
+        Each class gets the same total weight, and the weights sum up to the number of rows.
+        """
+        class_counts = y.value_counts()
+        class_weights = len(y) / (len(class_counts) * class_counts)
+        self.sample_weight = y.map(class_weights).to_numpy(dtype=np.float64)
+
+        print(f'Class weights: {class_weights.round(4).to_dict()}')
+        return X, y
+
     def _oversample(self, X, y):
         """
         Oversamples the minority class to balance class distribution.
         """
-        data = pd.DataFrame(X)
-        data['target'] = y
-
-        # Separate majority and minority classes
+        # Positions of the majority and minority rows
         majority_class = y.value_counts().idxmax()
         minority_class = y.value_counts().idxmin()
 
-        majority_data = data[data['target'] == majority_class]
-        minority_data = data[data['target'] == minority_class]
+        majority_rows = np.flatnonzero((y == majority_class).to_numpy())
+        minority_rows = np.flatnonzero((y == minority_class).to_numpy())
 
         # Oversample the minority class
         minority_upsampled = resample(
-            minority_data,
+            minority_rows,
             replace=True,
-            n_samples=len(majority_data)
+            n_samples=len(majority_rows)
         )
 
-        # Combine majority and upsampled minority
-        balanced_data = pd.concat([majority_data, minority_upsampled])
-        return balanced_data.drop(columns=['target']), balanced_data['target']
+        # Combine majority and upsampled minority, the rows are taken from X only once
+        return self._take_rows(X, y, np.concatenate([majority_rows, minority_upsampled]))
 
     def _undersample(self, X, y):
         """
         Undersamples the majority class to balance class distribution.
         """
-        data = pd.DataFrame(X)
-        data['target'] = y
-
-        # Separate majority and minority classes
+        # Positions of the majority and minority rows
         majority_class = y.value_counts().idxmax()
         minority_class = y.value_counts().idxmin()
 
-        majority_data = data[data['target'] == majority_class]
-        minority_data = data[data['target'] == minority_class]
+        majority_rows = np.flatnonzero((y == majority_class).to_numpy())
+        minority_rows = np.flatnonzero((y == minority_class).to_numpy())
 
         # Undersample the majority class
         majority_downsampled = resample(
-            majority_data,
+            majority_rows,
             replace=False,
-            n_samples=len(minority_data)
+            n_samples=len(minority_rows)
         )
 
-        # Combine minority and downsampled majority
-        balanced_data = pd.concat([minority_data, majority_downsampled])
-        return balanced_data.drop(columns=['target']), balanced_data['target']
+        # Combine minority and downsampled majority, the rows are taken from X only once
+        return self._take_rows(X, y, np.concatenate([minority_rows, majority_downsampled]))
+
+    def _take_rows(self, X, y, rows):
+        """
+        Returns the rows of X and y at the given positions.
+        """
+        X_resampled = X.take(rows)
+        if not X_resampled.dtypes.equals(X.dtypes):
+            X_resampled = X_resampled.astype(X.dtypes.to_dict())  # pandas may widen the dtypes of sparse columns
+        return X_resampled, y.take(rows)
 
     def _smote(self, X, y):
         """
-        Applies SMOTE algorithm to generate synthetic samples.
+        Applies SMOTE algorithm to generate synthetic samples (see SMOTEEngine).
         """
-        smote = SMOTE()
-        X_resampled, y_resampled = smote.fit_resample(X, y)
-        return pd.DataFrame(X_resampled, columns=X.columns), pd.Series(y_resampled, name=y.name)
\ No newline at end of file
+        return SMOTEEngine(n_jobs=self.n_jobs, max_index_size=self.smote_max_index_size).fit_resample(X, y)
@@ -1,28 +1,144 @@
 import pandas as pd
 import numpy as np
+import scipy.sparse as sp
 
 class CorrelationFeaturesHandler:
-    def __init__(self, threshold=0.9):
+    def __init__(self, threshold=0.9, block_size=512, sample_size=None, random_state=42, copy=True):
         """
         This class removes highly correlated columns from the DataFrame.
 
+        The correlations are computed blockwise in float32, so the full p x p correlation matrix is never materialized.
+        Columns are checked from left to right and a column is removed if it is highly correlated with any column which was kept before it.
+        Sparse (pandas SparseDtype) columns stay sparse, they are not centered and their means are taken into account in the correlations.
+        Non-numerical columns (e.g. category dtype kept for XGBoost) are not checked and always kept.
+
         Args:
             - threshold - correlation threshold above which columns will be removed
+            - block_size - number of columns whose correlations are computed at once
+            - sample_size - if set and the dataset has more rows, the correlations are estimated on a random sample of this many rows
+            - random_state - random seed used for the row sample
+            - copy - if False, the correlated columns are dropped from the given dataset in place
         """
         self.threshold = threshold
+        self.block_size = block_size
+        self.sample_size = sample_size
+        self.random_state = random_state
+        self.copy = copy
+
+    def _centered_dense(self, dataset, positions):
+        """
+        Returns the centered float32 matrix of the dense columns at the given positions.
+        Missing values are replaced with the column mean, so they do not contribute to the correlations.
+        """
+        # filled column by column, so no temporary copy of the whole (mixed dtype) dataset is made
+        matrix = np.empty((len(dataset), len(positions)), dtype=np.float32, order='F')
+        for i, position in enumerate(positions):
+            matrix[:, i] = dataset.iloc[:, position].to_numpy()
+        matrix -= np.nanmean(matrix, axis=0)
+        np.nan_to_num(matrix, copy=False)
+        return matrix
+
+    def _standardized_matrix(self, dataset):
+        """
+        Returns the centered float32 matrix of the dense columns, the CSC matrix of the sparse columns (None if there are none),
+        the mask of the sparse columns, the means of the columns which were not centered (0 for the centered ones)
+        and the norms of the centered columns.
+        """
+        if self.sample_size is not None and len(dataset) > self.sample_size:
+            dataset = dataset.sample(self.sample_size, random_state=self.random_state)
+
+        is_sparse = np.array([isinstance(dtype, pd.SparseDtype) for dtype in dataset.dtypes], dtype=bool)
+        n_rows = len(dataset)
+
+        dense = self._centered_dense(dataset, np.flatnonzero(~is_sparse))
+        means = np.zeros(dataset.shape[1])
+        squares = np.zeros(dataset.shape[1])
+        squares[~is_sparse] = np.einsum('ij,ij->j', dense, dense, dtype=np.float64)
+
+        sparse = None
+        if is_sparse.any():
+            # the CSC arrays are assembled column by column, so they are copied only once
+            data, indices = [], []
+            for i in np.flatnonzero(is_sparse):
+                column = dataset.iloc[:, i].astype(pd.SparseDtype(np.float32, 0)).array
+                data.append(column.sp_values)
+                indices.append(column.sp_index.indices)
+                means[i] = column.sp_values.sum(dtype=np.float64) / n_rows
+                squares[i] = np.dot(column.sp_values, column.sp_values.astype(np.float64))
+            indptr = np.concatenate([[0], np.cumsum([len(values) for values in data])])
+            sparse = sp.csc_matrix((np.concatenate(data), np.concatenate(indices), indptr), shape=(n_rows, len(data)))
+
+        norms = np.sqrt(np.maximum(squares - n_rows * means ** 2, 0))
+        norms[norms == 0] = np.inf  # constant columns are not correlated with anything
+        return dense, sparse, is_sparse, means, norms
+
+    def _gram(self, dense, sparse, is_sparse, start, end):
+        """
+        Returns the dot products of the columns up to end with the columns start:end (in the order of the dataset).
+        The dense and the sparse columns are multiplied separately, so the dense columns are never converted to a sparse matrix.
+        """
+        # positions of the columns in the dense and the sparse matrix
+        dense_start, dense_end = np.count_nonzero(~is_sparse[:start]), np.count_nonzero(~is_sparse[:end])
+        dense_head, dense_block = dense[:, :dense_end], dense[:, dense_start:dense_end]
+        if sparse is None:
+            return dense_head.T @ dense_block
+
+        sparse_start, sparse_end = np.count_nonzero(is_sparse[:start]), np.count_nonzero(is_sparse[:end])
+        sparse_head = sparse if sparse_end == sparse.shape[1] else sparse[:, :sparse_end]
+        sparse_block = sparse_head if sparse_start == 0 else sparse[:, sparse_start:sparse_end]
+
+        # positions of the dense and the sparse columns in the result
+        head_dense, head_sparse = np.flatnonzero(~is_sparse[:end]), np.flatnonzero(is_sparse[:end])
+        block_dense, block_sparse = np.flatnonzero(~is_sparse[start:end]), np.flatnonzero(is_sparse[start:end])
+
+        gram = np.zeros((end, end - start))
+        gram[np.ix_(head_dense, block_dense)] = dense_head.T @ dense_block
+        if len(head_sparse) > 0 and len(block_dense) > 0:
+            gram[np.ix_(head_sparse, block_dense)] = sparse_head.T @ dense_block
+        if len(block_sparse) > 0:
+            gram[np.ix_(head_dense, block_sparse)] = (sparse_block.T @ dense_head).T
+            gram[np.ix_(head_sparse, block_sparse)] = (sparse_head.T @ sparse_block).toarray()
+        return gram
 
     def fit_transform(self, dataset):
         """
         Function returns a dataframe with highly correlated columns removed.
         """
-        corr_matrix = dataset.corr().abs()  # absolute correlation matrix
-        upper_triangle = np.triu(corr_matrix, k=1)  # upper triangle of the correlation matrix
-        to_drop = [dataset.columns[i] for i in range(len(dataset.columns))
-                   if any(upper_triangle[:, i] > self.threshold)]
+        numerical_columns = [feature for feature in dataset.columns if pd.api.types.is_numeric_dtype(dataset[feature])]
+        numerical = dataset if len(numerical_columns) == dataset.shape[1] else dataset[numerical_columns]  # no selection copy if possible
+        dense, sparse, is_sparse, means, norms = self._standardized_matrix(numerical)
+        n_rows, n_columns = len(dense), len(numerical_columns)
+        keep = np.ones(n_columns, dtype=bool)
+
+        for start in range(0, n_columns, self.block_size):
+            end = min(start + self.block_size, n_columns)
+
+            # absolute correlations of the block with all the columns up to the end of the block
+            corr = self._gram(dense, sparse, is_sparse, start, end)
+            if sparse is not None:
+                corr -= n_rows * np.outer(means[:end], means[start:end])
+            corr = np.abs(corr, out=corr)
+            corr /= norms[:end, None]
+            corr /= norms[None, start:end]
+
+            # columns of the block correlated with columns kept in the previous blocks
+            keep[start:end] = ~(corr[:start][keep[:start]] > self.threshold).any(axis=0)
+
+            # inside the block the decision depends on the columns kept so far, so it is taken column by column
+            inner = corr[start:end] > self.threshold
+            for i in range(end - start):
+                if keep[start + i]:
+                    keep[start + i + 1:end] &= ~inner[i, i + 1:]
+
+        to_drop = [feature for feature, kept in zip(numerical_columns, keep) if not kept]
 
         if len(to_drop) > 1:
           print(f'Due to high correlation with other columns, the columns: {to_drop} have been removed.')
         elif len(to_drop) == 1:
           print(f'Due to high correlation with other column, the column: {to_drop} have been removed.')
 
+        self.to_drop = to_drop
+        if not self.copy:
+            dataset.drop(to_drop, axis = 1, inplace=True)
+            return dataset
         return dataset.drop(to_drop, axis = 1)
@@ -4,7 +4,11 @@ from .outliers_handler import OutliersHandler
 from .feature_type_extractor import FeatureTypeExtractor
 from .correlated_features_handler import CorrelationFeaturesHandler
 from .class_balance_handler import ClassBalanceHandler
+from .dtype_compaction_handler import DtypeCompactionHandler
+from .feature_screening_handler import FeatureScreeningHandler
+from ..performance_profiler import PerformanceProfiler
 import warnings
+import tracemalloc
 
 
 class DataPreprocessor:
@@ -12,60 +16,166 @@ class DataPreprocessor:
     A class where the dataset is preprocessed.
     '''
 
-    def __init__(self, dataset, target_column_name):
-        # drop rows where target column is NaN
-        dataset = dataset.dropna(subset=[target_column_name])
-        # Check if target column has 2 unique values
-        if len(dataset[target_column_name].unique()) != 2:
+    def __init__(self, dataset, target_column_name, sparse_one_hot=False, native_categorical=False, balance_strategy='resample', track_memory=False, profiler=None,
+                 feature_selection=None, feature_selection_top_k=None, feature_selection_threshold=0.99, smote_n_jobs=None, smote_max_index_size=None):
+        # Check if target column has 2 unique values (rows where target column is NaN are dropped below)
+        if len(dataset[target_column_name].dropna().unique()) != 2:
             raise ValueError('Target column should have exactly 2 unique values')
-        self.dataset = dataset.copy()  # the whole dataset, with a target column
+
+        self.input_bytes = int(dataset.memory_usage(deep=True).sum())  # size of the input dataset
+        self.track_memory = track_memory  # if True, the peak memory of the preprocessing is measured with tracemalloc (slower)
+        self.peak_bytes = None  # memory allocated at the peak of the preprocessing, on top of the input, set if track_memory is True
+
+        # drop rows where target column is NaN, dropna returns a new frame, so the input dataset is never changed
+        dataset = dataset.dropna(subset=[target_column_name])
+        self.dataset = dataset  # the whole dataset, with a target column, owned by this class and changed in place
         self.target_column_name = target_column_name  # the name of the target column
+        self.sparse_one_hot = sparse_one_hot  # if True, one-hot encoded columns are kept sparse
+        self.native_categorical = native_categorical  # if True, categorical columns are kept as category dtype
+        self.balance_strategy = balance_strategy  # 'resample' or 'weights', see ClassBalanceHandler
+        self.feature_selection = feature_selection  # None, 'xgboost' or 'mutual_info', see FeatureScreeningHandler
+        self.feature_selection_top_k = feature_selection_top_k  # number of features kept by the screening, or None
+        self.feature_selection_threshold = feature_selection_threshold  # cumulative importance kept by the screening (if top_k is None)
+        self.smote_n_jobs = smote_n_jobs  # parallel jobs of the SMOTE neighbor search (None means 1, -1 means all processors)
+        self.smote_max_index_size = smote_max_index_size  # if set, SMOTE searches the neighbors among at most this many minority rows
+        self.sample_weight = None  # per-row sample weights, set if the classes are balanced with weights
+        self.decisions = None  # the preprocessing decisions (dropped columns, encodings, imputations...), set by preprocess
+        self.profiler = profiler if profiler is not None else PerformanceProfiler()  # records the time and memory of every stage
 
     def preprocess(self):
         '''
         Preprocess the dataset function.
         returns X and y
         '''
+        if not self.track_memory:
+            return self._preprocess()
+
+        # the tracing is stopped even if a stage fails, tracemalloc left on would slow down every later allocation of the process
+        was_tracing = tracemalloc.is_tracing()
+        if was_tracing:
+            tracemalloc.reset_peak()
+        else:
+            tracemalloc.start()
+        try:
+            preprocessed_data = self._preprocess()
+            self.peak_bytes = tracemalloc.get_traced_memory()[1]
+        finally:
+            if not was_tracing:
+                tracemalloc.stop()
+
+        self.decisions['memory']['peak_bytes'] = self.peak_bytes
+        print(f'Peak memory used by the preprocessing: {self.peak_bytes / 2**20:.1f} MB ({self.peak_bytes / self.input_bytes:.2f}x the input size)')
+        return preprocessed_data
+
+    def _preprocess(self):
+        '''
+        See preprocess, the work is done here so that preprocess can measure its memory.
+        '''
         warnings.filterwarnings("ignore")
 
         print('---------------Preprocessing the dataset-------------------')
+        feature_type_extractor = FeatureTypeExtractor()  # one instance, it records the applied encodings
 
         print('---------------Extracting Day, Month and Year--------------')
-        self.dataset = FeatureTypeExtractor().separate_datetime(self.dataset)
+        with self.profiler.stage('Extracting date and time'):
+            self.dataset = feature_type_extractor.separate_datetime(self.dataset)
 
         print('---------------Deleting redundant features-----------------')
-        self.dataset = RedundantFeaturesHandler(self.dataset).fit_transform()
+        with self.profiler.stage('Deleting redundant features'):
+            redundant_features_handler = RedundantFeaturesHandler(self.dataset, copy=False)
+            self.dataset = redundant_features_handler.fit_transform()
 
         print('---------------Handling missing values---------------------')
-        self.dataset = MissingValuesHandler(self.dataset).fit_transform()
+        with self.profiler.stage('Handling missing values'):
+            missing_values_handler = MissingValuesHandler(self.dataset, copy=False)
+            self.dataset = missing_values_handler.fit_transform()
 
         print('---------------Handling outliers----------------------------')
-        self.dataset = OutliersHandler(self.dataset).fit_transform()
+        with self.profiler.stage('Handling outliers'):
+            outliers_handler = OutliersHandler(self.dataset, copy=False)
+            self.dataset = outliers_handler.fit_transform()
 
         print('--------------- Encoding categorical features --------------')
-        self.dataset = FeatureTypeExtractor().encode_categorical(self.dataset, self.target_column_name)
+        with self.profiler.stage('Encoding categorical features'):
+            self.dataset = feature_type_extractor.encode_categorical(self.dataset, self.target_column_name, sparse_one_hot=self.sparse_one_hot, native_categorical=self.native_categorical)
 
         print('----------Transforming boolean features to int--------------')
-        self.dataset = FeatureTypeExtractor().bool_to_int(self.dataset)
+        with self.profiler.stage('Transforming boolean features'):
+            self.dataset = feature_type_extractor.bool_to_int(self.dataset)
 
         # print('---------------2. Min max scaling --------------------')
         # self.dataset = FeatureTypeExtractor().min_max_scale(self.dataset, self.target_column_name)
 
         print('--------------- Encode the target--------------------------')
-        self.dataset = FeatureTypeExtractor().encode_target(self.dataset, self.target_column_name)
+        with self.profiler.stage('Encoding the target'):
+            self.dataset = feature_type_extractor.encode_target(self.dataset, self.target_column_name)
 
-        X = self.dataset.drop(self.target_column_name, axis=1)
-        y = self.dataset[self.target_column_name]
+        print('--------------- Compacting data types ----------------------')
+        with self.profiler.stage('Compacting data types'):
+            self.dataset = DtypeCompactionHandler().fit_transform(self.dataset)
+
+        # the stages below work on the same frame, the target column is moved out of it instead of copying the features
+        y = self.dataset.pop(self.target_column_name)
+        X = self.dataset
 
         print('------------Removing highly correlated columns ------------')
-        X = CorrelationFeaturesHandler().fit_transform(X)
+        with self.profiler.stage('Removing correlated columns'):
+            correlation_features_handler = CorrelationFeaturesHandler(copy=False)
+            X = correlation_features_handler.fit_transform(X)
+
+        # the screening runs before the balancing, so the resampling works on the kept features only
+        feature_screening = None
+        if self.feature_selection is not None:
+            print('--------------- Screening features -------------------------')
+            with self.profiler.stage('Screening features'):
+                feature_screening_handler = FeatureScreeningHandler(method=self.feature_selection, top_k=self.feature_selection_top_k,
+                                                                    cumulative_importance=self.feature_selection_threshold, copy=False)
+                X = feature_screening_handler.fit_transform(X, y)
+            feature_screening = {
+                'method': self.feature_selection,
+                'top_k': self.feature_selection_top_k,
+                'threshold': self.feature_selection_threshold,
+                'importances': feature_screening_handler.importances.to_dict(),
+                'kept': feature_screening_handler.kept,
+                'dropped': feature_screening_handler.to_drop,
+            }
 
         print('--------------- Handling imbalanced classes----------------')
-        X, y = ClassBalanceHandler().fit_resample(X, y)
+        with self.profiler.stage('Handling imbalanced classes'):
+            class_balance_handler = ClassBalanceHandler(strategy=self.balance_strategy, n_jobs=self.smote_n_jobs, smote_max_index_size=self.smote_max_index_size)
+            X, y = class_balance_handler.fit_resample(X, y)
+            self.sample_weight = class_balance_handler.sample_weight
 
         print('--------------- Dataset preprocessing is done--------------')
-
-        preprocessed_data = X.copy()
+        output_bytes = int(X.memory_usage(deep=True).sum() + y.memory_usage(deep=True))
+        print(f'Input size: {self.input_bytes / 2**20:.1f} MB, preprocessed size: {output_bytes / 2**20:.1f} MB')
+
+        # Decisions taken during the preprocessing, they describe how to transform new data in the same way
+        self.decisions = {
+            'target_column_name': self.target_column_name,
+            'datetime_features': feature_type_extractor.datetime_features,
+            'redundant_features': sorted(redundant_features_handler.to_delete),
+            'fill_values': missing_values_handler.fill_values,
+            'new_data_fill_values': missing_values_handler.new_data_fill_values,
+            'outliers': outliers_handler.actions,
+            'outlier_replacements': outliers_handler.replacements,
+            'one_hot_features': feature_type_extractor.one_hot_features,
+            'label_features': feature_type_extractor.label_features,
+            'category_features': feature_type_extractor.category_features,
+            'sparse_one_hot': self.sparse_one_hot,
+            'bool_features': feature_type_extractor.bool_features,
+            'target_mapping': feature_type_extractor.target_mapping,
+            'correlated_features': correlation_features_handler.to_drop,
+            'feature_screening': feature_screening,
+            'class_balancing': class_balance_handler.method,
+            'columns': list(X.columns),
+            'dtypes': {feature: str(dtype) for feature, dtype in X.dtypes.items()},
+            'memory': {'input_bytes': self.input_bytes, 'output_bytes': output_bytes, 'peak_bytes': self.peak_bytes},
+        }
+
+        # X is not used anywhere else, so the target is added to it instead of copying it
+        preprocessed_data = X
         preprocessed_data['target'] = y
+        self.dataset = None  # the frame now belongs to the caller
 
         return preprocessed_data
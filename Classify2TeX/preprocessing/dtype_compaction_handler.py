@@ -0,0 +1,56 @@
+import pandas as pd
+import numpy as np
+
+
+class DtypeCompactionHandler:
+    '''
+    This class downcasts the numerical columns of the encoded dataset to the smallest safe types, to reduce the memory usage.
+    - boolean columns are stored as uint8,
+    - integer columns are stored as the smallest integer type (unsigned if there are no negative values) which can hold all their values,
+    - float columns are stored as float32 (the tree models convert their input to float32 anyway, so the trained models do not change).
+    Other columns (e.g. object or category) are left as they are.
+    '''
+    def __init__(self, verbose=True):
+        self.verbose = verbose
+        self.bytes_saved = {}  # the number of bytes saved for each downcasted column
+
+    def compact_column(self, column):
+        '''
+        Returns the column downcasted to the smallest safe type.
+        '''
+        if pd.api.types.is_bool_dtype(column):
+            return column.astype(np.uint8)
+
+        if pd.api.types.is_integer_dtype(column):
+            downcast = 'unsigned' if len(column) == 0 or column.min() >= 0 else 'integer'
+            return pd.to_numeric(column, downcast=downcast)
+
+        if pd.api.types.is_float_dtype(column) and column.dtype.itemsize > 4:
+            finite = column[np.isfinite(column)]
+            if len(finite) == 0 or finite.abs().max() <= np.finfo(np.float32).max:
+                return column.astype(np.float32)
+
+        return column
+
+    def fit_transform(self, dataset):
+        '''
+        Returns the dataset with downcasted columns, the number of bytes saved for each column is stored in bytes_saved.
+        '''
+        for feature in dataset.columns:
+            if isinstance(dataset[feature].dtype, pd.SparseDtype) or not pd.api.types.is_numeric_dtype(dataset[feature]):
+                continue
+
+            compacted = self.compact_column(dataset[feature])
+            if compacted.dtype == dataset[feature].dtype:
+                continue
+
+            saved = int(dataset[feature].memory_usage(index=False, deep=True) - compacted.memory_usage(index=False, deep=True))
+            self.bytes_saved[feature] = saved
+            if self.verbose:
+                print(f'The feature "{feature}" was converted from {dataset[feature].dtype} to {compacted.dtype}, {saved} bytes saved.')
+            dataset[feature] = compacted
+
+        if self.verbose:
+            print(f'In total {sum(self.bytes_saved.values())} bytes were saved by compacting the data types.')
+
+        return dataset
@@ -0,0 +1,113 @@
+from .feature_type_extractor import FeatureTypeExtractor
+import pandas as pd
+import numpy as np
+
+
+class FeatureScreeningHandler:
+    def __init__(self, method='xgboost', top_k=None, cumulative_importance=0.99, sample_size=50000, random_state=42, copy=True):
+        """
+        This class removes the features which carry (almost) no signal, before the hyperparameter tuning,
+        so every trial of the tuners trains on fewer columns.
+
+        The importance of the features is estimated with a cheap model on a random sample of the rows:
+        - 'xgboost' - the gain importance of a shallow XGBoost model (tree_method='hist', 50 trees of depth 4),
+        - 'mutual_info' - the mutual information of every feature with the target.
+        The importances are normalized to sum up to 1 and the most important features are kept,
+        either the top_k ones or as many as needed to cover cumulative_importance of the total importance.
+
+        Args:
+            - method - 'xgboost' or 'mutual_info'
+            - top_k - if set, the number of features to keep (cumulative_importance is then not used)
+            - cumulative_importance - the fraction of the total importance covered by the kept features
+            - sample_size - if the dataset has more rows, the importances are estimated on a random sample of this many rows
+            - random_state - random seed used for the row sample and the model
+            - copy - if False, the dropped features are removed from the given dataset in place
+        """
+        if method not in ['xgboost', 'mutual_info']:
+            raise ValueError("method should be 'xgboost' or 'mutual_info'.")
+        if top_k is not None and top_k < 1:
+            raise ValueError("top_k should be at least 1.")
+        if not 0 < cumulative_importance <= 1:
+            raise ValueError("cumulative_importance should be in (0, 1].")
+        self.method = method
+        self.top_k = top_k
+        self.cumulative_importance = cumulative_importance
+        self.sample_size = sample_size
+        self.random_state = random_state
+        self.copy = copy
+        self.importances = None  # normalized importance of every feature, sorted from the most important one
+        self.kept = None  # the kept features, in the order of the dataset
+        self.to_drop = None  # the dropped features, in the order of the dataset
+
+    def _sample(self, X, y):
+        """
+        Returns a random sample of sample_size rows of X and y (X and y themselves if they are not longer).
+        """
+        if self.sample_size is None or len(X) <= self.sample_size:
+            return X, y
+        positions = np.sort(np.random.default_rng(self.random_state).choice(len(X), self.sample_size, replace=False))
+        return X.take(positions), y.take(positions)
+
+    def _xgboost_importances(self, X, y):
+        """
+        Returns the gain importance of the features of a shallow XGBoost model.
+        """
+        from xgboost import XGBClassifier  # imported only if the features are screened with XGBoost
+
+        feature_type_extractor = FeatureTypeExtractor()
+        clf = XGBClassifier(n_estimators=50, max_depth=4, learning_rate=0.3, tree_method='hist', importance_type='gain',
+                            enable_categorical=feature_type_extractor.has_category_columns(X),
+                            random_state=self.random_state, n_jobs=-1)
+        clf.fit(feature_type_extractor.to_dense(X), y)  # dense, as to the XGBoost tuner (a CSR matrix would make its zeros missing)
+        return np.nan_to_num(clf.feature_importances_.astype(np.float64))
+
+    def _mutual_info_importances(self, X, y):
+        """
+        Returns the mutual information of the features with the target.
+        Integer (one-hot, label encoded, boolean) and category features are treated as discrete.
+        """
+        from sklearn.feature_selection import mutual_info_classif
+
+        X = FeatureTypeExtractor().to_dense(X)
+        discrete = np.array([pd.api.types.is_integer_dtype(dtype) or isinstance(dtype, pd.CategoricalDtype) for dtype in X.dtypes])
+        matrix = np.empty(X.shape, dtype=np.float64, order='F')
+        for i, feature in enumerate(X.columns):
+            values = X[feature]
+            matrix[:, i] = values.cat.codes if isinstance(values.dtype, pd.CategoricalDtype) else values.to_numpy(dtype=np.float64)
+        return mutual_info_classif(matrix, y, discrete_features=discrete, random_state=self.random_state)
+
+    def fit_transform(self, X, y):
+        """
+        Function returns the features with the least important ones removed.
+        Args:
+            - X - feature matrix
+            - y - target labels
+        """
+        X_sample, y_sample = self._sample(X, y)
+        if self.method == 'xgboost':
+            importances = self._xgboost_importances(X_sample, y_sample)
+        else:
+            importances = self._mutual_info_importances(X_sample, y_sample)
+
+        total = importances.sum()
+        importances = importances / total if total > 0 else np.full(len(importances), 1 / len(importances))
+        self.importances = pd.Series(importances, index=X.columns).sort_values(ascending=False, kind='stable')
+
+        if self.top_k is not None:
+            n_keep = min(self.top_k, X.shape[1])
+        else:
+            # the smallest number of the most important features covering the required fraction of the importance
+            n_keep = int(np.searchsorted(self.importances.cumsum().to_numpy(), self.cumulative_importance - 1e-9)) + 1
+            n_keep = min(n_keep, X.shape[1])
+
+        kept = set(self.importances.index[:n_keep])
+        self.kept = [feature for feature in X.columns if feature in kept]
+        self.to_drop = [feature for feature in X.columns if feature not in kept]
+        print(f'Feature screening ({self.method}) kept {len(self.kept)} of {X.shape[1]} features.')
+        if len(self.to_drop) > 0:
+            print(f'The features: {self.to_drop} have been removed, because of their low importance.')
+
+        if not self.copy:
+            X.drop(self.to_drop, axis=1, inplace=True)
+            return X
+        return X.drop(self.to_drop, axis=1)
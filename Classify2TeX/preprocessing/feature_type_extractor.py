@@ -1,4 +1,6 @@
 import pandas as pd
+import numpy as np
+import scipy.sparse as sp
 
 class FeatureTypeExtractor:
     '''
@@ -20,6 +22,14 @@ class FeatureTypeExtractor:
         self.MAX_CATEGORIES_ONE_HOT = 15 # If the number of categories is less or equals to this number, we will one-hot encode the feature.
         self.MAX_CATEGORIES_LABEL = 50 # If the number of categories is less or equals to this number, we will label encode the feature, otherwise we consider it as a text. 
 
+        # The transformations applied by this instance, so that they can be stored and applied again to new data.
+        self.datetime_features = [] # Features separated into the date and time components.
+        self.one_hot_features = {} # Feature -> categories, in the order of the one-hot encoded columns.
+        self.label_features = {} # Feature -> categories, the label of a category is its position in the list.
+        self.category_features = {} # Feature -> categories, for features kept as category dtype.
+        self.bool_features = [] # Boolean features converted to int.
+        self.target_mapping = [] # [value, label] pairs of the encoded target.
+
     def get_feature_type(self, feature_name, dataset):
         '''
         Returns the type of the feature - categorical_one_hot, categorical_label, text, continious, discrete, datetime, index, unknown.
@@ -72,19 +82,20 @@ class FeatureTypeExtractor:
         return self.UNKNOWN
     
     
-    def one_hot_encode(self, feature_name, dataset):
+    def one_hot_encode(self, feature_name, dataset, sparse=False):
         '''
         One-hot encodes the categorical feature.
         Args:
             - feature_name - the name of the feature, which should be one-hot encoded.
             - dataset - the dataset, which has the feature.
+            - sparse - if True, the one-hot columns are stored as sparse uint8 columns (pandas SparseDtype).
         Returns:
             - the dataset with the one-hot encoded feature instead of the original feature.
         '''
         if self.get_feature_type(feature_name, dataset) != self.CATEGORICAL_ONE_HOT:
             raise ValueError('One-hot encoding should not ne applied to this feature.')
         
-        one_hot = pd.get_dummies(dataset[feature_name], prefix=feature_name)
+        one_hot = self._one_hot_columns(feature_name, dataset, sparse)
         
         dataset = dataset.drop(columns=[feature_name])
         dataset = pd.concat([dataset, one_hot], axis=1)
@@ -92,6 +103,16 @@ class FeatureTypeExtractor:
         return dataset
     
     
+    def _one_hot_columns(self, feature_name, dataset, sparse=False):
+        '''
+        Records the categories of the feature and returns its one-hot columns (without changing the dataset).
+        '''
+        self.one_hot_features[feature_name] = pd.Categorical(dataset[feature_name]).categories.tolist()
+        if sparse:
+            return pd.get_dummies(dataset[feature_name], prefix=feature_name, sparse=True, dtype=np.uint8)
+        return pd.get_dummies(dataset[feature_name], prefix=feature_name)
+    
+    
     def label_encode(self, feature_name, dataset):
         '''
         Label encodes the categorical feature.
@@ -102,28 +123,70 @@ class FeatureTypeExtractor:
             - the dataset with the label encoded feature instead of the original feature.
         '''
         dataset[feature_name] = dataset[feature_name].astype('category')
+        self.label_features[feature_name] = dataset[feature_name].cat.categories.tolist()
         dataset[feature_name] = dataset[feature_name].cat.codes
         
         return dataset
     
 
-    def encode_categorical(self, dataset, target_column_name):
+    def encode_categorical(self, dataset, target_column_name, sparse_one_hot=False, native_categorical=False):
         '''
         Encodes the categorical feature.
         Args:
             - dataset - the dataset, to features of which we want to apply the encoding.
             - target_column_name - the name of the target column.
+            - sparse_one_hot - if True, the one-hot encoded columns are stored as sparse columns.
+            - native_categorical - if True, the categorical features are not encoded, they are stored as pandas category dtype
+              (XGBoost handles them natively, for the other models they are encoded later with encode_category_dtype).
         Returns:
             - the dataset with the encoded categorical features.
         '''
+        one_hot_blocks = {}  # the one-hot columns are added with a single concat at the end, not one copy per feature
         for feature in dataset.columns:
             feature_type = self.get_feature_type(feature, dataset)
-            if feature_type == self.CATEGORICAL_ONE_HOT and feature != target_column_name:
-                dataset = self.one_hot_encode(feature, dataset)
+            if native_categorical and feature_type in [self.CATEGORICAL_ONE_HOT, self.CATEGORICAL_LABEL] and feature != target_column_name:
+                dataset[feature] = dataset[feature].astype('category')
+                self.category_features[feature] = dataset[feature].cat.categories.tolist()
+            elif feature_type == self.CATEGORICAL_ONE_HOT and feature != target_column_name:
+                one_hot_blocks[feature] = self._one_hot_columns(feature, dataset, sparse=sparse_one_hot)
             elif feature_type == self.CATEGORICAL_LABEL and feature != target_column_name:
                 dataset = self.label_encode(feature, dataset)
         
+        if len(one_hot_blocks) > 0:
+            dataset = pd.concat([dataset.drop(columns=list(one_hot_blocks)), *one_hot_blocks.values()], axis=1)
+        
+        return dataset
+    
+    
+    def encode_category_dtype(self, dataset, sparse_one_hot=False):
+        '''
+        Encodes the features of pandas category dtype (kept by encode_categorical with native_categorical=True) for the models,
+        which do not support categorical features. As in encode_categorical, the features with at most MAX_CATEGORIES_ONE_HOT
+        categories are one-hot encoded and the others are label encoded.
+        Args:
+            - dataset - the dataset, which has the category features.
+            - sparse_one_hot - if True, the one-hot encoded columns are stored as sparse columns.
+        Returns:
+            - a new dataset with the encoded features, the input dataset is not changed.
+        '''
+        for feature in dataset.columns:
+            if not isinstance(dataset[feature].dtype, pd.CategoricalDtype):
+                continue
+
+            if len(dataset[feature].cat.categories) <= self.MAX_CATEGORIES_ONE_HOT:
+                one_hot = pd.get_dummies(dataset[feature], prefix=feature, sparse=sparse_one_hot, dtype=np.uint8)
+                dataset = pd.concat([dataset.drop(columns=[feature]), one_hot], axis=1)
+            else:
+                dataset = dataset.assign(**{feature: dataset[feature].cat.codes})
+
         return dataset
+
+
+    def has_category_columns(self, dataset):
+        '''
+        Returns True if the dataset has at least one feature of pandas category dtype.
+        '''
+        return any(isinstance(dtype, pd.CategoricalDtype) for dtype in dataset.dtypes)
     
     
     def min_max_scale(self, dataset, target_column_name):
@@ -157,6 +220,7 @@ class FeatureTypeExtractor:
         for i, target in enumerate(dataset[target_column_name].unique()):
             replace_dict[target] = i
 
+        self.target_mapping = [[target, label] for target, label in replace_dict.items()]
         dataset[target_column_name] = dataset[target_column_name].replace(replace_dict)
         dataset[target_column_name] = dataset[target_column_name].astype(int)
 
@@ -177,13 +241,14 @@ class FeatureTypeExtractor:
         for feature in dataset.columns:
             feature_type = self.get_feature_type(feature, dataset)
             if feature_type == self.DATETIME:
+                self.datetime_features.append(feature)
                 dataset[feature + '_year'] = dataset[feature].dt.year
                 dataset[feature + '_month'] = dataset[feature].dt.month
                 dataset[feature + '_day'] = dataset[feature].dt.day
                 dataset[feature + '_hour'] = dataset[feature].dt.hour
                 dataset[feature + '_minute'] = dataset[feature].dt.minute
                 dataset[feature + '_second'] = dataset[feature].dt.second
-                dataset = dataset.drop(columns=[feature])
+                del dataset[feature]
 
         return dataset
     
@@ -197,6 +262,62 @@ class FeatureTypeExtractor:
         '''
         for feature in dataset.columns:
             if dataset[feature].dtype == 'bool':
+                self.bool_features.append(feature)
                 dataset[feature] = dataset[feature].astype(int)
                 
-        return dataset
\ No newline at end of file
+        return dataset
+
+
+    def has_sparse_columns(self, dataset):
+        '''
+        Returns True if the dataset has at least one sparse (pandas SparseDtype) column.
+        '''
+        return any(isinstance(dtype, pd.SparseDtype) for dtype in dataset.dtypes)
+
+
+    def to_model_input(self, dataset):
+        '''
+        Converts the features to the format passed to the scikit-learn models.
+        Models do not benefit from sparse pandas columns (they are densified), so if the dataset has sparse columns
+        it is converted to a float32 CSR matrix, whose entries which are not stored are zeros for scikit-learn trees.
+        XGBoost reads them as missing values instead, so it is given the dense features (see to_dense), as they are given to it later.
+        Args:
+            - dataset - the dataset with the features.
+        Returns:
+            - the dataset itself if it has no sparse columns, otherwise a scipy.sparse CSR matrix with the same column order.
+        '''
+        if not self.has_sparse_columns(dataset):
+            return dataset
+
+        blocks = []
+        for is_sparse, columns in self._column_groups(dataset):
+            if is_sparse:
+                blocks.append(dataset[columns].astype(pd.SparseDtype(np.float32, 0)).sparse.to_coo())
+            else:
+                blocks.append(sp.csr_matrix(dataset[columns].to_numpy(dtype=np.float32)))
+
+        return sp.hstack(blocks, format='csr')
+
+
+    def to_dense(self, dataset):
+        '''
+        Returns the dataset with the sparse columns converted to dense columns (e.g. for SHAP or plots on a sample).
+        '''
+        sparse_dtypes = {feature: dtype.subtype for feature, dtype in dataset.dtypes.items() if isinstance(dtype, pd.SparseDtype)}
+        if len(sparse_dtypes) == 0:
+            return dataset
+        return dataset.astype(sparse_dtypes)
+
+
+    def _column_groups(self, dataset):
+        '''
+        Splits the columns into consecutive groups of sparse and dense columns, keeping their order.
+        '''
+        groups = []
+        for feature, dtype in dataset.dtypes.items():
+            is_sparse = isinstance(dtype, pd.SparseDtype)
+            if len(groups) > 0 and groups[-1][0] == is_sparse:
+                groups[-1][1].append(feature)
+            else:
+                groups.append((is_sparse, [feature]))
+        return groups
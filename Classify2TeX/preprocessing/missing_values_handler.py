@@ -10,8 +10,15 @@ class MissingValuesHandler:
     If the feature is discrete, we fill the missing values with the median value.
     If the feature is continious, we fill the missing values with the median value.
     '''
-    def __init__(self, dataset):
-        self.dataset = dataset.copy()
+    def __init__(self, dataset, copy=True):
+        '''
+        Args:
+            - dataset - the dataset to transform
+            - copy - if False, the dataset is changed in place (the caller must own it and not use it afterwards)
+        '''
+        self.dataset = dataset.copy() if copy else dataset
+        self.fill_values = {}  # the value used to fill the missing values of each feature
+        self.new_data_fill_values = {}  # the value used to fill the missing values of new data, for every supported feature
 
     def fit_transform(self):
         '''
@@ -27,16 +34,26 @@ class MissingValuesHandler:
                 if feature_type == feature_type_extractor.CATEGORICAL_LABEL or feature_type == feature_type_extractor.CATEGORICAL_ONE_HOT:
                     most_frequent_value = self.dataset[feature].mode()[0]
                     self.dataset.loc[self.dataset[feature].isnull(), feature] = most_frequent_value
+                    self.fill_values[feature] = most_frequent_value
                     print(f'The missing values in the feature "{feature}" are filled with the most frequent value.')
 
                 # Fill the missing values in discrete and continious features with the median value.
                 elif feature_type in [feature_type_extractor.DISCRETE, feature_type_extractor.CONTINIOUS]:
                     median_value = self.dataset[feature].median()
                     self.dataset.loc[self.dataset[feature].isnull(), feature] = median_value
+                    self.fill_values[feature] = median_value
                     print(f'The missing values in the feature "{feature}" are filled with the median value.')
 
                 # If the feature type is not supported, raise an error.
                 else:
                     raise ValueError(f'The feature type "{feature_type}" is not supported by the class.')
+
+            # New data can have missing values also in the features which have none here.
+            if feature in self.fill_values:
+                self.new_data_fill_values[feature] = self.fill_values[feature]
+            elif feature_type == feature_type_extractor.CATEGORICAL_LABEL or feature_type == feature_type_extractor.CATEGORICAL_ONE_HOT:
+                self.new_data_fill_values[feature] = self.dataset[feature].mode()[0]
+            elif feature_type in [feature_type_extractor.DISCRETE, feature_type_extractor.CONTINIOUS]:
+                self.new_data_fill_values[feature] = self.dataset[feature].median()
         
         return self.dataset
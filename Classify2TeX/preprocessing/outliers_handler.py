@@ -5,11 +5,18 @@ class OutliersHandler:
     '''
     A class which handles the outliers in the dataset.(we consider only numerical features here) using the Z score method.)
     '''
-    def __init__(self, dataset):
-        self.dataset = dataset.copy()
+    def __init__(self, dataset, copy=True):
+        '''
+        Args:
+            - dataset - the dataset to transform
+            - copy - if False, the dataset is changed in place (the caller must own it and not use it afterwards)
+        '''
+        self.dataset = dataset.copy() if copy else dataset
         self.TO_DELETE_ROWS_THRESHOLD = 0.001 # If the fraction of rows with outliers is less than this value, we delete the rows, otherwise we fill the outliers with the median value.
         self.DO_NOTHING_THRESHOLD = 0.005 # If the fraction of rows with outliers is more than this value, we do nothing, we dont consider these values as outliers.
         # if the fraction of rows with outliers is between the two thresholds, we fill the outliers with the median value.
+        self.actions = {}  # what was done with the outliers of each feature
+        self.replacements = {}  # feature -> mean, std and median used to replace its outliers, so new data can be handled the same way
 
     def fit_transform(self):
         '''
@@ -30,10 +37,13 @@ class OutliersHandler:
                     if outliers_number/len(self.dataset) < self.TO_DELETE_ROWS_THRESHOLD:
                         self.dataset = self.dataset[(abs_z_scores < 3)] # Delete the rows with outliers.
                         print(f'{outliers_number} outliers in the feature {feature} were deleted.')
+                        self.actions[feature] = f'{outliers_number} rows deleted'
 
                     elif outliers_number/len(self.dataset) < self.DO_NOTHING_THRESHOLD:
-                        self.dataset[feature] = self.dataset[feature].apply(lambda x: self.dataset[feature].median() if abs(zscore([x])[0]) > 3 else x) # Fill the outliers with the median value, if there are many outliers in the feature.
+                        self.replacements[feature] = {'mean': self.dataset[feature].mean(), 'std': self.dataset[feature].std(ddof=0), 'median': self.dataset[feature].median()}
+                        self.dataset.loc[abs_z_scores > 3, feature] = self.replacements[feature]['median'] # Fill the outliers with the median value, if there are many outliers in the feature.
                         print(f'{outliers_number} outliers in the feature {feature} were replaced with the median value.')
+                        self.actions[feature] = f'{outliers_number} values replaced with the median'
         
         return self.dataset
 
@@ -0,0 +1,121 @@
+import pandas as pd
+import numpy as np
+import hashlib
+import json
+import os
+import tempfile
+
+
+class PreprocessingCache:
+    '''
+    A content-addressed cache of preprocessed datasets.
+
+    The key of an entry is a hash of the input data (values, column names and dtypes), the target column name
+    and the preprocessing settings, so a changed input or setting never reuses a stale entry.
+    Each entry is a directory with:
+    - data.npz - the columns of the preprocessed dataset (and the sample weights) as .npy arrays,
+    - meta.json - column names, dtypes, categories of category columns and the preprocessing decisions.
+    Both files are written to a temporary file and moved into place, meta.json last, so an entry with meta.json is complete
+    even if a run was interrupted or several processes (e.g. the workers of BatchRunner) saved the same entry.
+    '''
+    VERSION = 4  # Increase when the preprocessing changes, so the old entries are not used anymore.
+
+    def __init__(self, directory):
+        '''
+        Args:
+            - directory - the directory where the cache entries are stored, e.g. Results/<dataset>/Preprocessing/cache
+        '''
+        self.directory = directory
+
+    def key(self, dataset, target_column_name, settings):
+        '''
+        Returns the key (sha256 hex digest) of the dataset preprocessed with the given settings.
+        '''
+        hasher = hashlib.sha256()
+        hasher.update(json.dumps({
+            'version': self.VERSION,
+            'target_column_name': target_column_name,
+            'settings': settings,
+            'columns': [str(column) for column in dataset.columns],
+            'dtypes': [str(dtype) for dtype in dataset.dtypes],
+        }, sort_keys=True, default=str).encode())
+        hasher.update(pd.util.hash_pandas_object(dataset, index=True).to_numpy().tobytes())
+        return hasher.hexdigest()
+
+    def load(self, key):
+        '''
+        Returns (preprocessed dataset, sample weights or None, decisions) of the entry, or None if there is no such entry.
+        '''
+        entry = os.path.join(self.directory, key)
+        if not os.path.exists(os.path.join(entry, 'meta.json')):
+            return None
+
+        with open(os.path.join(entry, 'meta.json')) as file:
+            meta = json.load(file)
+
+        columns = {}
+        with np.load(os.path.join(entry, 'data.npz'), allow_pickle=False) as arrays:
+            for i, column in enumerate(meta['columns']):
+                info = meta['column_info'][i]
+                if info['kind'] == 'category':
+                    columns[column] = pd.Categorical.from_codes(arrays[f'c{i}'], info['categories'])
+                elif info['kind'] == 'sparse':
+                    values = np.zeros(meta['n_rows'], dtype=arrays[f'c{i}_values'].dtype)
+                    values[arrays[f'c{i}_indices']] = arrays[f'c{i}_values']
+                    columns[column] = pd.arrays.SparseArray(values, fill_value=0)
+                else:
+                    columns[column] = arrays[f'c{i}']
+            sample_weight = arrays['sample_weight'] if 'sample_weight' in arrays.files else None
+
+        dataset = pd.DataFrame(columns, columns=meta['columns'])
+        return dataset, sample_weight, meta['decisions']
+
+    def save(self, key, dataset, sample_weight, decisions):
+        '''
+        Stores the preprocessed dataset, the sample weights (can be None) and the decisions under the key.
+        '''
+        entry = os.path.join(self.directory, key)
+        os.makedirs(entry, exist_ok=True)
+
+        arrays = {}
+        column_info = []
+        for i, column in enumerate(dataset.columns):
+            values = dataset[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                arrays[f'c{i}'] = values.cat.codes.to_numpy()
+                column_info.append({'kind': 'category', 'categories': values.cat.categories.tolist()})
+            elif isinstance(values.dtype, pd.SparseDtype):
+                arrays[f'c{i}_indices'] = values.array.sp_index.indices
+                arrays[f'c{i}_values'] = values.array.sp_values
+                column_info.append({'kind': 'sparse'})
+            else:
+                arrays[f'c{i}'] = values.to_numpy()
+                column_info.append({'kind': 'dense'})
+        if sample_weight is not None:
+            arrays['sample_weight'] = np.asarray(sample_weight)
+
+        self._write_atomically(os.path.join(entry, 'data.npz'), lambda file: np.savez(file, **arrays))
+
+        meta = {
+            'columns': list(dataset.columns),
+            'column_info': column_info,
+            'n_rows': len(dataset),
+            'decisions': decisions,
+        }
+        # numpy scalars (e.g. medians) are stored as python numbers, other objects as strings
+        meta = json.dumps(meta, indent=2, default=lambda value: value.item() if hasattr(value, 'item') else str(value))
+        self._write_atomically(os.path.join(entry, 'meta.json'), lambda file: file.write(meta.encode()))  # written last, marks the entry complete
+
+    @staticmethod
+    def _write_atomically(path, write):
+        '''
+        Calls write with a temporary file (binary) next to path and then moves it to path, so the file at path is never half written.
+        '''
+        descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')  # unique, so concurrent writers do not share it
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                write(file)
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
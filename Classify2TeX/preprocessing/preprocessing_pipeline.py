@@ -0,0 +1,188 @@
+from .data_preprocessor import DataPreprocessor
+from .feature_type_extractor import FeatureTypeExtractor
+import pandas as pd
+import numpy as np
+import joblib
+
+
+class PreprocessingPipeline:
+    '''
+    The preprocessing fitted on a dataset, which can be applied to new data, e.g. to score new rows with the saved models.
+
+    fit runs DataPreprocessor and keeps its decisions (dropped columns, fill values, category vocabularies, target mapping...),
+    transform applies them to a new batch, column by column, without computing any statistics again:
+    - the datetime features are separated into year, month, day, hour, minute and second,
+    - the redundant features are dropped,
+    - the missing values are filled with the values computed on the training data,
+    - the outliers of the features, whose outliers were replaced with the median, are replaced with the same median
+      (rows are never deleted, every row of the batch gets a prediction),
+    - the categorical features are encoded with the training vocabularies (unseen categories get all zeros in one-hot columns,
+      the label -1 or a missing value in category columns),
+    - the boolean features are converted to int,
+    - the columns are selected and ordered as in the training data and get the same data types
+      (the correlated and the screened out features are not returned).
+    '''
+    def __init__(self, sparse_one_hot=False, native_categorical=False, balance_strategy='resample',
+                 feature_selection=None, feature_selection_top_k=None, feature_selection_threshold=0.99, smote_n_jobs=None, smote_max_index_size=None):
+        '''
+        Args:
+            - sparse_one_hot, native_categorical, balance_strategy, feature_selection, feature_selection_top_k,
+              feature_selection_threshold, smote_n_jobs, smote_max_index_size - the preprocessing settings, see DataPreprocessor
+        '''
+        self.sparse_one_hot = sparse_one_hot
+        self.native_categorical = native_categorical
+        self.balance_strategy = balance_strategy
+        self.feature_selection = feature_selection
+        self.feature_selection_top_k = feature_selection_top_k
+        self.feature_selection_threshold = feature_selection_threshold
+        self.smote_n_jobs = smote_n_jobs
+        self.smote_max_index_size = smote_max_index_size
+        self.decisions = None  # the decisions of DataPreprocessor, set by fit
+
+    @classmethod
+    def from_decisions(cls, decisions):
+        '''
+        Returns a fitted pipeline from the decisions of DataPreprocessor (e.g. Classify2TeX.preprocessing_decisions).
+        '''
+        screening = decisions['feature_screening']
+        screening_settings = {} if screening is None else {
+            'feature_selection': screening['method'],
+            'feature_selection_top_k': screening['top_k'],
+            'feature_selection_threshold': screening['threshold'],
+        }
+        pipeline = cls(sparse_one_hot=decisions['sparse_one_hot'], native_categorical=len(decisions['category_features']) > 0, **screening_settings)
+        pipeline.decisions = decisions
+        return pipeline
+
+    def fit(self, dataset, target_column_name):
+        '''
+        Preprocesses the dataset with DataPreprocessor and keeps the decisions.
+        Returns the pipeline.
+        '''
+        self.fit_transform(dataset, target_column_name)
+        return self
+
+    def fit_transform(self, dataset, target_column_name):
+        '''
+        Preprocesses the dataset with DataPreprocessor and keeps the decisions.
+        Returns the preprocessed dataset (with the 'target' column), as DataPreprocessor.preprocess.
+        '''
+        preprocessor = DataPreprocessor(dataset, target_column_name, sparse_one_hot=self.sparse_one_hot,
+                                        native_categorical=self.native_categorical, balance_strategy=self.balance_strategy,
+                                        feature_selection=self.feature_selection, feature_selection_top_k=self.feature_selection_top_k,
+                                        feature_selection_threshold=self.feature_selection_threshold, smote_n_jobs=self.smote_n_jobs,
+                                        smote_max_index_size=self.smote_max_index_size)
+        preprocessed_data = preprocessor.preprocess()
+        self.decisions = preprocessor.decisions
+        return preprocessed_data
+
+    def transform(self, dataset, encode_categories=False):
+        '''
+        Applies the fitted preprocessing to new data.
+        Args:
+            - dataset - the new data, with the columns of the training data (the target column is not needed, it is ignored)
+            - encode_categories - if True, the category columns (native_categorical) are encoded as for the scikit-learn models,
+              otherwise they are kept as category dtype, as for XGBoost
+        Returns:
+            - the features (pandas DataFrame) in the format of the preprocessed training data, with the index of the dataset
+        '''
+        if self.decisions is None:
+            raise ValueError('The pipeline is not fitted. Please run fit() first.')
+        decisions = self.decisions
+
+        target_column_name = decisions['target_column_name']
+        needed = set(decisions['new_data_fill_values']) | set(decisions['datetime_features']) | set(decisions['bool_features'])
+        needed.discard(target_column_name)
+        missing_columns = [feature for feature in needed if feature not in dataset.columns and not self._is_datetime_part(feature)]
+        if len(missing_columns) > 0:
+            raise ValueError(f'The columns {missing_columns} are missing in the dataset.')
+
+        columns = {}  # the transformed columns, the input dataset is not changed
+
+        # date and time components
+        for feature in decisions['datetime_features']:
+            values = pd.to_datetime(dataset[feature], errors='coerce')
+            for part in ['year', 'month', 'day', 'hour', 'minute', 'second']:
+                columns[f'{feature}_{part}'] = getattr(values.dt, part)
+
+        def column(feature):
+            return columns[feature] if feature in columns else dataset[feature]
+
+        # missing values and outliers
+        for feature, value in decisions['new_data_fill_values'].items():
+            if feature == target_column_name:
+                continue
+            values = column(feature)
+            columns[feature] = values.fillna(value) if values.hasnans else values
+        for feature, replacement in decisions['outlier_replacements'].items():
+            if feature == target_column_name:
+                continue
+            values = column(feature)
+            if replacement['std'] > 0:
+                outliers = ((values - replacement['mean']) / replacement['std']).abs() > 3
+                if outliers.any():
+                    columns[feature] = values.mask(outliers, replacement['median'])
+
+        # categorical and boolean features
+        for feature, categories in decisions['one_hot_features'].items():
+            one_hot = pd.get_dummies(pd.Categorical(column(feature), categories=categories), prefix=feature,
+                                     sparse=decisions['sparse_one_hot'], dtype=np.uint8)
+            one_hot.index = dataset.index
+            columns.update(one_hot.items())
+        for feature, categories in decisions['label_features'].items():
+            columns[feature] = pd.Series(pd.Categorical(column(feature), categories=categories).codes, index=dataset.index)
+        for feature, categories in decisions['category_features'].items():
+            columns[feature] = column(feature).astype(pd.CategoricalDtype(categories))
+        for feature in decisions['bool_features']:
+            columns[feature] = column(feature).astype(int)
+
+        # the columns and the data types of the training data
+        X = pd.DataFrame({feature: self._cast(column(feature), decisions['dtypes'][feature]) for feature in decisions['columns']},
+                         index=dataset.index, columns=decisions['columns'])
+
+        if encode_categories:
+            feature_type_extractor = FeatureTypeExtractor()
+            if feature_type_extractor.has_category_columns(X):
+                X = feature_type_extractor.encode_category_dtype(X, sparse_one_hot=feature_type_extractor.has_sparse_columns(X))
+        return X
+
+    def transform_target(self, target):
+        '''
+        Encodes the target values (pandas Series) with the target mapping of the training data.
+        '''
+        mapping = {value: label for value, label in self.decisions['target_mapping']}
+        return target.map(mapping).astype(int)
+
+    def save(self, path):
+        '''
+        Saves the fitted pipeline with joblib, e.g. to Results/<dataset_name>/Models/preprocessing_pipeline.joblib.
+        '''
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path):
+        '''
+        Loads a pipeline saved with save.
+        '''
+        return joblib.load(path)
+
+    def _is_datetime_part(self, feature):
+        '''
+        Returns True if the feature is created from one of the datetime features.
+        '''
+        return any(feature.startswith(f'{datetime_feature}_') for datetime_feature in self.decisions['datetime_features'])
+
+    def _cast(self, values, dtype):
+        '''
+        Casts the column to the data type of the training data. Integer values which do not fit into the (compacted)
+        integer type of the training data, and missing values in integer columns, are kept as float32 instead of overflowing.
+        '''
+        if dtype == 'category' or str(values.dtype) == dtype:
+            return values
+        dtype = pd.api.types.pandas_dtype(dtype)
+        if isinstance(dtype, pd.SparseDtype) or not pd.api.types.is_integer_dtype(dtype):
+            return values.astype(dtype)
+
+        if values.hasnans or (len(values) > 0 and (values.min() < np.iinfo(dtype).min or values.max() > np.iinfo(dtype).max)):
+            return values.astype(np.float32)
+        return values.astype(dtype)
@@ -8,8 +8,13 @@ class RedundantFeaturesHandler:
     - Its type is INDEX or UNKOWN or TEXT (our library doesn't support text columns (which were not considered as categorical))
     - It has more than 90% missing values
     '''
-    def __init__(self, dataset):
-        self.dataset = dataset.copy()
+    def __init__(self, dataset, copy=True):
+        '''
+        Args:
+            - dataset - the dataset to transform
+            - copy - if False, the dataset is changed in place (the caller must own it and not use it afterwards)
+        '''
+        self.dataset = dataset.copy() if copy else dataset
         self.to_delete = set()
 
     def fit_transform(self):
@@ -0,0 +1,128 @@
+from sklearn.neighbors import NearestNeighbors
+import numpy as np
+import pandas as pd
+
+
+class SMOTEEngine:
+    '''
+    A scalable implementation of SMOTE (Synthetic Minority Over-sampling Technique) for binary classification.
+
+    - The nearest neighbors are searched only among the minority class rows, in batches, using n_jobs workers.
+    - Neighbors are computed only for the minority rows which were drawn as seeds of the synthetic samples.
+    - For large minority classes the neighbors can be searched among a random subset of the minority rows only (an exact search
+      over the subset, the neighbors found are the nearest rows of the subset, not of the whole class).
+    - The synthetic rows are written straight into a preallocated array, the original rows are not copied into it.
+
+    A synthetic sample lies on the segment between a seed and one of its k nearest neighbors. Integer and category
+    columns take the value of the seed or of the neighbor (whichever is closer), so no new categories are invented.
+    '''
+    def __init__(self, k_neighbors=5, n_jobs=None, batch_size=10000, max_index_size=None, random_state=42):
+        '''
+        Args:
+            - k_neighbors - number of nearest neighbors used to create the synthetic samples
+            - n_jobs - number of parallel jobs of the neighbor search (None means 1, -1 means all processors)
+            - batch_size - number of seeds whose neighbors are searched at once
+            - max_index_size - if set and the minority class is larger, the neighbors are searched (exactly) among a random subset
+              of this many minority rows, at least 2, so the cost no longer grows quadratically with the class
+            - random_state - random seed for reproducibility
+        '''
+        self.k_neighbors = k_neighbors
+        self.n_jobs = n_jobs
+        self.batch_size = batch_size
+        self.max_index_size = max_index_size
+        self.random_state = random_state
+
+    def _minority_matrix(self, X_minority, dtype):
+        '''
+        Returns the minority rows as a dense array, category columns are replaced with their codes.
+        '''
+        category_columns = [column for column in X_minority.columns if isinstance(X_minority[column].dtype, pd.CategoricalDtype)]
+        if len(category_columns) > 0:
+            X_minority = X_minority.assign(**{column: X_minority[column].cat.codes for column in category_columns})
+        sparse_dtypes = {column: d.subtype for column, d in X_minority.dtypes.items() if isinstance(d, pd.SparseDtype)}
+        if len(sparse_dtypes) > 0:
+            X_minority = X_minority.astype(sparse_dtypes)
+        return X_minority.to_numpy(dtype=dtype)
+
+    def _neighbors(self, X_minority, seeds, rng):
+        '''
+        Returns an array with k nearest neighbors (positions in X_minority) of each seed, the seed itself excluded.
+        '''
+        n_minority = len(X_minority)
+        if self.max_index_size is not None and n_minority > max(self.max_index_size, 2):
+            index_rows = np.sort(rng.choice(n_minority, max(self.max_index_size, 2), replace=False))
+        else:
+            index_rows = np.arange(n_minority)
+        # the seed may be one of the indexed rows, so an index of n rows gives at most n - 1 other neighbors
+        k = min(self.k_neighbors, len(index_rows) - 1)
+
+        nearest_neighbors = NearestNeighbors(n_neighbors=k + 1, n_jobs=self.n_jobs).fit(X_minority[index_rows])
+
+        neighbors = np.empty((len(seeds), k), dtype=np.int64)
+        for start in range(0, len(seeds), self.batch_size):
+            batch = seeds[start:start + self.batch_size]
+            candidates = index_rows[nearest_neighbors.kneighbors(X_minority[batch], return_distance=False)]
+
+            # drop the seed itself (if it is in the index) and keep the k closest of the rest
+            order = np.argsort(candidates == batch[:, None], axis=1, kind='stable')
+            neighbors[start:start + len(batch)] = np.take_along_axis(candidates, order, axis=1)[:, :k]
+
+        return neighbors
+
+    def fit_resample(self, X, y):
+        '''
+        Adds synthetic minority samples until both classes have the same number of rows.
+
+        Args:
+            - X - feature matrix (pandas DataFrame)
+            - y - target labels (pandas Series)
+        Returns:
+            - resampled X and y, the original rows followed by the synthetic ones, with the data types of the input
+        '''
+        rng = np.random.default_rng(self.random_state)
+        class_counts = y.value_counts()
+        minority_class = class_counts.idxmin()
+        n_synthetic = class_counts.max() - class_counts.min()
+
+        if n_synthetic == 0 or class_counts.min() < 2:
+            return X, y
+
+        # interpolation is done in float32 unless some column needs more precision
+        numeric_dtypes = [d.subtype if isinstance(d, pd.SparseDtype) else d for d in X.dtypes if not isinstance(d, pd.CategoricalDtype)]
+        dtype = np.result_type(np.float32, *numeric_dtypes)
+        X_minority = self._minority_matrix(X[(y == minority_class).to_numpy()], dtype)
+
+        # draw the seeds and search the neighbors only for the distinct ones
+        seeds = rng.integers(0, len(X_minority), n_synthetic)
+        unique_seeds, seed_positions = np.unique(seeds, return_inverse=True)
+        neighbors = self._neighbors(X_minority, unique_seeds, rng)
+        chosen_neighbors = neighbors[seed_positions, rng.integers(0, neighbors.shape[1], n_synthetic)]
+
+        discrete = np.array([
+            isinstance(d, pd.CategoricalDtype) or pd.api.types.is_integer_dtype(d) or pd.api.types.is_bool_dtype(d)
+            for d in X.dtypes
+        ])
+
+        # write the synthetic samples into a preallocated array, batch by batch
+        synthetic = np.empty((n_synthetic, X.shape[1]), dtype=dtype)
+        for start in range(0, n_synthetic, self.batch_size):
+            end = min(start + self.batch_size, n_synthetic)
+            seed_rows = X_minority[seeds[start:end]]
+            neighbor_rows = X_minority[chosen_neighbors[start:end]]
+            gaps = rng.random((end - start, 1), dtype=np.float32 if dtype == np.float32 else np.float64)
+
+            batch = synthetic[start:end]
+            np.subtract(neighbor_rows, seed_rows, out=batch)
+            batch *= gaps
+            batch += seed_rows
+            batch[:, discrete] = np.where(gaps < 0.5, seed_rows[:, discrete], neighbor_rows[:, discrete])
+
+        X_synthetic = pd.DataFrame(synthetic, columns=X.columns)
+        for column in X.columns:
+            if isinstance(X[column].dtype, pd.CategoricalDtype):
+                X_synthetic[column] = pd.Categorical.from_codes(X_synthetic[column].astype(np.int64), X[column].cat.categories)
+        X_synthetic = X_synthetic.astype(X.dtypes.to_dict())
+
+        X_resampled = pd.concat([X, X_synthetic], ignore_index=True)
+        y_resampled = pd.concat([y, pd.Series(minority_class, index=range(n_synthetic), name=y.name)], ignore_index=True).astype(y.dtype)
+        return X_resampled, y_resampled
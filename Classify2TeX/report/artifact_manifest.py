@@ -0,0 +1,124 @@
+import pandas as pd
+import numpy as np
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import threading
+
+
+class ArtifactManifest:
+    '''
+    Keeps the keys of the artifacts of a report (figures, the PDF) in Results/<dataset_name>/report_manifest.json,
+    so a rebuilt report reuses the artifacts whose inputs did not change.
+
+    The key of an artifact is a hash of everything it is made from: the data (DataFrames, arrays, models...),
+    the parameters, and the function producing it together with the source of its module, so a changed plotting code
+    also produces a new key. An artifact is current if its file exists and was produced with the same key.
+    '''
+    FILE_NAME = 'report_manifest.json'
+    _lock = threading.Lock()  # the instances of the same report share the file
+    _source_digests = {}  # source file -> digest, the sources do not change while the program runs
+
+    def __init__(self, directory):
+        '''
+        Args:
+            - directory - the directory of the report, e.g. Results/<dataset_name>, the paths of the artifacts are relative to it or absolute
+        '''
+        self.directory = directory
+        self.path = os.path.join(directory, self.FILE_NAME)
+
+    def key(self, *parts):
+        '''
+        Returns the key (sha256 hex digest) of the artifact made from the given parts.
+        '''
+        hasher = hashlib.sha256()
+        for part in parts:
+            self._update(hasher, part)
+        return hasher.hexdigest()
+
+    def is_current(self, path, key):
+        '''
+        Returns True if the file at path exists and was recorded with the same key.
+        '''
+        return os.path.exists(path) and self._load().get(self._name(path)) == key
+
+    def record(self, path, key):
+        '''
+        Records that the file at path was produced with the key.
+        '''
+        with self._lock:
+            entries = self._load()
+            entries[self._name(path)] = key
+            os.makedirs(self.directory, exist_ok=True)
+            temporary_path = self.path + '.tmp'
+            with open(temporary_path, 'w') as file:
+                json.dump(entries, file, indent=1, sort_keys=True)
+            os.replace(temporary_path, self.path)  # a reader never sees a half written manifest
+
+    def _load(self):
+        '''
+        Returns the recorded keys, path -> key (the file is read every time, so several instances can share it).
+        '''
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path) as file:
+            return json.load(file)
+
+    def _name(self, path):
+        '''
+        Returns the name of the artifact in the manifest, its path relative to the directory of the report.
+        '''
+        return os.path.relpath(path, self.directory)
+
+    def _update(self, hasher, part):
+        '''
+        Adds the part to the hash, with a type tag, so e.g. the string '1' and the number 1 give different keys.
+        The index of DataFrames and Series is not hashed, the artifacts depend only on the values (the preprocessed dataset
+        loaded from PreprocessingCache has a new RangeIndex).
+        '''
+        hasher.update(type(part).__name__.encode())
+        if isinstance(part, pd.DataFrame):
+            hasher.update(json.dumps([[str(column) for column in part.columns], [str(dtype) for dtype in part.dtypes]]).encode())
+            hasher.update(pd.util.hash_pandas_object(part, index=False).to_numpy().tobytes())
+        elif isinstance(part, pd.Series):
+            hasher.update(json.dumps([str(part.name), str(part.dtype)]).encode())
+            hasher.update(pd.util.hash_pandas_object(part, index=False).to_numpy().tobytes())
+        elif isinstance(part, np.ndarray) and part.dtype != object:
+            hasher.update(f'{part.dtype}{part.shape}'.encode())
+            hasher.update(np.ascontiguousarray(part).tobytes())
+        elif isinstance(part, (list, tuple)):
+            hasher.update(str(len(part)).encode())
+            for item in part:
+                self._update(hasher, item)
+        elif isinstance(part, dict):
+            hasher.update(str(len(part)).encode())
+            for name, item in part.items():
+                self._update(hasher, name)
+                self._update(hasher, item)
+        elif callable(part) and hasattr(part, '__qualname__'):
+            function = getattr(part, '__func__', part)  # bound methods are identified by their function
+            hasher.update(f'{function.__module__}.{function.__qualname__}'.encode())
+            hasher.update(self._source_digest(function).encode())
+        elif isinstance(part, (bytes, bytearray)):
+            hasher.update(part)
+        elif isinstance(part, (str, int, float, bool)) or part is None:
+            hasher.update(repr(part).encode())
+        else:
+            hasher.update(pickle.dumps(part, protocol=4))
+
+    def _source_digest(self, function):
+        '''
+        Returns the digest of the source file of the function ('' if it has none).
+        '''
+        try:
+            source_file = inspect.getsourcefile(function)
+        except TypeError:
+            return ''
+        if source_file is None:
+            return ''
+        if source_file not in self._source_digests:
+            with open(source_file, 'rb') as file:
+                self._source_digests[source_file] = hashlib.sha256(file.read()).hexdigest()
+        return self._source_digests[source_file]
@@ -0,0 +1,287 @@
+import pandas as pd
+import numpy as np
+import warnings
+
+
+class EDAStatistics:
+    '''
+    Computes the statistics shown in the Exploratory Data Analysis part of the report in one pass over the rows,
+    streamed over chunks, so the dataset is never copied as a whole and no statistic needs a second pass:
+    - the number of rows, the non-null count and the dtype of every column (the info table),
+    - the count, mean, standard deviation, minimum and maximum of the numerical columns (merged chunk by chunk),
+    - the quartiles of the numerical columns, from a uniform sample of the rows (exact if the dataset has at most sample_size rows),
+    - a fixed-bin histogram of every numerical column, from the exact counts of its values while it has at most as many distinct
+      values as there are fine bins (integer and other discrete columns), otherwise accumulated in fine bins (bins * 64)
+      which are widened when a chunk falls outside of their range, and merged into bins bins for the plots,
+    - the counts of the values of the categorical (object, category, bool) columns with less than max_categories values.
+    The same sample of the rows is used for the KDE overlays of the histograms.
+    '''
+    FINE_BINS_PER_BIN = 64  # the histograms are accumulated in bins * 64 fine bins
+
+    def __init__(self, bins=20, sample_size=20000, chunk_size=250000, max_categories=20, random_state=42):
+        '''
+        Args:
+            - bins - the number of bins of the histograms
+            - sample_size - the number of rows sampled for the quartiles and the KDE overlays
+            - chunk_size - the number of rows processed at once by fit
+            - max_categories - the categorical columns with at least this many values are not counted (and not plotted)
+            - random_state - random seed used for the row sample
+        '''
+        self.bins = bins
+        self.sample_size = sample_size
+        self.chunk_size = chunk_size
+        self.max_categories = max_categories
+        self.random_state = random_state
+        self.n_fine_bins = bins * self.FINE_BINS_PER_BIN
+
+        self.columns = None  # all the columns, in the order of the dataset
+        self.dtypes = None  # column -> dtype name
+        self.numeric_columns = None  # the numerical (not boolean) columns, as in DataFrame.describe
+        self.n_rows = 0
+        self.non_null = None  # column -> number of non-null values
+        self.value_counts = None  # categorical column -> {value: count}, None if it has too many values
+
+    def fit(self, data):
+        '''
+        Computes the statistics of a DataFrame (processed in chunks of chunk_size rows) or of an iterable of DataFrame chunks
+        (e.g. pd.read_csv(path, chunksize=...)).
+        Returns the instance.
+        '''
+        if isinstance(data, pd.DataFrame):
+            chunks = (data.iloc[start:start + self.chunk_size] for start in range(0, max(len(data), 1), self.chunk_size))
+        else:
+            chunks = data
+        for chunk in chunks:
+            self.partial_fit(chunk)
+        return self
+
+    def partial_fit(self, chunk):
+        '''
+        Updates the statistics with the rows of the chunk (a DataFrame with the columns of the first chunk).
+        Returns the instance.
+        '''
+        if self.columns is None:
+            self._start(chunk)
+        if len(chunk) == 0:
+            return self
+
+        self.n_rows += len(chunk)
+        for column, count in chunk.count().items():
+            self.non_null[column] += int(count)
+        self._update_value_counts(chunk)
+
+        if len(self.numeric_columns) > 0:
+            values = chunk[self.numeric_columns].to_numpy(dtype=np.float64, na_value=np.nan)
+            self._update_moments(values)
+            self._update_histograms(values)
+            self._update_exact_counts(values)
+            self._update_sample(values)
+        return self
+
+    def info(self):
+        '''
+        Returns the columns, their non-null counts and dtypes (as DataFrame.info) as a DataFrame.
+        '''
+        return pd.DataFrame({
+            'Column': self.columns,
+            'Non-Null Count': [self.non_null[column] for column in self.columns],
+            'Dtype': [self.dtypes[column] for column in self.columns],
+        })
+
+    def describe(self):
+        '''
+        Returns the count, mean, std, min, 25%, 50%, 75% and max of the numerical columns (as DataFrame.describe, transposed),
+        one row per column.
+        '''
+        with np.errstate(invalid='ignore', divide='ignore'), warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)  # columns without any value
+            std = np.sqrt(self._m2 / (self._count - 1))
+            quartiles = np.nanquantile(self._sample, [0.25, 0.5, 0.75], axis=0) if len(self._sample) > 0 \
+                else np.full((3, len(self.numeric_columns)), np.nan)
+        return pd.DataFrame({
+            'count': self._count,
+            'mean': np.where(self._count > 0, self._mean, np.nan),
+            'std': np.where(self._count > 1, std, np.nan),
+            'min': self._min,
+            '25%': quartiles[0],
+            '50%': quartiles[1],
+            '75%': quartiles[2],
+            'max': self._max,
+        }, index=self.numeric_columns)
+
+    def histogram(self, column):
+        '''
+        Returns the counts and the bin edges (bins + 1 values) of the histogram of the numerical column over its range,
+        as numpy.histogram(values, bins): exactly for the columns with few distinct values, otherwise up to the values
+        in the fine bins which straddle the bin edges. Returns None if the column has no values.
+        '''
+        i = self.numeric_columns.index(column)
+        if self._count[i] == 0:
+            return None
+        low, high = self._min[i], self._max[i]
+        if low == high:
+            low, high = low - 0.5, high + 0.5
+        edges = np.linspace(low, high, self.bins + 1)
+        if self._exact_counts[i] is not None:
+            # the fine bins of a discrete column are not aligned with the edges once widened, its values are binned exactly instead
+            column_values, column_counts = self._exact_counts[i]
+            return np.histogram(column_values, bins=edges, weights=column_counts)[0], edges
+
+        # the fine bins straddling an edge are split between its two bins in proportion to their overlap (the values are assumed
+        # uniform within a fine bin): the cumulative counts at the fine edges are interpolated at the edges
+        fine_edges = self._hist_low[i] + np.arange(self.n_fine_bins + 1) * self._hist_width[i]
+        cumulative = np.concatenate([[0], np.cumsum(self._hist_counts[i])])
+        at_edges = np.interp(edges, fine_edges, cumulative)
+        at_edges[0], at_edges[-1] = 0, cumulative[-1]  # all the values lie between the minimum and the maximum
+        return np.diff(at_edges), edges
+
+    def sample(self, column):
+        '''
+        Returns the non-null values of the numerical column in the row sample (all of them if the dataset has at most sample_size rows).
+        '''
+        values = self._sample[:, self.numeric_columns.index(column)]
+        return values[~np.isnan(values)]
+
+    def categorical_columns(self):
+        '''
+        Returns the categorical columns which are plotted as bar charts: the object and category columns with less than
+        max_categories values, and the boolean columns.
+        '''
+        return [column for column, counts in self.value_counts.items() if counts is not None]
+
+    def counts(self, column):
+        '''
+        Returns the counts of the values of the categorical column as a Series, in the order in which the values appeared
+        (in the order of the categories for category columns).
+        '''
+        return pd.Series(self.value_counts[column], name=column, dtype=np.int64)
+
+    def _start(self, chunk):
+        '''
+        Initializes the statistics with the columns of the first chunk.
+        '''
+        self.columns = list(chunk.columns)
+        self.dtypes = {column: str(dtype) for column, dtype in chunk.dtypes.items()}
+        self.numeric_columns = list(chunk.select_dtypes(include='number').columns)
+        self.non_null = {column: 0 for column in self.columns}
+        self.value_counts = {column: {} for column, dtype in chunk.dtypes.items()
+                             if dtype == 'object' or dtype == 'bool' or isinstance(dtype, pd.CategoricalDtype)}
+
+        n_numeric = len(self.numeric_columns)
+        self._count = np.zeros(n_numeric, dtype=np.int64)
+        self._mean = np.zeros(n_numeric)
+        self._m2 = np.zeros(n_numeric)
+        self._min = np.full(n_numeric, np.nan)
+        self._max = np.full(n_numeric, np.nan)
+        self._hist_low = np.full(n_numeric, np.nan)  # the lower edge of the fine bins, nan until the column has a value
+        self._hist_width = np.full(n_numeric, np.nan)  # the width of the fine bins
+        self._hist_counts = np.zeros((n_numeric, self.n_fine_bins))
+        # the distinct values of a column and their counts (sorted arrays), None once it has more values than there are fine bins
+        self._exact_counts = [(np.empty(0), np.empty(0)) for _ in range(n_numeric)]
+        self._sample = np.empty((0, n_numeric))
+        self._priorities = np.empty(0)  # the sampled rows are the ones with the lowest random priorities (bottom-k sampling)
+        self._rng = np.random.default_rng(self.random_state)
+
+    def _update_value_counts(self, chunk):
+        '''
+        Adds the counts of the values of the categorical columns in the chunk, and stops counting a column once it has too many values.
+        '''
+        for column, counts in self.value_counts.items():
+            if counts is None:
+                continue
+            for value, count in chunk[column].value_counts(sort=False).items():
+                counts[value] = counts.get(value, 0) + int(count)
+            if chunk[column].dtype != 'bool' and len([count for count in counts.values() if count > 0]) >= self.max_categories:
+                self.value_counts[column] = None
+
+    def _update_moments(self, values):
+        '''
+        Merges the count, mean, sum of squared deviations, minimum and maximum of the chunk with the ones of the previous chunks.
+        '''
+        present = ~np.isnan(values)
+        count = present.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(count > 0, np.nansum(values, axis=0) / count, 0)
+            m2 = np.nansum((values - mean) ** 2, axis=0)
+            total = self._count + count
+            delta = mean - self._mean
+            self._mean = np.where(total > 0, self._mean + delta * count / total, 0)
+            self._m2 = np.where(total > 0, self._m2 + m2 + delta ** 2 * self._count * count / total, 0)
+        self._count = total
+        self._min = np.fmin(self._min, np.fmin.reduce(values, axis=0))
+        self._max = np.fmax(self._max, np.fmax.reduce(values, axis=0))
+
+    def _update_histograms(self, values):
+        '''
+        Adds the values of the chunk to the fine bins of the histograms, the fine bins of a column are widened first
+        if the chunk has values outside of their range.
+        '''
+        chunk_min, chunk_max = np.fmin.reduce(values, axis=0), np.fmax.reduce(values, axis=0)
+        for i in np.flatnonzero(~np.isnan(chunk_min)):
+            self._fit_range(i, chunk_min[i], chunk_max[i])
+
+        # the fine bins of all the columns are counted with one bincount
+        with np.errstate(invalid='ignore'):
+            positions = np.floor((values - self._hist_low) / self._hist_width)
+        present = ~np.isnan(positions)
+        positions = np.clip(positions, 0, self.n_fine_bins - 1)
+        positions += np.arange(len(self.numeric_columns)) * self.n_fine_bins
+        self._hist_counts += np.bincount(positions[present].astype(np.int64),
+                                         minlength=self._hist_counts.size).reshape(self._hist_counts.shape)
+
+    def _update_exact_counts(self, values):
+        '''
+        Merges the counts of the distinct values of the chunk with the ones of the previous chunks, for the columns which
+        have at most n_fine_bins distinct values so far.
+        '''
+        for i, exact_counts in enumerate(self._exact_counts):
+            if exact_counts is None:
+                continue
+            seen_values, seen_counts = exact_counts
+            chunk_counts = pd.Series(values[:, i]).value_counts(sort=False)  # hashed, faster than sorting the column
+            if len(chunk_counts) <= self.n_fine_bins:
+                merged_values, positions = np.unique(np.concatenate([seen_values, chunk_counts.index.to_numpy(dtype=np.float64)]), return_inverse=True)
+            if len(chunk_counts) > self.n_fine_bins or len(merged_values) > self.n_fine_bins:
+                self._exact_counts[i] = None  # the fine bins are used from now on
+                continue
+            self._exact_counts[i] = (merged_values, np.bincount(positions, weights=np.concatenate([seen_counts, chunk_counts.to_numpy()]),
+                                                                minlength=len(merged_values)))
+
+    def _fit_range(self, i, low, high):
+        '''
+        Makes the fine bins of the column i cover the range [low, high]. The first values of a column set the range,
+        then every widening merges pairs of fine bins and doubles the covered range to the side of the new values.
+        '''
+        n = self.n_fine_bins
+        if np.isnan(self._hist_low[i]):
+            if high > low:
+                self._hist_low[i], self._hist_width[i] = low, (high - low) / n
+            else:
+                self._hist_low[i], self._hist_width[i] = low - 0.5, 1 / n
+            return
+
+        while low < self._hist_low[i] or high > self._hist_low[i] + n * self._hist_width[i]:
+            merged = self._hist_counts[i].reshape(n // 2, 2).sum(axis=1)
+            empty = np.zeros(n // 2)
+            if low < self._hist_low[i]:
+                self._hist_counts[i] = np.concatenate([empty, merged])
+                self._hist_low[i] -= n * self._hist_width[i]
+            else:
+                self._hist_counts[i] = np.concatenate([merged, empty])
+            self._hist_width[i] *= 2
+
+    def _update_sample(self, values):
+        '''
+        Keeps the sample_size rows with the lowest random priorities among the sampled rows and the rows of the chunk,
+        which is a uniform sample of all the rows seen so far.
+        '''
+        priorities = self._rng.random(len(values))
+        if len(self._priorities) == self.sample_size:
+            # only the rows with a lower priority than the highest sampled one can enter the sample
+            candidates = priorities < self._priorities.max()
+            values, priorities = values[candidates], priorities[candidates]
+        self._sample = np.concatenate([self._sample, values])
+        self._priorities = np.concatenate([self._priorities, priorities])
+        if len(self._priorities) > self.sample_size:
+            kept = np.argpartition(self._priorities, self.sample_size - 1)[:self.sample_size]
+            self._sample, self._priorities = self._sample[kept], self._priorities[kept]
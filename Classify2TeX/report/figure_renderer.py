@@ -0,0 +1,105 @@
+from concurrent.futures import Future, ProcessPoolExecutor
+import os
+import weakref
+
+
+def _start_worker():
+    '''
+    Runs in every worker process before its first job: the figures are only saved to files, so the non-interactive Agg backend
+    is used (the jobs drawing with pyplot, e.g. the SHAP plots, would otherwise use the backend of the main process).
+    '''
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+class FigureRenderer:
+    '''
+    Renders the figures of the report as independent jobs in a pool of worker processes, so that drawing and saving
+    the PNG files overlaps with the work of the main process (the model selection, the SHAP values, the LaTeX document).
+
+    A job is a picklable function (a module level function, a static method or a method of a picklable object)
+    which saves one figure to its path, e.g. PlotGenerator().generate_histograms. Each job is identified by the path of its figure,
+    result(path) waits for the job and returns its result, or raises the exception raised by the job.
+
+    The workers are forked (on Linux) when the first job is submitted, so the renderer should be used before the models are trained.
+    On platforms which start the workers with spawn (Windows, macOS), the script running Classify2TeX must be guarded with
+    if __name__ == '__main__', or n_jobs=0 should be used.
+    '''
+    def __init__(self, n_jobs=2):
+        '''
+        Args:
+            - n_jobs - the number of worker processes, 0 renders every figure in the main process when it is submitted
+        '''
+        self.n_jobs = n_jobs
+        self.futures = {}  # path of the figure -> Future of the job saving it
+        self.keys = {}  # path of the figure -> its key in the manifest (for the figures submitted with a manifest)
+        self._to_record = {}  # path of the figure -> manifest, where its key is recorded once the figure is saved
+        self._executor = None
+
+    def submit(self, path, function, *args, reuse=False, manifest=None, key=None, **kwargs):
+        '''
+        Submits the job function(*args, **kwargs), which saves the figure to path.
+        If reuse is True and a job saving the same path was already submitted, it is not submitted again.
+        If manifest (ArtifactManifest) is given, the figure is not rendered again when the file at path was rendered
+        from the same function and arguments (or with the same key, if the key is given instead of hashing the arguments),
+        the result of the job is then the path.
+        Returns the Future of the job.
+        '''
+        if reuse and path in self.futures:
+            return self.futures[path]
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        if manifest is not None:
+            key = key if key is not None else manifest.key(function, args, kwargs)
+            self.keys[path] = key
+            if manifest.is_current(path, key):
+                self._to_record.pop(path, None)
+                future = Future()
+                future.set_result(path)
+                self.futures[path] = future
+                return future
+
+        if self.n_jobs == 0:
+            future = Future()
+            try:
+                future.set_result(function(*args, **kwargs))
+            except Exception as exception:
+                future.set_exception(exception)
+        else:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.n_jobs, initializer=_start_worker)
+                # the workers are stopped at the latest when the renderer is collected or the program exits
+                weakref.finalize(self, self._executor.shutdown, wait=False, cancel_futures=True)
+            future = self._executor.submit(function, *args, **kwargs)
+
+        if manifest is not None:
+            self._to_record[path] = manifest  # the key is recorded only when the figure was saved, see _record
+        self.futures[path] = future
+        return future
+
+    def result(self, path):
+        '''
+        Waits until the figure saved to path is rendered and returns the result of its job.
+        '''
+        result = self.futures[path].result()
+        self._record(path)
+        return result
+
+    def shutdown(self):
+        '''
+        Waits for all the submitted jobs and stops the worker processes (they are started again by the next submit).
+        '''
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        for path in list(self._to_record):
+            if self.futures[path].exception() is None:
+                self._record(path)
+
+    def _record(self, path):
+        '''
+        Records the key of the rendered figure in its manifest (if it was submitted with one and the file was saved).
+        '''
+        manifest = self._to_record.pop(path, None)
+        if manifest is not None and os.path.exists(path):
+            manifest.record(path, self.keys[path])
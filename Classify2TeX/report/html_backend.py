@@ -0,0 +1,138 @@
+from contextlib import contextmanager
+import base64
+import html
+import os
+import re
+import time
+from .report_backend import ReportBackend
+
+
+class HTMLBackend(ReportBackend):
+    '''
+    Writes the report as one self-contained HTML page: the figures are embedded as base64 PNG images and the style is inline,
+    so the file can be opened or sent without the Results folder, and no LaTeX toolchain is needed.
+
+    The sections are numbered as in LaTeX and the table of contents is built when the page is written.
+    The LaTeX texts of the report are converted by latex_to_html, the formulas are shown as text (e.g. (a) / (b) for \\frac{a}{b}).
+    '''
+    FORMAT = 'html'
+    STYLE = '''
+        body { font-family: "Latin Modern Roman", Georgia, serif; max-width: 1000px; margin: 2em auto; padding: 0 1em; line-height: 1.45; }
+        h1 { text-align: center; } .author { text-align: center; font-style: italic; }
+        table { border-collapse: collapse; margin: 0.5em auto; font-size: 0.85em; }
+        th, td { border: 1px solid #999; padding: 2px 6px; text-align: center; }
+        figure { margin: 1em 0; text-align: center; overflow-x: auto; } figcaption { margin: 0.3em; }
+        img { max-width: 100%; } .math { font-family: monospace; text-align: center; margin: 0.6em; }
+        nav ul { list-style: none; } nav li { margin: 0.15em 0; }
+    '''
+    TOC_MARKER = '<!-- table of contents -->'
+
+    def __init__(self, directory):
+        '''
+        Args:
+            - directory - the directory of the report, e.g. Results/<dataset_name>, the figures are read from it
+        '''
+        super().__init__(directory)
+        self.parts = []  # the HTML of the body
+        self.page_title = ''
+        self.headings = []  # (level, number, title, id) of the sections, for the table of contents
+        self._section_numbers = [0, 0, 0]
+        self._n_tables = 0
+        self._n_figures = 0
+
+    def title(self, title, author):
+        self.page_title = title
+        self.parts.append(f'<h1>{html.escape(title)}</h1>\n<p class="author">{html.escape(author)}</p>')
+
+    def table_of_contents(self):
+        self.parts.append(self.TOC_MARKER)
+
+    def new_page(self):
+        pass  # one page
+
+    @contextmanager
+    def section(self, title, level=0):
+        self._section_numbers[level] += 1
+        self._section_numbers[level + 1:] = [0] * (len(self._section_numbers) - level - 1)
+        number = '.'.join(str(n) for n in self._section_numbers[:level + 1])
+        anchor = 'section-' + number.replace('.', '-')
+        self.headings.append((level, number, title, anchor))
+        self.parts.append(f'<h{level + 2} id="{anchor}">{number} {html.escape(title)}</h{level + 2}>')
+        yield
+
+    def text(self, content):
+        self.parts.append(f'<p>{self.latex_to_html(content)}</p>')
+
+    def note(self, text, link=None):
+        content = html.escape(text)
+        if link is not None:
+            content += f' <a href="{html.escape(link)}">{html.escape(link)}</a>'
+        self.parts.append(f'<p>{content}.</p>')
+
+    def table(self, df, caption, num_after_dot=2, index=True):
+        self._n_tables += 1
+        table = df.round(num_after_dot).rename_axis('Index').to_html(index=index, border=0, na_rep='nan', escape=True)
+        self.parts.append(f'<figure><figcaption>Table {self._n_tables}: {html.escape(caption)}</figcaption>\n{table}</figure>')
+
+    def figure(self, path, caption, width):
+        self._n_figures += 1
+        with open(os.path.join(self.directory, path), 'rb') as file:
+            image = base64.b64encode(file.read()).decode('ascii')
+        width_px = round(float(width.rstrip('px')) * 4 / 3)  # the px of LaTeX are 1/72 in, the ones of CSS 1/96 in
+        self.parts.append(f'<figure><img src="data:image/png;base64,{image}" width="{width_px}" alt="{html.escape(caption)}">'
+                          f'<figcaption>Figure {self._n_figures}: {html.escape(caption)}</figcaption></figure>')
+
+    def dumps(self):
+        toc = '\n'.join(f'<li style="margin-left: {level * 1.5}em"><a href="#{anchor}">{number} {html.escape(title)}</a></li>'
+                        for level, number, title, anchor in self.headings)
+        body = '\n'.join(self.parts).replace(self.TOC_MARKER, f'<nav><h2>Contents</h2>\n<ul>\n{toc}\n</ul></nav>')
+        return '\n'.join([
+            '<!DOCTYPE html>',
+            '<html lang="en">',
+            f'<head><meta charset="utf-8"><title>{html.escape(self.page_title)}</title><style>{self.STYLE}</style></head>',
+            f'<body>\n{body}\n<footer><p class="author">Generated by Classify2TeX on {time.strftime("%Y-%m-%d %H:%M")}</p></footer>\n</body>',
+            '</html>',
+        ])
+
+    def write(self, filepath):
+        path = f'{filepath}.{self.FORMAT}'
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(self.dumps())
+        return path
+
+    # the escapes of pylatex.utils.escape_latex and the symbols of the texts, after html.escape
+    SYMBOLS = [(r'\textbackslash{}', '\x00'), (r'\textasciitilde{}', '~'), (r'\^{}', '^'), ('{-}', '-'), ('{[}', '['), ('{]}', ']'),
+               (r'\&amp;', '&amp;'), (r'\%', '%'), (r'\$', '$'), (r'\#', '#'), (r'\_', '_'), (r'\{', '{'), (r'\}', '}'),
+               (r'\cdot', '&middot;'), (r'\,', ' '), (r'\newline', '<br>'), ('\\\\', '<br>'), (r'\par', '<br>')]
+
+    def latex_to_html(self, content):
+        '''
+        Converts a text in the LaTeX subset of the report to HTML.
+        '''
+        content = html.escape(content, quote=False)
+        content = re.sub(r'\\\[(.*?)\\\]', lambda match: f'<div class="math">{self._math_to_html(match.group(1))}</div>', content, flags=re.S)
+        content = re.sub(r'\\\((.*?)\\\)', lambda match: f'<span class="math">{self._math_to_html(match.group(1))}</span>', content, flags=re.S)
+        for environment, tag in [('itemize', 'ul'), ('enumerate', 'ol')]:
+            content = content.replace(rf'\begin{{{environment}}}', f'<{tag}>').replace(rf'\end{{{environment}}}', f'</{tag}>')
+        content = content.replace(r'\item', '<li>')
+        content = re.sub(r'\\subsection\*\{([^{}]*)\}', r'<h4>\1</h4>', content)
+        content = re.sub(r'\\textbf\{([^{}]*)\}', r'<b>\1</b>', content)
+        content = re.sub(r'\\hspace\{[^{}]*\}', '', content)
+        for latex, text in self.SYMBOLS:
+            content = content.replace(latex, text)
+        content = content.replace('\x00', '\\')  # the escaped backslashes, replaced last so they are not read as commands
+        return re.sub(r'\n\s*\n', '</p>\n<p>', content.strip())  # the empty lines separate the paragraphs
+
+    def _math_to_html(self, formula):
+        '''
+        Converts a formula to text: \\text{a} to a, \\frac{a}{b} to (a) / (b), \\int_{a}^{b} to the integral sign
+        with a subscript and a superscript.
+        '''
+        formula = re.sub(r'\\text\{([^{}]*)\}', r'\1', formula)
+        formula = formula.replace(r'\cdot', '&middot;').replace(r'\int', '&int;').replace(r'\,', ' ')
+        while re.search(r'\\frac\{([^{}]*)\}\{([^{}]*)\}', formula):
+            formula = re.sub(r'\\frac\{([^{}]*)\}\{([^{}]*)\}', r'(\1) / (\2)', formula)
+        formula = re.sub(r'_\{([^{}]*)\}', r'<sub>\1</sub>', formula)
+        formula = re.sub(r'\^\{([^{}]*)\}', r'<sup>\1</sup>', formula)
+        formula = formula.replace(r'\{', '{').replace(r'\}', '}')
+        return ' '.join(formula.split())
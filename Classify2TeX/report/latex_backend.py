@@ -0,0 +1,76 @@
+from pylatex import Command, Document, Package, Section, Subsection, Subsubsection, Figure
+from pylatex.utils import NoEscape, escape_latex
+from contextlib import contextmanager
+from .report_backend import ReportBackend
+from .latex_table import LatexTableWriter
+
+
+class LatexBackend(ReportBackend):
+    '''
+    Writes the report as a pylatex document (doc) with small margins, the tables are longtables (see LatexTableWriter).
+    The document is compiled to PDF by PDFCompiler, write only writes the .tex file.
+    '''
+    FORMAT = 'tex'
+    SECTIONS = [Section, Subsection, Subsubsection]
+
+    def __init__(self, directory, table_writer=None):
+        '''
+        Args:
+            - directory - the directory of the report, e.g. Results/<dataset_name>
+            - table_writer - the LatexTableWriter of the tables, LatexTableWriter() if None
+        '''
+        super().__init__(directory)
+        self.table_writer = table_writer if table_writer is not None else LatexTableWriter()
+        self.doc = Document()
+
+        # small margins, to make the report more compact
+        self.doc.packages.append(Command('usepackage', 'geometry'))
+        self.doc.packages.append(Command('geometry', 'margin=0.2in'))
+        # the formulas and the lists of the descriptions
+        self.doc.preamble.append(NoEscape(r'\usepackage{amsmath}'))
+        self.doc.preamble.append(NoEscape(r'\usepackage{amssymb}'))
+        self.doc.preamble.append(NoEscape(r'\usepackage{enumitem}'))
+
+    def title(self, title, author):
+        self.doc.preamble.append(Command('title', title))
+        self.doc.preamble.append(Command('author', author))
+        self.doc.append(NoEscape(r'\maketitle'))
+        self.new_page()
+
+    def table_of_contents(self):
+        self.doc.append(NoEscape(r'\tableofcontents'))
+        self.new_page()
+
+    def new_page(self):
+        self.doc.append(NoEscape(r'\newpage'))
+
+    @contextmanager
+    def section(self, title, level=0):
+        with self.doc.create(self.SECTIONS[level](title)):
+            yield
+
+    def text(self, content):
+        self.doc.append(NoEscape(content))
+
+    def note(self, text, link=None):
+        content = r'\par ' + escape_latex(text)
+        if link is not None:
+            self.doc.packages.append(Package('hyperref'))
+            content += rf' \href{{run:{link}}}{{{escape_latex(link)}}}'
+        self.doc.append(NoEscape(content + '.'))
+
+    def table(self, df, caption, num_after_dot=2, index=True):
+        self.doc.packages.append(Package('longtable'))
+        self.doc.append(NoEscape(self.table_writer.to_latex(df, caption, num_after_dot=num_after_dot, index=index)))
+
+    def figure(self, path, caption, width):
+        with self.doc.create(Figure(position='h!')) as fig:
+            fig.add_image(path, width=width)
+            fig.add_caption(caption)
+
+    def dumps(self):
+        return self.doc.dumps()
+
+    def write(self, filepath):
+        self.doc.generate_tex(filepath)
+        return f'{filepath}.{self.FORMAT}'
@@ -0,0 +1,101 @@
+from pylatex.utils import escape_latex
+import pandas as pd
+import numpy as np
+
+
+class LatexTableWriter:
+    '''
+    Writes a DataFrame as LaTeX longtables in one string, which is appended to the document at once
+    (instead of adding the rows one by one through pylatex Tabular.add_row).
+    The values are rounded, converted to strings and escaped column by column with vectorized numpy/pandas operations,
+    and the rows are joined column by column as well, so the cost does not grow with a Python loop over the cells.
+
+    A longtable breaks across pages, its header is repeated on every page. A table with more than max_columns columns
+    is split into several longtables, each with the index column and at most max_columns of the other columns,
+    the next parts have the same caption (unnumbered) marked as continued.
+    '''
+    # the characters escaped by pylatex, with the same replacements
+    ESCAPES = str.maketrans({char: str(escape_latex(char)) for char in '&%$#_{}~^\\\n-\xa0[]'})
+
+    def __init__(self, max_columns=9):
+        '''
+        Args:
+            - max_columns - the maximum number of columns (without the index column) of one longtable
+        '''
+        self.max_columns = max_columns
+
+    def to_latex(self, df, caption, num_after_dot=2, index=True, index_name='Index'):
+        '''
+        Returns the LaTeX code of the longtables showing the DataFrame (it needs the longtable package).
+
+        Args:
+            df: The DataFrame to be written.
+            caption: The caption of the table (it is escaped).
+            num_after_dot: The number of decimal places of the float values.
+            index: If True, the first column of every part is the index of the DataFrame.
+            index_name: The header of the index column.
+        '''
+        cells = self.format(df, num_after_dot)
+        header = pd.Series([str(column) for column in df.columns], dtype=object).str.translate(self.ESCAPES)
+        index_cells = self.format_column(df.index.to_series(), num_after_dot) if index else None
+        caption = str(escape_latex(caption))
+
+        parts = []
+        for start in range(0, max(len(df.columns), 1), self.max_columns):
+            columns = list(range(start, min(start + self.max_columns, len(df.columns))))
+            part_header = [str(escape_latex(index_name))] * index + list(header.iloc[columns])
+            part_cells = ([index_cells] if index else []) + [cells[i] for i in columns]
+            part_caption = rf'\caption{{{caption}}}' if start == 0 else rf'\caption*{{{caption} (continued)}}'
+            parts.append(self._longtable(part_header, part_cells, part_caption))
+        return '\n'.join(parts)
+
+    def format(self, df, num_after_dot=2):
+        '''
+        Returns the escaped string values of the columns of the DataFrame, a list of Series (one per column, with a RangeIndex).
+        '''
+        return [self.format_column(df.iloc[:, i], num_after_dot) for i in range(len(df.columns))]
+
+    def format_column(self, values, num_after_dot=2):
+        '''
+        Returns the values of the column as escaped strings (a Series with a RangeIndex): the floats are rounded to num_after_dot
+        decimal places, the other values are converted with str, as pylatex does.
+        '''
+        values = values.reset_index(drop=True)
+        if pd.api.types.is_float_dtype(values.dtype):
+            strings = pd.Series(np.round(values.to_numpy(dtype=np.float64), num_after_dot).astype(str), dtype=object)
+            return strings.str.replace('-', '{-}', regex=False)  # the only special character of the numbers
+        if pd.api.types.is_bool_dtype(values.dtype) or pd.api.types.is_integer_dtype(values.dtype):
+            return values.astype(str).astype(object).str.replace('-', '{-}', regex=False)
+
+        # mixed columns (e.g. max_depth: None or a number), only the float values are rounded
+        floats = values.map(type).isin([float, np.float64, np.float32]).to_numpy()
+        if floats.any():
+            values = values.astype(object)
+            values[floats] = np.round(values[floats].to_numpy(dtype=np.float64), num_after_dot)
+        strings = values.astype(str).astype(object)
+        # the values of such columns repeat, every distinct value is escaped once
+        codes, uniques = pd.factorize(strings)
+        return pd.Series(pd.Series(uniques, dtype=object).str.translate(self.ESCAPES).to_numpy()[codes], dtype=object)
+
+    def _longtable(self, header, cells, caption):
+        '''
+        Returns one longtable with the header and the columns of cells (Series of escaped strings).
+        '''
+        header_row = ' & '.join(header) + r' \\ \hline'
+        if len(cells[0]) > 0:
+            rows = cells[0].str.cat(cells[1:], sep=' & ') if len(cells) > 1 else cells[0]
+            body = (rows + r' \\ \hline').str.cat(sep='\n')
+        else:
+            body = ''
+        return '\n'.join([
+            r'\begin{longtable}{' + '|c' * len(header) + '|}',
+            caption + r' \\',
+            r'\hline',
+            header_row,
+            r'\endfirsthead',
+            r'\hline',
+            header_row,
+            r'\endhead',
+            body,
+            r'\end{longtable}',
+        ])
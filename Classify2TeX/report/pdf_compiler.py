@@ -0,0 +1,97 @@
+from concurrent.futures import ThreadPoolExecutor
+from pylatex.errors import CompilerError
+import os
+import subprocess
+import time
+
+
+class PDFCompiler:
+    '''
+    Compiles LaTeX documents to PDF in background subprocesses, so the program does not wait for the LaTeX compiler
+    (which runs several times because of the table of contents).
+
+    submit writes the .tex file at once (the document may change afterwards) and returns a Future of the compilation.
+    The compilations run in a pool of max_workers threads, each one waiting for its compiler subprocess, so at most
+    max_workers documents are compiled at the same time; one PDFCompiler can be shared by the reports of several datasets.
+
+    As pylatex, latexmk is used if it is installed, pdflatex otherwise (run until the cross-references are stable).
+    The log of the compiler (<filepath>.log) is kept next to the PDF, the other auxiliary files are removed.
+    The result of a compilation is a dict with the paths of the PDF and the log, the compiler, the number of pdflatex passes
+    (None with latexmk) and the wall time in seconds.
+    '''
+    COMPILERS = (('latexmk', ['--pdf']), ('pdflatex', []))
+    MAX_PASSES = 3  # the maximum number of pdflatex runs
+    AUXILIARY_EXTENSIONS = ['aux', 'out', 'fls', 'fdb_latexmk', 'toc']
+
+    def __init__(self, max_workers=2, compiler=None):
+        '''
+        Args:
+            - max_workers - the maximum number of documents compiled at the same time
+            - compiler - 'latexmk' or 'pdflatex', None uses the first one which is installed
+        '''
+        self.max_workers = max_workers
+        self.compiler = compiler
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='PDFCompiler')
+
+    def submit(self, doc, filepath):
+        '''
+        Writes the document (pylatex Document) to <filepath>.tex and starts its compilation to <filepath>.pdf.
+        Returns the Future of the compilation, its result is the dict described in the class docstring,
+        or it raises CompilerError (pylatex) if the compilation failed.
+        '''
+        filepath = os.path.abspath(filepath)
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        doc.generate_tex(filepath)
+        return self._executor.submit(self.compile, filepath)
+
+    def compile(self, filepath):
+        '''
+        Compiles <filepath>.tex to <filepath>.pdf and waits for it. Returns the result dict (see the class docstring).
+        '''
+        start = time.perf_counter()
+        log_path = filepath + '.log'
+        compilers = [(name, arguments) for name, arguments in self.COMPILERS if self.compiler in (None, name)]
+
+        for name, arguments in compilers:
+            command = [name] + arguments + ['--interaction=nonstopmode', filepath + '.tex']
+            passes = 0
+            try:
+                while True:
+                    passes += 1
+                    output = subprocess.run(command, cwd=os.path.dirname(filepath), stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+                    if output.returncode != 0:
+                        tail = '\n'.join(output.stdout.decode(errors='replace').splitlines()[-20:])
+                        raise CompilerError(f'{name} failed to compile {filepath}.tex, see the log {log_path}:\n{tail}')
+                    if name == 'latexmk' or passes == self.MAX_PASSES or (passes > 1 and not self._needs_rerun(log_path)):
+                        break  # latexmk runs pdflatex as many times as needed itself
+            except FileNotFoundError:
+                continue  # the compiler is not installed, the next one is tried
+
+            for extension in self.AUXILIARY_EXTENSIONS:
+                if os.path.exists(f'{filepath}.{extension}'):
+                    os.remove(f'{filepath}.{extension}')
+            return {
+                'pdf': filepath + '.pdf',
+                'log': log_path,
+                'compiler': name,
+                'passes': passes if name == 'pdflatex' else None,
+                'wall_time_s': round(time.perf_counter() - start, 3),
+            }
+
+        raise CompilerError('No LaTeX compiler was found, make sure latexmk or pdflatex is installed.')
+
+    def shutdown(self, wait=True):
+        '''
+        Stops the pool, if wait is True after the submitted compilations finish.
+        '''
+        self._executor.shutdown(wait=wait)
+
+    def _needs_rerun(self, log_path):
+        '''
+        Returns True if the log of pdflatex asks for another run (the labels, the table of contents or the page count changed).
+        '''
+        if not os.path.exists(log_path):
+            return False
+        with open(log_path, errors='replace') as file:
+            log = file.read()
+        return 'Rerun to get' in log or 'Label(s) may have changed' in log or 'Rerun LaTeX' in log
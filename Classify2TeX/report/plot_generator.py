@@ -1,22 +1,42 @@
-import seaborn as sns
-import matplotlib.pyplot as plt
 import pandas as pd
 import numpy as np
 import os
+from .eda_statistics import EDAStatistics
 
 
 class PlotGenerator:
-    def generate_histograms(self, data, dataset_name):
+    '''
+    Draws the figures of the report with the object-oriented matplotlib API on Agg canvases, without the global state of pyplot,
+    so every method is an independent job which can run in a worker process (see FigureRenderer).
+    Every method saves its figure and returns the path of the PNG file (None if there is nothing to plot).
+    matplotlib, seaborn and scipy are imported by the methods using them, so importing the module (e.g. to pickle a job) is cheap.
+    '''
+    def new_figure(self, n_rows, n_cols, figsize, **kwargs):
+        '''
+        Returns a new figure with an Agg canvas and its axes.
+        '''
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        fig = Figure(figsize=figsize)
+        FigureCanvasAgg(fig)
+        axes = fig.subplots(n_rows, n_cols, squeeze=False, **kwargs)
+        return fig, axes
+
+    def generate_histograms(self, data, dataset_name, statistics=None):
         """
         Generate histograms for all columns in the dataframe.
+        The bins are counted by EDAStatistics in one pass over the rows, only the KDE overlays are estimated on its sample of the rows.
 
         Args:
             data: The dataset to generate histograms for.
+            statistics: EDAStatistics of the dataset (computed here if None).
 
         """
         self.dataset_name = dataset_name
+        statistics = statistics if statistics is not None else EDAStatistics().fit(data)
         # Select only numeric columns
-        numeric_columns = data.select_dtypes(include='number').columns
+        numeric_columns = statistics.numeric_columns
 
         if len(numeric_columns) == 0:
             return None
@@ -26,46 +46,61 @@ class PlotGenerator:
         n_rows = (len(numeric_columns) + n_cols - 1) // n_cols  # Calculate number of rows
 
         # Creating subplots
-        fig, axes = plt.subplots(n_rows, n_cols, figsize=(n_cols * 6, n_rows * 6))
+        fig, axes = self.new_figure(n_rows, n_cols, figsize=(n_cols * 6, n_rows * 6))
 
         # Flatten the axes array in case there are multiple rows
         axes = axes.flatten()
 
         # Plotting histograms for each numeric column
         for i, column in enumerate(numeric_columns):
-            sns.histplot(data[column], kde=True, ax=axes[i], color='blue', bins=20)
+            self.plot_histogram(statistics, column, axes[i])
             axes[i].set_title(column, fontsize=16)  
             axes[i].tick_params(axis='both', labelsize=14)  
-            axes[i].set_xlabel(axes[i].get_xlabel(), fontsize=14)  
-            axes[i].set_ylabel(axes[i].get_ylabel(), fontsize=14)
+            axes[i].set_xlabel(column, fontsize=14)  
+            axes[i].set_ylabel('Count', fontsize=14)
 
         # Turn off axes for any unused subplots
         for j in range(i + 1, len(axes)):
             axes[j].axis('off')
 
         # save to EDA
+        path = f'Results/{self.dataset_name}/EDA/histograms.png'
         os.makedirs(f'Results/{self.dataset_name}/EDA', exist_ok=True)
-        plt.savefig(f'Results/{self.dataset_name}/EDA/histograms.png', bbox_inches='tight', pad_inches=0)
-        plt.close()
-        
-        return plt
+        fig.savefig(path, bbox_inches='tight', pad_inches=0)
+
+        return path
     
 
-    def generate_bar_charts(self, data, dataset_name):
+    def plot_histogram(self, statistics, column, ax):
+        """
+        Plots the histogram of the column from its precomputed bins, with the KDE estimated on the sample of the rows
+        and scaled to the counts (as seaborn's histplot with kde=True).
+        """
+        histogram = statistics.histogram(column)
+        if histogram is None:
+            return
+        counts, edges = histogram
+        ax.bar(edges[:-1], counts, width=np.diff(edges), align='edge', color='blue', alpha=0.75, edgecolor='black', linewidth=0.5)
+
+        sample = statistics.sample(column)
+        if len(sample) > 1 and sample.min() < sample.max():
+            from scipy.stats import gaussian_kde
+            grid = np.linspace(sample.min(), sample.max(), 200)
+            density = gaussian_kde(sample)(grid)
+            ax.plot(grid, density * statistics.non_null[column] * (edges[1] - edges[0]), color='blue')
+
+    def generate_bar_charts(self, data, dataset_name, statistics=None):
         """
         Generate bar plots for categorical columns in the dataframe.
 
         Args:
             data: The dataset to generate bar plots for.
+            statistics: EDAStatistics of the dataset (computed here if None), it has the counts of the categorical columns.
 
         """
         self.dataset_name = dataset_name
-        categorical_columns = []
-        for column in data.columns:
-            if (data[column].dtype == 'object' and data[column].nunique() < 20) or \
-               (data[column].dtype == 'category' and data[column].nunique() < 20) or \
-               (data[column].dtype == 'bool'):
-                categorical_columns.append(column)
+        statistics = statistics if statistics is not None else EDAStatistics().fit(data)
+        categorical_columns = statistics.categorical_columns()
 
         if len(categorical_columns) == 0:
             return None
@@ -75,32 +110,34 @@ class PlotGenerator:
         n_rows = (len(categorical_columns) + n_cols - 1) // n_cols  # Calculate number of rows
 
         # Creating subplots
-        fig, axes = plt.subplots(n_rows, n_cols, figsize=(n_cols * 5.8, n_rows * 5.8))
+        fig, axes = self.new_figure(n_rows, n_cols, figsize=(n_cols * 5.8, n_rows * 5.8))
 
         # Flatten the axes array in case there are multiple rows
         axes = axes.flatten()
 
         # Plotting bar plots for each categorical column
+        import seaborn as sns
         for i, column in enumerate(categorical_columns):
-            sns.countplot(x=data[column], ax=axes[i], color='#BD1052')  
+            counts = statistics.counts(column)
+            sns.barplot(x=counts.index.astype(str), y=counts.to_numpy(), ax=axes[i], color='#BD1052')
             axes[i].set_title(column, fontsize=16)  
             axes[i].tick_params(axis='x', rotation=45, labelsize=14)  
             axes[i].tick_params(axis='y', labelsize=14)  
-            axes[i].set_xlabel(axes[i].get_xlabel(), fontsize=14)  
-            axes[i].set_ylabel(axes[i].get_ylabel(), fontsize=14)  
+            axes[i].set_xlabel(column, fontsize=14)  
+            axes[i].set_ylabel('count', fontsize=14)  
 
         # Turn off axes for any unused subplots
         for j in range(i + 1, len(axes)):
             axes[j].axis('off')
 
-        plt.subplots_adjust(hspace=0.4, wspace=0.4)
+        fig.subplots_adjust(hspace=0.4, wspace=0.4)
 
         # Save to EDA
+        path = f'Results/{self.dataset_name}/EDA/bar_charts.png'
         os.makedirs(f'Results/{self.dataset_name}/EDA', exist_ok=True)
-        plt.savefig(f'Results/{self.dataset_name}/EDA/bar_charts.png', bbox_inches='tight', pad_inches=0)
-        plt.close()
-        
-        return plt
+        fig.savefig(path, bbox_inches='tight', pad_inches=0)
+
+        return path
     
     def generate_box_plots_metrics(self, metrics, dataset_name):
         """
@@ -108,9 +145,11 @@ class PlotGenerator:
         """
         self.dataset_name = dataset_name
 
+        import seaborn as sns
         model_order = ['Decision Tree', 'Random Forest', 'XGBoost']
         # Create a figure with 3 subplots (1 row, 3 columns)
-        fig, axes = plt.subplots(1, 3, figsize=(18, 6))
+        fig, axes = self.new_figure(1, 3, figsize=(18, 6))
+        axes = axes[0]
 
         # Create boxplot for 'accuracy' on the first subplot
         sns.boxplot(x='model', y='accuracy', data=metrics, color='#0A6CF1', linewidth=2, fliersize=6, ax=axes[0], order=model_order)
@@ -134,24 +173,26 @@ class PlotGenerator:
         axes[2].set_ylabel('ROC AUC', fontsize=14)
 
         # Adjust layout for better spacing between plots
-        plt.tight_layout()
+        fig.tight_layout()
 
         # Save to Results
+        path = f'Results/{self.dataset_name}/ModelOptimization/box_plots_metrics.png'
         os.makedirs(f'Results/{self.dataset_name}/ModelOptimization', exist_ok=True)
-        plt.savefig(f'Results/{self.dataset_name}/ModelOptimization/box_plots_metrics.png', bbox_inches='tight', pad_inches=0)
-        plt.close()
+        fig.savefig(path, bbox_inches='tight', pad_inches=0)
 
-        return plt
+        return path
      
     def generate_barplots_max_metric(self, data, dataset_name):
         """
         Generate bar plots for the maximum value of each metric by model.
         """
+        import seaborn as sns
         self.dataset_name = dataset_name
         metrics = ['accuracy', 'f1', 'roc_auc']
         max_metrics = {metric: data.groupby("model")[metric].max().reset_index() for metric in metrics}
 
-        fig, axes = plt.subplots(1, 3, figsize=(15, 5), sharey=True)
+        fig, axes = self.new_figure(1, 3, figsize=(15, 5), sharey=True)
+        axes = axes[0]
 
         # Create bar plots for each metric
         for ax, metric, color in zip(axes, metrics, ['#BD1052', '#BD1052', '#BD1052']):
@@ -177,14 +218,14 @@ class PlotGenerator:
                         fontsize=10, weight='bold', color="black"
                     )
 
-        plt.tight_layout()
+        fig.tight_layout()
 
         # Save to Results
+        path = f'Results/{self.dataset_name}/ModelOptimization/barplots_max_metric.png'
         os.makedirs(f'Results/{self.dataset_name}/ModelOptimization', exist_ok=True)
-        plt.savefig(f'Results/{self.dataset_name}/ModelOptimization/barplots_max_metric.png', bbox_inches='tight', pad_inches=0)
-        plt.close()
+        fig.savefig(path, bbox_inches='tight', pad_inches=0)
 
-        return plt
+        return path
 
 
         
@@ -0,0 +1,83 @@
+from contextlib import contextmanager
+
+
+class ReportBackend:
+    '''
+    The interface of the documents written by ReportGenerator. ReportGenerator decides what the report contains
+    (sections, texts, tables, figures), a backend writes it in its format: LatexBackend (a pylatex document compiled to PDF)
+    or HTMLBackend (a self-contained HTML page, without LaTeX).
+
+    The texts are given in the small subset of LaTeX used by the report (\\textbf, \\[ \\] formulas, itemize/enumerate,
+    \\subsection*, the escapes of pylatex.utils.escape_latex...), every backend renders them in its format.
+    The paths of the figures are relative to the directory of the report (Results/<dataset_name>).
+    '''
+    FORMAT = None  # the extension of the written report
+
+    def __init__(self, directory):
+        '''
+        Args:
+            - directory - the directory of the report, e.g. Results/<dataset_name>
+        '''
+        self.directory = directory
+
+    def title(self, title, author):
+        '''
+        Adds the title page.
+        '''
+        raise NotImplementedError
+
+    def table_of_contents(self):
+        '''
+        Adds the table of contents (of all the sections, also the ones added later).
+        '''
+        raise NotImplementedError
+
+    def new_page(self):
+        '''
+        Starts a new page (if the format has pages).
+        '''
+        raise NotImplementedError
+
+    @contextmanager
+    def section(self, title, level=0):
+        '''
+        The content added inside the with block belongs to the section (level 0), subsection (1) or subsubsection (2) called title.
+        '''
+        raise NotImplementedError
+        yield
+
+    def text(self, content):
+        '''
+        Adds the text (in the LaTeX subset described in the class docstring).
+        '''
+        raise NotImplementedError
+
+    def note(self, text, link=None):
+        '''
+        Adds a paragraph with the plain text (it is escaped), followed by a link to the file at link (relative to the directory of the report).
+        '''
+        raise NotImplementedError
+
+    def table(self, df, caption, num_after_dot=2, index=True):
+        '''
+        Adds the DataFrame as a numbered table, the floats rounded to num_after_dot decimal places.
+        '''
+        raise NotImplementedError
+
+    def figure(self, path, caption, width):
+        '''
+        Adds the image at path (relative to the directory of the report) as a numbered figure, width is given in px (e.g. '460px').
+        '''
+        raise NotImplementedError
+
+    def dumps(self):
+        '''
+        Returns the source of the document written so far.
+        '''
+        raise NotImplementedError
+
+    def write(self, filepath):
+        '''
+        Writes the document to <filepath>.<FORMAT> and returns its path.
+        '''
+        raise NotImplementedError
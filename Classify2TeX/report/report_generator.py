@@ -1,23 +1,71 @@
-from pylatex import Command, Document, Section, Subsection, Tabular
-from pylatex.utils import NoEscape
-from pylatex.table import Table 
+from pylatex.utils import escape_latex
 import pandas as pd
 import io, os
-from pylatex import Section, Subsection, Figure, NoEscape, Subsubsection
 from .plot_generator import PlotGenerator
+from .eda_statistics import EDAStatistics
+from .figure_renderer import FigureRenderer
+from .artifact_manifest import ArtifactManifest
+from .latex_backend import LatexBackend
+from .html_backend import HTMLBackend
+from .pdf_compiler import PDFCompiler
+from concurrent.futures import Future
 import joblib
 from ..xai.explain_decision_tree import ExplainDecisionTree
 from ..xai.explain_random_forest import ExplainRandomForest
 from ..xai.explain_xgboost import ExplainXGBoost
+from ..xai.tree_shap_engine import TreeSHAPEngine
+from ..xai.permutation_importance import PermutationImportance
+from ..xai.shap_background import SHAPBackground
+from ..performance_profiler import PerformanceProfiler
 
 class ReportGenerator:
-    def __init__(self, dataset, dataset_name, optimizer):
+    BACKENDS = {'latex': LatexBackend, 'html': HTMLBackend}
+
+    def __init__(self, dataset, dataset_name, optimizer, preprocessing_pipeline=None, profiler=None, figure_renderer=None, eda_statistics=None, top_k_trials=None, pdf_compiler=None, report_format='latex',
+                 shap_engine=None, tree_shap_time_budget=30, permutation_importance=None, shap_background=None, shap_background_size=32):
         """
-        this class is responsible for generating the report in the pdf format
+        this class is responsible for generating the report, in the pdf format (report_format='latex', the LaTeX document
+        is compiled to PDF) or as a self-contained HTML page (report_format='html', without LaTeX), see ReportBackend
+        preprocessing_pipeline (PreprocessingPipeline, optional) is saved next to the best models, so they can score new data
+        profiler (PerformanceProfiler, optional) records the time and memory of the parts of the report, its records are shown
+        in the 'Pipeline performance' section
+        figure_renderer (FigureRenderer, optional) renders the figures in worker processes, the figures already submitted to it
+        (e.g. the EDA figures submitted before the model selection) are not rendered again; if None, a renderer is created for the report
+        eda_statistics (EDAStatistics, optional) of the dataset, computed here if None
+        top_k_trials (int, optional) - only the top_k_trials best trials of every model are shown in the tables of the optimization results,
+        all the trials are in the CSV files in ModelOptimization (linked from the report); if None, all the trials are shown
+        pdf_compiler (PDFCompiler, optional) - if given, generate_report does not wait for the PDF, it is compiled in the background
+        by the pool of the compiler (which can be shared by the reports of several datasets); if None, generate_report waits for the PDF
+        report_format ('latex' or 'html') - the format of the report, 'html' writes Results/<dataset_name>/report.html in a fraction of a second
+        once the figures are rendered
+        shap_engine (TreeSHAPEngine, optional) computes the SHAP values of the best Random Forest and Decision Tree models in worker processes,
+        TreeSHAPEngine() (a worker per CPU) if None
+        tree_shap_time_budget (float) - the Random Forest and Decision Tree models explain a seeded sample of the rows, as many as the engine
+        explains in about this many seconds (estimated from the size of the trees), all the rows if they fit; XGBoost always explains all the rows
+        permutation_importance (PermutationImportance, optional) computes the permutation importance of the features for the best models,
+        the one-hot columns of a feature permuted together, PermutationImportance() (a worker per CPU) if None
+        shap_background ('kmeans', 'stratified' or None) - if given, the SHAP values of XGBoost are the interventional ones against the rows
+        summarized into shap_background_size weighted points (see SHAPBackground), and the report compares the accuracy and the time
+        of the summarized backgrounds; not supported for the models with categorical splits (native_categorical), which keep the path-dependent values
+        The figures, the SHAP values and the PDF are keyed by a hash of their inputs (see ArtifactManifest), so a rebuilt report
+        reuses the unchanged ones and pdflatex is not run if the document did not change.
         """
-        self.doc = Document()
+        self.profiler = profiler if profiler is not None else PerformanceProfiler()
+        self.preprocessing_pipeline = preprocessing_pipeline
+        self.owns_figure_renderer = figure_renderer is None  # a renderer created here is shut down at the end of the report
+        self.figure_renderer = figure_renderer if figure_renderer is not None else FigureRenderer()
         self.dataset = pd.DataFrame(dataset)
+        self.eda_statistics = eda_statistics  # EDAStatistics of the dataset, computed once for the tables and the plots
         self.dataset_name = dataset_name
+        self.top_k_trials = top_k_trials
+        self.pdf_compiler = pdf_compiler
+        if report_format not in self.BACKENDS:
+            raise ValueError(f"report_format should be one of {list(self.BACKENDS)}, got {report_format!r}.")
+        self.report_format = report_format
+        self.backend = self.BACKENDS[report_format](f'Results/{self.dataset_name}')  # writes the document in its format
+        self.manifest = ArtifactManifest(f'Results/{self.dataset_name}')  # keys of the figures and the PDF of the report
+        # the tables of the times measured by the sections (dataframe, caption), shown in the performance section, outside the key of the PDF
+        self.timing_tables = []
         # save optimizer instance, to get hyperparameters and metrics
         self.optimizer = optimizer
 
@@ -44,86 +92,128 @@ class ReportGenerator:
         joblib.dump(self.optimizer.best_xgb_instance, f'Results/{self.dataset_name}/Models/best_XGBoost.joblib')
         joblib.dump(self.optimizer.best_rf_instance, f'Results/{self.dataset_name}/Models/best_RandomForest.joblib')
         joblib.dump(self.optimizer.best_dt_instance, f'Results/{self.dataset_name}/Models/best_DecisionTree.joblib')
+        if preprocessing_pipeline is not None:
+            preprocessing_pipeline.save(f'Results/{self.dataset_name}/Models/preprocessing_pipeline.joblib')
 
         # create explainer instances for the best models
-        self.explainer_best_xgb = ExplainXGBoost(self.optimizer.best_xgb_instance)
-        self.explainer_best_rf = ExplainRandomForest(self.optimizer.best_rf_instance)
-        self.explainer_best_dt = ExplainDecisionTree(self.optimizer.best_dt_instance)
-
-
-    def make_small_margins(self):
-        '''
-        This method reduces the margins of the document to make it more compact
-        '''
-        self.doc.packages.append(Command('usepackage', 'geometry'))
-        self.doc.packages.append(Command('geometry', 'margin=0.2in'))
+        self.shap_background = SHAPBackground(shap_background, shap_background_size, self.optimizer.random_state) if shap_background is not None else None
+        background = None
+        if self.shap_background is not None and not self.optimizer.enable_categorical:
+            with self.profiler.stage('XGBoost SHAP background'):
+                background = self.shap_background.summarize(self.optimizer.X, self.optimizer.y)
+        self.explainer_best_xgb = ExplainXGBoost(self.optimizer.best_xgb_instance, cache_directory=f'Results/{self.dataset_name}/XAI/XGBoost/cache',
+                                                 random_state=self.optimizer.random_state, background=background)
+        shap_engine = shap_engine if shap_engine is not None else TreeSHAPEngine()
+        self.explainer_best_rf = ExplainRandomForest(self.optimizer.best_rf_instance, cache_directory=f'Results/{self.dataset_name}/XAI/RandomForest/cache',
+                                                     random_state=self.optimizer.random_state, engine=shap_engine,
+                                                     max_rows=shap_engine.max_rows(self.optimizer.best_rf_instance, tree_shap_time_budget))
+        self.permutation_importance = permutation_importance if permutation_importance is not None else PermutationImportance()
+        self.explainer_best_dt = ExplainDecisionTree(self.optimizer.best_dt_instance, cache_directory=f'Results/{self.dataset_name}/XAI/DecisionTree/cache',
+                                                     random_state=self.optimizer.random_state, engine=shap_engine,
+                                                     max_rows=shap_engine.max_rows(self.optimizer.best_dt_instance, tree_shap_time_budget))
 
 
     def new_page(self):
         '''
         This method adds a new page to the report
         '''
-        self.doc.append(NoEscape(r'\newpage'))
+        self.backend.new_page()
 
 
     def add_title(self):
         '''
         This method adds a title to the report
         '''
-        self.doc.preamble.append(Command('title', "Report on " + self.dataset_name + " dataset"))
-        self.doc.preamble.append(Command('author', 'Classify2TeX'))
-        self.doc.append(NoEscape(r'\maketitle'))
-        self.new_page()   
+        self.backend.title("Report on " + self.dataset_name + " dataset", 'Classify2TeX')
 
 
     def add_table_of_contents(self):
         '''
         This method adds a table of contents to the report
         '''
-        self.doc.append(NoEscape(r'\tableofcontents'))
-        self.new_page()
+        self.backend.table_of_contents()
 
 
-    def add_info_table(self):
+    def get_eda_statistics(self):
         '''
-        This method adds a table with the dataset information (using .info())
+        This method returns the EDAStatistics of the dataset (counts, moments, quartiles, histograms), computed in one pass
+        the first time they are needed.
         '''
-        # Capture dataset.info() into a buffer
-        buffer = io.StringIO()
-        self.dataset.info(buf=buffer)
-        dataset_info = buffer.getvalue()
+        if self.eda_statistics is None:
+            with self.profiler.stage('EDA statistics'):
+                self.eda_statistics = EDAStatistics().fit(self.dataset)
+        return self.eda_statistics
 
-        # Extract parts of dataset info() for table formatting
-        lines = dataset_info.split('\n')
-        table_rows = []
-
-        # Process lines to extract table header and rows
-        for line in lines:
-            if "Non-Null Count" in line and "Dtype" in line:
-                header = ["Column", "Non-Null Count", "Dtype"]
-            elif line.strip() and line.strip()[0].isdigit():
-                parts = line.split()
-                column_name = parts[1]
-                non_null_count = parts[2]
-                dtype = parts[-1]
-                table_rows.append([column_name, non_null_count, dtype])
+    @staticmethod
+    def submit_eda_figures(figure_renderer, eda_statistics, dataset_name):
+        '''
+        This method submits the histograms and the bar charts of the dataset to the figure renderer (unless they were already submitted
+        or rendered from the same statistics before). They depend only on the dataset, so they can be rendered while the models are tuned.
+        '''
+        manifest = ArtifactManifest(f'Results/{dataset_name}')
+        figure_renderer.submit(f'Results/{dataset_name}/EDA/histograms.png', PlotGenerator().generate_histograms,
+                               None, dataset_name, statistics=eda_statistics, reuse=True, manifest=manifest)
+        figure_renderer.submit(f'Results/{dataset_name}/EDA/bar_charts.png', PlotGenerator().generate_bar_charts,
+                               None, dataset_name, statistics=eda_statistics, reuse=True, manifest=manifest)
 
-        # Convert extracted information to a dataframe
-        info_df = pd.DataFrame(table_rows, columns=header)
+    def submit_figures(self):
+        '''
+        This method submits all the figures of the report to the figure renderer, before the document is written,
+        so they are rendered in the worker processes while the main process computes the SHAP values and writes the other parts.
+        The figures whose inputs did not change since the last report are not rendered again.
+        The SHAP bar and violin plots of a model are drawn from the SHAP values of the same rows (see SHAPExplainer), the SHAP values
+        are not computed if both plots are up to date, and are loaded from XAI/<model>/cache if they were computed before.
+        The SHAP values of XGBoost are computed by the booster, while the ones of Random Forest and Decision Tree
+        are computed by the worker processes of the SHAP engine.
+        '''
+        self.submit_eda_figures(self.figure_renderer, self.get_eda_statistics(), self.dataset_name)
+        self.figure_renderer.submit(f'Results/{self.dataset_name}/ModelOptimization/box_plots_metrics.png',
+                                    PlotGenerator().generate_box_plots_metrics, self.metrics, self.dataset_name, manifest=self.manifest)
+        self.figure_renderer.submit(f'Results/{self.dataset_name}/ModelOptimization/barplots_max_metric.png',
+                                    PlotGenerator().generate_barplots_max_metric, self.metrics, self.dataset_name, manifest=self.manifest)
+
+        booster = self.optimizer.best_xgb_instance.get_booster()
+        self.figure_renderer.submit(f'Results/{self.dataset_name}/XAI/XGBoost/feature_importance.png',
+                                    ExplainXGBoost.plot_feature_importance, booster.feature_names,
+                                    self.optimizer.best_xgb_instance.feature_importances_, f'Results/{self.dataset_name}/XAI/XGBoost/feature_importance.png',
+                                    manifest=self.manifest)
+
+        # the SHAP plots are keyed by the model and the rows they explain, not by the SHAP values, which are computed only if needed
+        # the scikit-learn models were trained on the category columns encoded (X_train_encoded is X with native_categorical=False)
+        for explainer, X in [(self.explainer_best_xgb, self.optimizer.X), (self.explainer_best_rf, self.optimizer.X_train_encoded),
+                             (self.explainer_best_dt, self.optimizer.X_train_encoded)]:
+            shap_plots = {
+                f'Results/{self.dataset_name}/XAI/{explainer.MODEL_NAME}/global_feature_importance_shap.png': explainer.plot_global_feature_importance_shap,
+                f'Results/{self.dataset_name}/XAI/{explainer.MODEL_NAME}/violin_summary_plot_shap.png': explainer.plot_violin_summary_shap,
+            }
+            shap_sample = explainer.shap_sample(X, random_state=self.optimizer.random_state)
+            shap_key = explainer.shap_key(shap_sample)
+            keys = {path: self.manifest.key(function, shap_key) for path, function in shap_plots.items()}
+
+            shap_values = None
+            if not all(self.manifest.is_current(path, key) for path, key in keys.items()):
+                with self.profiler.stage(f'{explainer.MODEL_NAME} SHAP values'):
+                    shap_values = explainer.explain_cached(shap_sample)  # loaded from the cache if they were computed before
+            for path, function in shap_plots.items():
+                self.figure_renderer.submit(path, function, shap_values, path, manifest=self.manifest, key=keys[path])
 
+    def add_info_table(self):
+        '''
+        This method adds a table with the dataset information (non-null counts and dtypes, as .info())
+        '''
         # Use the print_dataframe method to print the dataframe
         self.print_dataframe(
-            df=info_df,
+            df=self.get_eda_statistics().info(),
             caption='Dataset Columns Information',
             num_after_dot=0
         )
 
     def add_describe_info(self):
         '''
-        This method adds a table with the dataset's descriptive statistics (using .describe())
+        This method adds a table with the dataset's descriptive statistics (as .describe())
         '''
-        # Calculate descriptive statistics and reset the index to include row labels
-        describe_data = self.dataset.describe().transpose().reset_index()
+        # Take the descriptive statistics and reset the index to include row labels
+        describe_data = self.get_eda_statistics().describe().reset_index()
         describe_data.rename(columns={'index': 'Column Name/Statistic'}, inplace=True)
 
         # Use the print_dataframe method to print the dataframe
@@ -139,50 +229,41 @@ class ReportGenerator:
         '''
         self.new_page()
 
-        plt = PlotGenerator().generate_bar_charts(self.dataset, self.dataset_name)
-        if plt is None:
+        path = self.figure_renderer.result(f'Results/{self.dataset_name}/EDA/bar_charts.png')
+        if path is None:
             return
         
-        with self.doc.create(Subsubsection('Bar Charts of Categorical columns')):
-            self.doc.append(NoEscape(r'The bar charts below show the distribution of categorical features in the dataset.'))
+        with self.backend.section('Bar Charts of Categorical columns', level=2):
+            self.backend.text(r'The bar charts below show the distribution of categorical features in the dataset.')
             # put image in the latex document
-            with self.doc.create(Figure(position='h!')) as fig:
-                fig.add_image(f'EDA/bar_charts.png', width='460px')
-                fig.add_caption('Bar Charts of Categorical columns')
+            self.backend.figure(f'EDA/bar_charts.png', 'Bar Charts of Categorical columns', '460px')
 
 
     def add_histograms(self):
         '''
         This method adds histograms for each numerical column in the dataset
         '''
-        plt = PlotGenerator().generate_histograms(self.dataset, self.dataset_name)
-        if plt is None:
+        path = self.figure_renderer.result(f'Results/{self.dataset_name}/EDA/histograms.png')
+        if path is None:
             return
         
-        with self.doc.create(Subsubsection('Histograms of Numerical columns')):
-            self.doc.append(NoEscape(r'The histograms below show the distribution of numerical features in the dataset.'))
+        with self.backend.section('Histograms of Numerical columns', level=2):
+            self.backend.text(r'The histograms below show the distribution of numerical features in the dataset.')
             # put image in the latex document
-            with self.doc.create(Figure(position='h!')) as fig:
-                fig.add_image(f'EDA/histograms.png', width='460px')
-                fig.add_caption('Histograms of Numerical columns')
+            self.backend.figure(f'EDA/histograms.png', 'Histograms of Numerical columns', '460px')
         return 
 
         
     def add_metrics_description(self):
         """
-        Adds a section describing evaluation metrics to the LaTeX document.
+        Adds a section describing evaluation metrics to the report.
         """
-        # Add required packages to the preamble
-        self.doc.preamble.append(NoEscape(r'\usepackage{amsmath}'))
-        self.doc.preamble.append(NoEscape(r'\usepackage{amssymb}'))
-        self.doc.preamble.append(NoEscape(r'\usepackage{enumitem}'))
-
         # Add the Evaluation Metrics section
-        with self.doc.create(Section('Evaluation Metrics')):
+        with self.backend.section('Evaluation Metrics'):
             
             # Accuracy subsection
-            with self.doc.create(Subsection('Accuracy')):
-                self.doc.append(NoEscape(r"""
+            with self.backend.section('Accuracy', level=1):
+                self.backend.text(r"""
                 \textbf{Accuracy} is one of the simplest evaluation metrics for classification models. 
                 It is defined as the ratio of correctly predicted observations to the total number of observations:
 
@@ -193,11 +274,11 @@ class ReportGenerator:
                 While accuracy is intuitive and easy to understand, it may not be suitable for imbalanced datasets. 
                 For example, in a dataset where 95\% of the samples belong to one class, predicting the majority class for every instance 
                 would result in high accuracy but poor performance on the minority class.
-                """))
+                """)
 
             # F1 Score subsection
-            with self.doc.create(Subsection('F1 Score')):
-                self.doc.append(NoEscape(r"""
+            with self.backend.section('F1 Score', level=1):
+                self.backend.text(r"""
                 The \textbf{F1 Score} is the harmonic mean of Precision and Recall, providing a balance between the two. 
                 It is particularly useful when dealing with imbalanced datasets. Precision and Recall are defined as follows:
 
@@ -216,11 +297,11 @@ class ReportGenerator:
 
                 A high F1 Score indicates a good balance between Precision and Recall, making it a valuable metric in scenarios where false positives 
                 and false negatives have significant costs.
-                """))
+                """)
 
             # ROC AUC subsection
-            with self.doc.create(Subsection('ROC AUC')):
-                self.doc.append(NoEscape(r"""
+            with self.backend.section('ROC AUC', level=1):
+                self.backend.text(r"""
                 The Receiver Operating Characteristic (ROC) curve plots the True Positive Rate (Recall) against the False Positive Rate at various threshold settings. 
                 The \textbf{Area Under the Curve (AUC) of the ROC curve} measures the overall ability of the model to distinguish between classes. 
 
@@ -236,253 +317,425 @@ class ReportGenerator:
                 \end{itemize}
 
                 ROC AUC is particularly useful for binary classification tasks and provides insights into the trade-off between sensitivity and specificity.
-                """))
+                """)
 
     def add_shap_description(self):
         """
         This method adds a section describing SHAP values to the LaTeX document.
         """
-        self.doc.append(NoEscape(r"""
+        self.backend.text(r"""
         \textbf{SHAP (SHapley Additive exPlanations) values} are a unified measure of feature importance, grounded in cooperative game theory, that explain the contribution of each feature to the predictions of a machine learning model. By assigning a consistent and fair contribution to each feature, SHAP values offer insights into the underlying decision-making process of the model, both for specific predictions and overall feature importance.
-        """))
+        """)
 
-        self.doc.append(NoEscape(r"""
+        self.backend.text(r"""
         The fundamental principle behind SHAP is that a model’s prediction for a given instance can be decomposed into the sum of contributions from its features, along with a baseline value. The baseline typically represents the average model prediction across the dataset when no feature information is provided.
-        """))
+        """)
 
-        self.doc.append(NoEscape(r"""
+        self.backend.text(r"""
         \subsection*{How SHAP Values work}
-        """))
+        """)
 
-        self.doc.append(NoEscape(r"""
+        self.backend.text(r"""
         For a specific instance, SHAP calculates how much each feature contributes to the difference between the baseline and the model's prediction. This involves:
-        """))
+        """)
 
-        self.doc.append(NoEscape(r"""
+        self.backend.text(r"""
         \begin{enumerate}
             \item \textbf{Marginal Contributions}: Evaluating how the prediction changes when each feature is added to subsets of other features. For example, if you have features \( A, B, C \), SHAP will compute how the prediction changes when \( A \) is added to subsets like \( \{\}, \{ B \}, \{ C \}, \{ B, C \} \), etc.
             \item \textbf{Weighted Averaging Across Subsets}: To compute the SHAP value for a feature, the method takes the average of its marginal contributions across all subsets of features, weighted by the size of the subsets. This ensures fairness in the distribution of contributions.
             \item \textbf{Baseline Value}: The baseline is a reference point, usually the average model prediction over the dataset. It represents what the model predicts when no features are considered.
         \end{enumerate}
-        """))
+        """)
 
-        self.doc.append(NoEscape(r"""
-        For any given data point, SHAP values indicate how much each feature shifts the model’s prediction relative to the baseline. A positive SHAP value means the feature increases the prediction, while a negative SHAP value means it decreases the prediction. This decomposition allows for a granular understanding of both the direction and magnitude of each feature's influence on the model’s decision."""))
+        self.backend.text(r"""
+        For any given data point, SHAP values indicate how much each feature shifts the model’s prediction relative to the baseline. A positive SHAP value means the feature increases the prediction, while a negative SHAP value means it decreases the prediction. This decomposition allows for a granular understanding of both the direction and magnitude of each feature's influence on the model’s decision.""")
 
     def add_shap_bar_plot_description(self):
         """
         This method adds a description of the SHAP bar plot to the LaTeX document.
         """
-        self.doc.append(NoEscape(r"""
+        self.backend.text(r"""
         \textbf{SHAP bar plot} provides a concise overview of the importance of individual features in the model's predictions. 
         Each bar represents a feature, with its length corresponding to the mean absolute SHAP value across all samples. 
         This indicates the average magnitude of the feature's contribution to the predictions, regardless of direction.
-        """))
+        """)
 
-        self.doc.append(NoEscape(r"""
+        self.backend.text(r"""
         \hspace{20px}Features are ranked in descending order of importance, and only the top 15 features are displayed by default for clarity.
         The bar plot allows quick identification of the most influential features driving the model's behavior and is particularly useful for comparing their relative contributions.\\
         \newline                     
-        """))
+        """)
 
     def add_violin_plot_description(self):
         """
         This method adds a description of the SHAP violin plot to the LaTeX document.
         """
-        self.doc.append(NoEscape(r"""
+        self.backend.text(r"""
         \textbf{SHAP violin plot} provides a visual summary of how each feature influences model predictions and the variability of this influence. 
         Features are listed on the vertical axis in descending order of importance, while the horizontal axis shows SHAP values, 
         indicating the magnitude and direction of each feature's contribution to predictions.
-        """))
+        """)
 
-        self.doc.append(NoEscape(r"""
+        self.backend.text(r"""
         \hspace{20px}The shape of each 'violin' represents the distribution of SHAP values for a feature: wider sections indicate higher density of similar values, 
         while narrower sections show less frequent SHAP values. Positive SHAP values increase the prediction, and negative values decrease it.
-        """))
+        """)
 
-        self.doc.append(NoEscape(r"""
+        self.backend.text(r"""
         \hspace{20px} Colors correspond to actual feature values, with red typically representing higher values and blue lower ones.
         The color distribution along the SHAP scale highlights how feature values affect predictions; for instance, 
         if red dominates the positive side, high feature values increase predictions.
-        """))
+        """)
 
-        self.doc.append(NoEscape(r"""
+        self.backend.text(r"""
         \hspace{10px} By default, only the top 15 features by importance are displayed, keeping the visualization focused and interpretable.\\
-        """))
+        """)
 
     def add_feature_importance_plot_description(self):
         """
         This method adds a description of the feature importance bar chart to the LaTeX document.
         """
-        self.doc.append(NoEscape(r"""
+        self.backend.text(r"""
         \textbf{Feature importance bar chart:} visually represents the contributions of individual features to the model's predictions, 
         based on their calculated importance scores. Each bar in the chart corresponds to a feature, and its length indicates the magnitude of 
         that feature's importance in reducing split impurity during the model's training process. Features that contribute more significantly to 
         the model's predictive accuracy are displayed with longer bars, while less influential features have shorter bars.
-        """))
+        """)
 
-        self.doc.append(NoEscape(r"""
+        self.backend.text(r"""
         \hspace{20px}The chart is horizontally oriented, with feature names listed on the vertical axis and their corresponding importance values on the horizontal axis.
-        """))
+        """)
 
-        self.doc.append(NoEscape(r"""
+        self.backend.text(r"""
         \hspace{20px}This visualization is especially useful for diagnosing the model's behavior, understanding which features drive its decisions, 
         and identifying variables that have the most impact on predictions.\\
         \newline
-        """))
+        """)
 
-    def print_dataframe(self, df, caption, num_after_dot=2, no_index=False):
+    def add_shap_background_section(self):
+        '''
+        This method adds the comparison of the summarized SHAP backgrounds of the best XGBoost model (see SHAPBackground.tradeoff),
+        if shap_background was given; the table is saved in XAI/XGBoost/shap_background_tradeoff.csv.
+        '''
+        if self.shap_background is None:
+            return
+        with self.backend.section('XGBoost model - summarized SHAP background', level=2):
+            if self.explainer_best_xgb.background is None:
+                self.backend.text(r'The SHAP values against a background were requested, but SHAP library does not support them for XGBoost models with categorical splits, '
+                                  r'so the values above are the path-dependent ones computed by the booster.')
+                return
+
+            points, weights = self.explainer_best_xgb.background
+            self.backend.text(rf'The SHAP values above are interventional: the features missing from a coalition take the values of a background, here the rows of the dataset '
+                              rf'summarized into {len(points)} weighted points ({escape_latex(self.shap_background.method)}), instead of 1000 raw rows. '
+                              r'The table below compares the summaries of both methods and several sizes, random samples of the rows and the path-dependent values (no background) '
+                              r'with a background of 1000 raw rows on 200 rows: the mean absolute error of the SHAP values relative to their mean absolute value, '
+                              r'the rank correlation of the global importances (the mean absolute SHAP values) and the overlap of the 10 most important features. '
+                              r'The time of the summary and of the explanation is shown in the Pipeline performance section.')
+            with self.profiler.stage('XGBoost SHAP background trade-off'):
+                sizes = sorted({8, 16, 32, 64, self.shap_background.n_points})
+                tradeoff = self.shap_background.tradeoff(self.optimizer.best_xgb_instance, self.optimizer.X, self.optimizer.y, sizes=sizes)
+            tradeoff.to_csv(f'Results/{self.dataset_name}/XAI/XGBoost/shap_background_tradeoff.csv', index=False)
+            timings = ['summary time [s]', 'explain time [s]', 'speedup']
+            self.print_dataframe(tradeoff.drop(columns=timings), 'Accuracy of the SHAP backgrounds of the best XGBoost model', num_after_dot=3, no_index=True)
+            self.timing_tables.append((tradeoff[['background', 'points'] + timings], 'Time of the SHAP backgrounds of the best XGBoost model'))
+
+    def add_tree_shap_plots(self, explainer, model_title):
         '''
-        This method prints the entire dataframe to the report.
+        This method adds the SHAP bar and violin plots of the best Random Forest or Decision Tree model (see the descriptions of the XGBoost plots)
+        '''
+        n_rows = len(self.optimizer.X)
+        n_explained = len(explainer.sample_positions(n_rows))
+        rows = f'all the {n_rows} rows' if n_explained == n_rows else f'a random sample of {n_explained} of the {n_rows} rows'
+        self.backend.text(rf'The SHAP values of the {model_title} model are the contributions of the features to the predicted probability of the class 1, '
+                          rf'computed with exact TreeSHAP for {rows} of the preprocessed dataset. The plots are read as the ones of the XGBoost model.')
+
+        with self.backend.section(f'{model_title} model - feature importance using SHAP values', level=2):
+            with self.profiler.stage(f'{explainer.MODEL_NAME} SHAP feature importance'):
+                self.figure_renderer.result(f'Results/{self.dataset_name}/XAI/{explainer.MODEL_NAME}/global_feature_importance_shap.png')
+            self.backend.figure(f'XAI/{explainer.MODEL_NAME}/global_feature_importance_shap.png', f'SHAP values for the best {model_title} model', '350px')
+
+        self.new_page()
+        with self.backend.section(f'{model_title} model - violin plot (SHAP) of impact on prediction', level=2):
+            with self.profiler.stage(f'{explainer.MODEL_NAME} SHAP violin plot'):
+                self.figure_renderer.result(f'Results/{self.dataset_name}/XAI/{explainer.MODEL_NAME}/violin_summary_plot_shap.png')
+            self.backend.figure(f'XAI/{explainer.MODEL_NAME}/violin_summary_plot_shap.png', f'Violin plot (SHAP) of impact on prediction for the best {model_title} model', '400px')
+
+    def add_permutation_importance_section(self):
+        '''
+        This method adds the permutation importance of the features for the best models, and the time it took for every model.
+        The one-hot columns of a categorical feature are permuted together, as one feature (see PermutationImportance.feature_groups).
+        All the features of every model are saved in XAI/<model>/permutation_importance.csv.
+        '''
+        engine = self.permutation_importance
+        metric = self.optimizer.metric_to_eval
+        # the features one-hot encoded by the preprocessing, and the category columns one-hot encoded for the scikit-learn models
+        encoded_features = {} if self.preprocessing_pipeline is None else \
+            {**self.preprocessing_pipeline.decisions['one_hot_features'], **self.preprocessing_pipeline.decisions['category_features']}
+        n_rows = min(len(self.optimizer.X), engine.max_rows) if engine.max_rows is not None else len(self.optimizer.X)
+
+        with self.backend.section('Permutation importance of the best models', level=1):
+            self.backend.text(rf'The permutation importance of a feature is the decrease of the {escape_latex(metric)} of the model when the values of the feature '
+                              rf'are shuffled between the rows, so the model cannot use it. It does not depend on the type of the model. The values are the mean '
+                              rf'and the standard deviation over {engine.n_repeats} random permutations, computed on {n_rows} rows of the preprocessed dataset. '
+                              r'The one-hot encoded columns of a categorical feature are permuted together, its importance is the one of the whole feature. '
+                              r'The time it took for every model is shown in the Pipeline performance section.')
+
+            runtimes = []
+            for model_name, model_title, model, X in [('XGBoost', 'XGBoost', self.optimizer.best_xgb_instance, self.optimizer.X),
+                                                      ('RandomForest', 'Random Forest', self.optimizer.best_rf_instance, self.optimizer.X_train_encoded),
+                                                      ('DecisionTree', 'Decision Tree', self.optimizer.best_dt_instance, self.optimizer.X_train_encoded)]:
+                groups = engine.feature_groups(X.columns, encoded_features)
+                with self.profiler.stage(f'{model_name} permutation importance'):
+                    importances = engine.importances(model, X, self.optimizer.y, metric=metric, groups=groups)
+                csv_path = f'Results/{self.dataset_name}/XAI/{model_name}/permutation_importance.csv'
+                os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+                importances.to_csv(csv_path, index=False)
+                runtimes.append({'model': model_title, 'rows': n_rows, 'features': len(groups), 'columns': X.shape[1],
+                                 'permutations': len(groups) * engine.n_repeats, 'runtime [s]': engine.runtime_s})
+
+                self.print_dataframe(importances.rename(columns={'importance_mean': 'importance', 'importance_std': 'std'}),
+                                     f'Permutation importance ({metric}) of the features for the best {model_title} model', num_after_dot=4,
+                                     no_index=True, top_k=15, sort_by='importance', csv_path=csv_path)
+
+            self.timing_tables.append((pd.DataFrame(runtimes), f'Time of the permutation importance of the best models ({engine.n_jobs} worker processes)'))
+
+    def add_feature_screening_section(self):
+        '''
+        This method adds the section with the features kept and dropped by the feature screening (if it was applied),
+        the importances of all the features are saved in Preprocessing/feature_screening.csv.
+        '''
+        if self.preprocessing_pipeline is None or self.preprocessing_pipeline.decisions['feature_screening'] is None:
+            return
+        screening = self.preprocessing_pipeline.decisions['feature_screening']
+        self.new_page()
+
+        importances = pd.DataFrame({'feature': list(screening['importances']), 'importance': list(screening['importances'].values())})
+        importances['kept'] = importances['feature'].isin(screening['kept'])
+        os.makedirs(f'Results/{self.dataset_name}/Preprocessing', exist_ok=True)
+        importances.to_csv(f'Results/{self.dataset_name}/Preprocessing/feature_screening.csv', index=False)
+
+        method = 'the gain importance of a shallow XGBoost model' if screening['method'] == 'xgboost' else 'the mutual information with the target'
+        rule = f'the {screening["top_k"]} most important features were kept' if screening['top_k'] is not None \
+            else f'the most important features covering {screening["threshold"]:.0%} of the total importance were kept'
+        with self.backend.section('Feature screening'):
+            self.backend.text(rf'Before the model selection the preprocessed features were ranked by {method}, estimated on a sample of the rows, and {escape_latex(rule)}. '
+                                     rf'{len(screening["kept"])} of {len(importances)} features were kept, the models were trained and explained on them only.')
+            self.print_dataframe(importances[importances['kept']].drop(columns=['kept']), 'Features kept by the screening and their normalized importance', num_after_dot=4)
+            if len(screening['dropped']) > 0:
+                self.backend.note('Features dropped by the screening: ' + ', '.join(str(feature) for feature in screening['dropped']))
+
+    def add_performance_section(self):
+        '''
+        This method adds the section with the wall time, CPU time and peak memory of the stages of the pipeline.
+        '''
+        performance = self.profiler.to_dataframe()
+        if len(performance) == 0 and len(self.timing_tables) == 0:
+            return
+        performance['stage'] = performance['stage'].str.replace(' > ', ' / ', regex=False)
+
+        with self.backend.section('Pipeline performance'):
+            if len(performance) > 0:
+                self.backend.text(r'The table below shows the wall time, the CPU time (of this process, all threads) and the peak resident memory (RSS) of the stages of the pipeline. Nested stages are separated by a slash, the time of a stage includes the time of its nested stages. The report is compiled after this table is written, all the stages are saved in pipeline\_performance.csv.')
+                self.print_dataframe(performance.drop(columns=['level']).rename(columns={'wall_time_s': 'wall time [s]', 'cpu_time_s': 'CPU time [s]', 'peak_rss_mb': 'peak RSS [MB]'}),
+                                     'Wall time, CPU time and peak RSS of the pipeline stages', num_after_dot=2)
+            # the timings of the sections are kept here, so they do not change the document the PDF is keyed by
+            for timings, caption in self.timing_tables:
+                self.print_dataframe(timings, caption, num_after_dot=2, no_index=True)
+
+    def print_dataframe(self, df, caption, num_after_dot=2, no_index=False, top_k=None, sort_by=None, csv_path=None):
+        '''
+        This method prints the entire dataframe to the report (in the LaTeX report as longtables, see LatexTableWriter,
+        which break across pages and are split into several tables if the dataframe has too many columns).
 
         Args:
             df: The dataframe to be printed in the report.
             caption: The caption for the table in the report.
             num_after_dot: The number of decimal places to round numerical values in the dataframe.
             no_index: If True, the index column will not be included in the table.
+            top_k: If given, only the top_k rows with the highest values of the sort_by column are printed.
+            sort_by: The column by which the rows are ranked for top_k.
+            csv_path: The CSV file with the whole dataframe, linked from the report when only the top_k rows are printed.
         '''
-        # Create the table with a caption
-        with self.doc.create(Table(position='h!')) as table:
-            table.add_caption(caption)
-
-            self.doc.append(NoEscape(r'\vspace{0.2cm}')) # Add vertical space
-            self.doc.append(NoEscape(r'\centering'))  # Center the table
-
-            # Extract header and rows from the dataframe
-            header = list(df.columns)
-            table_rows = df.values.tolist()
+        if top_k is not None and len(df) > top_k:
+            n_rows = len(df)
+            df = df.sort_values(sort_by, ascending=False, kind='stable').head(top_k)
+            text = f'Only the {top_k} of {n_rows} rows with the highest {sort_by} are shown'
+            if csv_path is not None:
+                self.backend.note(text + ', all of them are in', link=os.path.relpath(csv_path, f'Results/{self.dataset_name}'))
+            else:
+                self.backend.note(text)
 
-            # Round numerical values to the specified number of decimal places
-            rounded_rows = []
-            for row in table_rows:
-                rounded_row = [
-                    round(value, num_after_dot) if isinstance(value, (float, int)) else value
-                    for value in row
-                ]
-                rounded_rows.append(rounded_row)
-
-            # Adjust the number of columns to match the dataframe
-            with table.create(Tabular('|c|' * (len(header) + 1))) as tabular:
-                tabular.add_hline()
-                if no_index==False:
-                    tabular.add_row(['Index'] + header)  # Add index column
-                tabular.add_hline()
-
-                # Add all rows to the table
-                for i, row in enumerate(rounded_rows):
-                    tabular.add_row([i] + row)
-
-                tabular.add_hline()
-                        
+        self.backend.table(df, caption, num_after_dot=num_after_dot, index=not no_index)
 
     def generate_report(self):
         '''
         This method generates the report, using the methods defined above.
+        Returns the Future of the PDF compilation (see PDFCompiler), already finished unless a pdf_compiler was given;
+        its result is None if the PDF did not change. For the HTML report, the result is a dict with the path of the page.
         '''
-        self.make_small_margins()  # Reduce the margins of the document
         self.add_title()  # Add the title to the report
         self.add_table_of_contents()  # Add table of contents
+        self.submit_figures()  # the figures are rendered in the background, each one is waited for where it is embedded
 
-        with self.doc.create(Section('Exploratory Data Analysis')):
+        with self.backend.section('Exploratory Data Analysis'):
+            self.get_eda_statistics()  # one pass over the dataset for all the tables and plots of this section
 
-            with self.doc.create(Subsection('Non-Null Count, Dtype of features')):
-                self.doc.append(NoEscape(r'The table 1 provides information about the dataset, including the number of non-null values and the data types of each feature.'))
-                self.add_info_table()  # Add dataset info() table
+            with self.backend.section('Non-Null Count, Dtype of features', level=1):
+                self.backend.text(r'The table 1 provides information about the dataset, including the number of non-null values and the data types of each feature.')
+                with self.profiler.stage('EDA info table'):
+                    self.add_info_table()  # Add dataset info() table
 
             self.new_page()
 
-            with self.doc.create(Subsection('Descriptive Statistics')):
-                self.doc.append(NoEscape(r'The table 2 provides descriptive statistics for the dataset, including the count, mean, standard deviation, minimum, and maximum values.'))
-                self.add_describe_info()  # Add dataset describe() table
+            with self.backend.section('Descriptive Statistics', level=1):
+                self.backend.text(r'The table 2 provides descriptive statistics for the dataset, including the count, mean, standard deviation, minimum, and maximum values.')
+                with self.profiler.stage('EDA describe table'):
+                    self.add_describe_info()  # Add dataset describe() table
             
             self.new_page()
-            with self.doc.create(Subsection('Distribution of features')):
-                self.doc.append(NoEscape(r'This section provides a visual representation of the distribution of features in the dataset using histograms (numerical features) and bar charts (categorical features). These visualizations can help in understanding the data.'))
-                self.add_histograms() # Add histograms for numerical columns
-                self.add_bar_charts() # Add bar charts for categorical columns
+            with self.backend.section('Distribution of features', level=1):
+                self.backend.text(r'This section provides a visual representation of the distribution of features in the dataset using histograms (numerical features) and bar charts (categorical features). These visualizations can help in understanding the data.')
+                with self.profiler.stage('EDA histograms'):
+                    self.add_histograms() # Add histograms for numerical columns
+                with self.profiler.stage('EDA bar charts'):
+                    self.add_bar_charts() # Add bar charts for categorical columns
+
+        self.add_feature_screening_section()
 
         self.new_page()
         self.add_metrics_description()
 
         self.new_page()
-        with self.doc.create(Section('Model Optimization Results')):
-            with self.doc.create(Subsection('Optimization Results Tables')):
-                self.doc.append(NoEscape(r'The tables below show the hyperparameters and achieved metrics for each model configuration considered during the optimization process. The index of models with default hyperparameters is 0. The next models, indexed from 1, were chosen by Random Search.'))
-                self.print_dataframe(self.optimizer.params_rf.transpose().reset_index().rename(columns={"index": "Metric/Hyperp.\ Iteration"}), 'Random Forest Hyperparameters and achivied metrics', num_after_dot=4)
-                self.print_dataframe(self.optimizer.params_dt.transpose().reset_index().rename(columns={"index": "Metric/Hyperp. \ Iteration"}), 'Decision Tree Hyperparameters and achivied metrics', num_after_dot=4)
-                self.print_dataframe(self.optimizer.params_xgb.transpose().reset_index().rename(columns={"index": "Metric/Hyperp. \ Iteration"}), 'XGBoost Hyperparameters and achivied metrics', num_after_dot=4)
+        with self.backend.section('Model Optimization Results'):
+            with self.backend.section('Optimization Results Tables', level=1):
+                self.backend.text(r'The tables below show the hyperparameters and achieved metrics for each model configuration considered during the optimization process, one row per configuration. The index of models with default hyperparameters is 0. The next models, indexed from 1, were chosen by Random Search.')
+
+                # save to folder results of hyperparameters optimization
+                for model_name, params, caption in [('RandomForest', self.optimizer.params_rf, 'Random Forest Hyperparameters and achivied metrics'),
+                                                    ('DecisionTree', self.optimizer.params_dt, 'Decision Tree Hyperparameters and achivied metrics'),
+                                                    ('XGBoost', self.optimizer.params_xgb, 'XGBoost Hyperparameters and achivied metrics')]:
+                    csv_path = f'Results/{self.dataset_name}/ModelOptimization/{model_name}_hyperparameters_metrics.csv'
+                    os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+                    params.to_csv(csv_path)
+                    with self.profiler.stage(f'{model_name} trials table'):
+                        self.print_dataframe(params, caption, num_after_dot=4, top_k=self.top_k_trials,
+                                             sort_by=self.optimizer.metric_to_eval, csv_path=csv_path)
 
             self.new_page()
-            with self.doc.create(Subsection('Boxplots of accuracy, f1, roc_auc')):
-                self.doc.append(NoEscape(r'Boxplots of accuracy, F1, and ROC AUC illustrate the distribution and variability of model performance metrics across different configurations of hyperparameters. The plots are located below.'))
-                plt = PlotGenerator().generate_box_plots_metrics(self.metrics, self.dataset_name)
+            with self.backend.section('Boxplots of accuracy, f1, roc_auc', level=1):
+                self.backend.text(r'Boxplots of accuracy, F1, and ROC AUC illustrate the distribution and variability of model performance metrics across different configurations of hyperparameters. The plots are located below.')
+                with self.profiler.stage('Metric box plots'):
+                    self.figure_renderer.result(f'Results/{self.dataset_name}/ModelOptimization/box_plots_metrics.png')
                 # put image in the latex document
-                with self.doc.create(Figure(position='h!')) as fig:
-                    fig.add_image(f'ModelOptimization/box_plots_metrics.png', width='460px')
-                    fig.add_caption('Boxplots of accuracy, f1, roc_auc')
+                self.backend.figure(f'ModelOptimization/box_plots_metrics.png', 'Boxplots of accuracy, f1, roc_auc', '460px')
 
             # add barplots of maximum values of metrics
-            with self.doc.create(Subsection('Barplots of maximum values of metrics achievied by model')):
-                self.doc.append(NoEscape(r'Barplots of maximum metric values show the highest performance scores for each model type. The plots are located below.'))
-                plt = PlotGenerator().generate_barplots_max_metric(self.metrics, self.dataset_name)
+            with self.backend.section('Barplots of maximum values of metrics achievied by model', level=1):
+                self.backend.text(r'Barplots of maximum metric values show the highest performance scores for each model type. The plots are located below.')
+                with self.profiler.stage('Metric bar plots'):
+                    self.figure_renderer.result(f'Results/{self.dataset_name}/ModelOptimization/barplots_max_metric.png')
                 # put image in the latex document
-                with self.doc.create(Figure(position='h!')) as fig:
-                    fig.add_image(f'ModelOptimization/barplots_max_metric.png', width='460px')
-                    fig.add_caption('Barplots of maximum values of metrics achievied by model')
-
-                    # save to folder results of hyperparameters optimization
-                    self.optimizer.params_xgb.to_csv(f'Results/{self.dataset_name}/ModelOptimization/XGBoost_hyperparameters_metrics.csv')
-                    self.optimizer.params_rf.to_csv(f'Results/{self.dataset_name}/ModelOptimization/RandomForest_hyperparameters_metrics.csv')
-                    self.optimizer.params_dt.to_csv(f'Results/{self.dataset_name}/ModelOptimization/DecisionTree_hyperparameters_metrics.csv')
+                self.backend.figure(f'ModelOptimization/barplots_max_metric.png', 'Barplots of maximum values of metrics achievied by model', '460px')
 
         self.new_page()
         # add section with interpretabilty of the best models
-        with self.doc.create(Section('Interpretabilty of the best models')):
-            self.doc.append(NoEscape(r'Classify2TeX package defined the best model as the one that achievied the highest value of a metric, chosen by the user, or ROC AUC by default.'))
-            self.doc.append(NoEscape(r'In this case, the optimization process was aimed at maximizing'))
+        with self.backend.section('Interpretabilty of the best models'):
+            self.backend.text(r'Classify2TeX package defined the best model as the one that achievied the highest value of a metric, chosen by the user, or ROC AUC by default.')
+            self.backend.text(r'In this case, the optimization process was aimed at maximizing')
             if self.optimizer.metric_to_eval == 'roc_auc':
-                self.doc.append(NoEscape(r'\textbf{ ROC AUC.}'))
+                self.backend.text(r'\textbf{ ROC AUC.}')
             elif self.optimizer.metric_to_eval == 'accuracy':
-                self.doc.append(NoEscape(r'\textbf{ Accuracy.}'))
+                self.backend.text(r'\textbf{ Accuracy.}')
             elif self.optimizer.metric_to_eval == 'f1':
-                self.doc.append(NoEscape(r'\textbf{ F1 Score.}'))
-            self.doc.append(NoEscape(r'\\'))
-            self.doc.append(NoEscape(r'Do not forget, that after preprocessing, columns names have changed, because of transformations of categorical features.'))
-            with self.doc.create(Subsection('SHAP - what is under the hood?')):
+                self.backend.text(r'\textbf{ F1 Score.}')
+            self.backend.text(r'\\')
+            self.backend.text(r'Do not forget, that after preprocessing, columns names have changed, because of transformations of categorical features.')
+            with self.backend.section('SHAP - what is under the hood?', level=1):
                 self.add_shap_description()
 
             self.new_page()
-            with self.doc.create(Subsection('The best XGBoost model Explanation')):
+            with self.backend.section('The best XGBoost model Explanation', level=1):
 
                 # add global feature importance using SHAP values 
-                with self.doc.create(Subsubsection('XGBoost model - feature importance using SHAP values')):
+                with self.backend.section('XGBoost model - feature importance using SHAP values', level=2):
                     self.add_shap_bar_plot_description()
-                    self.explainer_best_xgb.save_global_feature_importance_shap(self.optimizer.X, self.dataset_name)
-                    with self.doc.create(Figure(position='h!')) as fig:
-                        fig.add_image(f'XAI/XGBoost/global_feature_importance_shap.png', width='350px')
-                        fig.add_caption('SHAP values for the best XGBoost model')
+                    with self.profiler.stage('XGBoost SHAP feature importance'):
+                        self.figure_renderer.result(f'Results/{self.dataset_name}/XAI/XGBoost/global_feature_importance_shap.png')
+                    self.backend.figure(f'XAI/XGBoost/global_feature_importance_shap.png', 'SHAP values for the best XGBoost model', '350px')
 
                 self.new_page()
                 # add feature importance gained directly from the model
-                with self.doc.create(Subsubsection('XGBoost model - feature importance gained directly from the model')):
+                with self.backend.section('XGBoost model - feature importance gained directly from the model', level=2):
                     self.add_feature_importance_plot_description()
-                    self.explainer_best_xgb.save_feature_importance_plot(self.dataset_name)
-                    with self.doc.create(Figure(position='h!')) as fig:
-                        fig.add_image(f'XAI/XGBoost/feature_importance.png', width='350px')
-                        fig.add_caption('Feature Importance for the best XGBoost model')
+                    with self.profiler.stage('XGBoost feature importance'):
+                        self.figure_renderer.result(f'Results/{self.dataset_name}/XAI/XGBoost/feature_importance.png')
+                    self.backend.figure(f'XAI/XGBoost/feature_importance.png', 'Feature Importance for the best XGBoost model', '350px')
 
                 self.new_page()
                 # add violin plot of impact on prediction
-                with self.doc.create(Subsubsection('XGBoost model - violin plot (SHAP) of impact on prediction')):
-                    self.explainer_best_xgb.save_violin_summary_plot_shap(self.optimizer.X, self.dataset_name)
+                with self.backend.section('XGBoost model - violin plot (SHAP) of impact on prediction', level=2):
+                    with self.profiler.stage('XGBoost SHAP violin plot'):
+                        self.figure_renderer.result(f'Results/{self.dataset_name}/XAI/XGBoost/violin_summary_plot_shap.png')
                     self.add_violin_plot_description()
-                    with self.doc.create(Figure(position='h!')) as fig:
-                        fig.add_image(f'XAI/XGBoost/violin_summary_plot_shap.png', width='400px')
-                        fig.add_caption('Violin plot (SHAP) of impact on prediction for the best default XGBoost model')
-
+                    self.backend.figure(f'XAI/XGBoost/violin_summary_plot_shap.png', 'Violin plot (SHAP) of impact on prediction for the best default XGBoost model', '400px')
 
-        self.doc.generate_pdf(f'Results/{self.dataset_name}/report', clean_tex=False)
+                self.add_shap_background_section()
 
+            for explainer, model_title in [(self.explainer_best_rf, 'Random Forest'), (self.explainer_best_dt, 'Decision Tree')]:
+                self.new_page()
+                with self.backend.section(f'The best {model_title} model Explanation', level=1):
+                    self.add_tree_shap_plots(explainer, model_title)
 
-    
+            self.new_page()
+            self.add_permutation_importance_section()
 
+        self.new_page()
+        if self.report_format != 'latex':
+            self.add_performance_section()
+            if self.owns_figure_renderer:
+                self.figure_renderer.shutdown()
+            with self.profiler.stage(f'Writing the {self.report_format.upper()} report'):
+                path = self.backend.write(f'Results/{self.dataset_name}/report')
+            print(f'The report of {self.dataset_name} was written to {path}.')
+            written = Future()
+            written.set_result({'path': path})
+            return written
+
+        # the PDF is keyed by the document and its figures, without the performance section, whose timings change on every run
+        figure_keys = {path: key for path, key in self.figure_renderer.keys.items() if path.startswith(f'Results/{self.dataset_name}/')}
+        pdf_key = self.manifest.key(self.backend.dumps(), figure_keys)
+        self.add_performance_section()
+
+        if self.owns_figure_renderer:
+            self.figure_renderer.shutdown()
+
+        pdf_path = f'Results/{self.dataset_name}/report.pdf'
+        if self.manifest.is_current(pdf_path, pdf_key):
+            # the .tex is still written, the PDF keeps the performance section of its last compilation
+            self.backend.write(f'Results/{self.dataset_name}/report')
+            print('The report did not change, the PDF was not compiled again.')
+            compilation = Future()
+            compilation.set_result(None)
+            return compilation
+
+        pdf_compiler = self.pdf_compiler if self.pdf_compiler is not None else PDFCompiler(max_workers=1)
+        compilation = pdf_compiler.submit(self.backend.doc, f'Results/{self.dataset_name}/report')
+        compilation.add_done_callback(lambda future: self.report_compilation(future, pdf_key))
+        if self.pdf_compiler is None:
+            with self.profiler.stage('PDF compilation'):
+                compilation.result()
+            pdf_compiler.shutdown()
+        return compilation
+
+    def report_compilation(self, compilation, pdf_key):
+        '''
+        This method is called when the compilation of the PDF finishes (in the thread of the PDF compiler, if it runs in the background):
+        it prints the compilation time and the location of the log, and records the PDF in the manifest if it was compiled.
+        '''
+        if compilation.exception() is not None:
+            print(f'The PDF report of {self.dataset_name} could not be compiled: {compilation.exception()}')
+            return
+        result = compilation.result()
+        self.manifest.record(result['pdf'], pdf_key)
+        print(f"The PDF report of {self.dataset_name} was compiled by {result['compiler']} in {result['wall_time_s']:.1f} s, the log is in {result['log']}.")
@@ -1,12 +1,41 @@
-import dtreeviz
-from sklearn.tree import DecisionTreeClassifier
+import numpy as np
+import os
+from .shap_explainer import SHAPExplainer
+from .tree_shap_engine import TreeSHAPEngine
+from ..preprocessing.feature_type_extractor import FeatureTypeExtractor
+from ..report.artifact_manifest import ArtifactManifest
 
-class ExplainDecisionTree:
+class ExplainDecisionTree(SHAPExplainer):
     '''
     This class contains methods to explain the model for DecisionTreeClassifier.
+    The SHAP values are computed by TreeSHAPEngine, with the rows split across worker processes (see SHAPExplainer for the SHAP plots).
+    The tree is drawn by dtreeviz from a stratified sample of the rows, up to a maximum depth, and saved as SVG once (see save_tree).
     '''
-    def __init__(self, model):
-        self.model = model
+    MODEL_NAME = 'DecisionTree'
+
+    def __init__(self, model, cache_directory=None, random_state=42, max_rows=None, engine=None):
+        '''
+        Args:
+            - model - the fitted DecisionTreeClassifier
+            - cache_directory, random_state, max_rows - see SHAPExplainer
+            - engine - the TreeSHAPEngine computing the SHAP values, TreeSHAPEngine() (a worker process per CPU) if None
+        '''
+        super().__init__(model, cache_directory=cache_directory, random_state=random_state, max_rows=max_rows)
+        self.engine = engine if engine is not None else TreeSHAPEngine()
+
+    def contributions(self, data):
+        '''
+        This method returns the TreeSHAP contributions to the probability of the class 1 for the rows of data, computed by the engine
+        (chunks of rows in parallel).
+        '''
+        return self.engine.contributions(self.model, data)
+
+    def model_fingerprint(self):
+        '''
+        This method returns the arrays of the trees read by TreeSHAP (see TreeSHAPEngine.tree_arrays), the pickle of a tree
+        is not the same for the same tree.
+        '''
+        return self.engine.tree_arrays(self.model)
 
     def build_tree(self, X_train, y_train):
         '''
@@ -19,7 +48,72 @@ class ExplainDecisionTree:
         Returns:
         - viz_model: Decision tree model
         '''
+        import dtreeviz  # imported when a tree is drawn, importing it takes more than a second
+
         # Model of the decision tree
         viz_model = dtreeviz.model(self.model, X_train, y_train, target_name='target', feature_names=X_train.columns)
 
         return viz_model
+
+    def visualization_positions(self, X, y, max_rows=5000, max_depth=None):
+        '''
+        This method returns the positions of the rows of X drawn in the nodes of the tree: a seeded sample of max_rows rows stratified
+        by class (every class keeps its share of the rows), and a row of every node shown (the nodes up to max_depth), so no shown node
+        is empty. All the rows if there are at most max_rows.
+        '''
+        if max_rows is None or len(X) <= max_rows:
+            return np.arange(len(X))
+
+        generator = np.random.RandomState(self.random_state)
+        labels = np.asarray(y)
+        positions = [generator.choice(np.flatnonzero(labels == label), max(1, round(max_rows * count / len(labels))), replace=False)
+                     for label, count in zip(*np.unique(labels, return_counts=True))]
+
+        # the node shown for every node of the tree: itself up to max_depth, its ancestor at max_depth below it
+        # (the children of a node of a scikit-learn tree have larger ids than the node)
+        tree = self.model.tree_
+        shown_node = np.arange(tree.node_count)
+        depth = np.zeros(tree.node_count, dtype=int)
+        for node in range(tree.node_count):
+            for child in [tree.children_left[node], tree.children_right[node]]:
+                if child != -1:
+                    depth[child] = depth[node] + 1
+                    shown_node[child] = child if max_depth is None or depth[child] <= max_depth else shown_node[node]
+
+        leaves = shown_node[self.model.apply(FeatureTypeExtractor().to_model_input(X))]
+        shuffled = generator.permutation(len(X))
+        positions.append(shuffled[np.unique(leaves[shuffled], return_index=True)[1]])  # a random row of every shown node
+        return np.unique(np.concatenate(positions))
+
+    def save_tree(self, X, y, dataset_name, max_rows=5000, max_depth=4):
+        '''
+        This method draws the tree with the distributions of the features and the classes in its nodes computed from the rows
+        of visualization_positions, the nodes up to max_depth (all of them if None), and saves it to
+        Results/<dataset_name>/XAI/DecisionTree/decision_tree_depth_<max_depth>.svg. The drawing is keyed by the tree, the rows drawn
+        and the depth (see ArtifactManifest), so it is drawn only the first time. Returns the path of the SVG file.
+        '''
+        path = f'Results/{dataset_name}/XAI/{self.MODEL_NAME}/decision_tree_depth_{max_depth if max_depth is not None else "all"}.svg'
+        positions = self.visualization_positions(X, y, max_rows=max_rows, max_depth=max_depth)
+        sample = FeatureTypeExtractor().to_dense(X.take(positions))
+        labels = np.asarray(y)[positions]
+
+        manifest = ArtifactManifest(f'Results/{dataset_name}')
+        key = manifest.key(self.render_tree, self.model_fingerprint(), sample, labels, max_depth)
+        if not manifest.is_current(path, key):
+            self.render_tree(self.model, sample, labels, max_depth, path)
+            manifest.record(path, key)
+        return path
+
+    @staticmethod
+    def render_tree(model, X, y, max_depth, path):
+        '''
+        This method draws the tree with dtreeviz, the histograms of the nodes from the rows of X and y, the nodes up to max_depth
+        (all of them if None), and saves it to path (SVG, dtreeviz runs the dot program of graphviz).
+        '''
+        import dtreeviz  # imported when a tree is drawn, importing it takes more than a second
+
+        viz_model = dtreeviz.model(model, X, y, target_name='target', feature_names=list(X.columns))
+        depth_range = (0, max_depth) if max_depth is not None else None  # the depths shown, inclusive
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        viz_model.view(depth_range_to_display=depth_range).save(path)
+        return path
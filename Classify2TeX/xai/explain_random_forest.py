@@ -1,15 +1,37 @@
-import shap
-import matplotlib.pyplot as plt
 import pandas as pd
+from .shap_explainer import SHAPExplainer
+from .tree_shap_engine import TreeSHAPEngine
 
-shap.initjs()
-
-class ExplainRandomForest:
+class ExplainRandomForest(SHAPExplainer):
     '''
     This class contains methods to explain the model for RandomForestClassifier.
+    The SHAP values are computed by TreeSHAPEngine, with the trees and the rows split across worker processes (see SHAPExplainer for the SHAP plots).
     '''
-    def __init__(self, model):
-        self.model = model
+    MODEL_NAME = 'RandomForest'
+
+    def __init__(self, model, cache_directory=None, random_state=42, max_rows=None, engine=None):
+        '''
+        Args:
+            - model - the fitted RandomForestClassifier
+            - cache_directory, random_state, max_rows - see SHAPExplainer
+            - engine - the TreeSHAPEngine computing the SHAP values, TreeSHAPEngine() (a worker process per CPU) if None
+        '''
+        super().__init__(model, cache_directory=cache_directory, random_state=random_state, max_rows=max_rows)
+        self.engine = engine if engine is not None else TreeSHAPEngine()
+
+    def contributions(self, data):
+        '''
+        This method returns the TreeSHAP contributions to the probability of the class 1 for the rows of data, computed by the engine
+        (groups of trees and chunks of rows in parallel).
+        '''
+        return self.engine.contributions(self.model, data)
+
+    def model_fingerprint(self):
+        '''
+        This method returns the arrays of the trees read by TreeSHAP (see TreeSHAPEngine.tree_arrays), the pickle of a tree
+        is not the same for the same tree.
+        '''
+        return self.engine.tree_arrays(self.model)
 
     def plot_feature_importance(self, feature_names, max_features=10):
         '''
@@ -19,6 +41,8 @@ class ExplainRandomForest:
         - max_features: Maximum number of top features to display (default: 10).
         - feature_names: List of feature names.
         '''
+        import matplotlib.pyplot as plt  # imported when a plot is drawn, not with the package
+
         # get feature importances from the model
         importances = self.model.feature_importances_
 
@@ -1,110 +1,64 @@
-import shap
-import matplotlib.pyplot as plt
 import pandas as pd
-import shap
-import matplotlib.pyplot as plt
-from matplotlib import cm
+import numpy as np
 import os
+from ..preprocessing.feature_type_extractor import FeatureTypeExtractor
+from .shap_explainer import SHAPExplainer
+from .shap_background import SHAPBackground
 
 
-class ExplainXGBoost:
+class ExplainXGBoost(SHAPExplainer):
     '''
     This class contains methods to explain the model for XGBoost model.
+
+    The SHAP values are the exact TreeSHAP contributions computed by the booster itself (pred_contribs=True, multithreaded C++),
+    so every row of the data can be explained (see SHAPExplainer for the cached values and the SHAP plots).
+    With a background (the weighted points of SHAPBackground.summarize), they are the interventional TreeSHAP values against it.
     '''
-    def __init__(self, model):
-        self.model = model
+    MODEL_NAME = 'XGBoost'
 
-    def save_global_feature_importance_shap(self, data, dataset_name):
+    def __init__(self, model, cache_directory=None, random_state=42, max_rows=None, chunk_size=50000, background=None):
         '''
-        This method returns the global feature importance using SHAP library and plots the bar graph.
-        It takes the data on which the importance is calculated.
+        Args:
+            - model - the fitted XGBClassifier
+            - cache_directory, random_state, max_rows - see SHAPExplainer
+            - chunk_size - the contributions are computed for chunk_size rows at a time, which bounds the memory used by the booster
+            - background - (points, weights) of SHAPBackground.summarize: the features missing from a coalition take the values of
+              the points (interventional TreeSHAP) instead of following the training rows of the trees; not supported by SHAP library
+              for the models with categorical splits. If None, the booster computes the path-dependent values.
         '''
-        self.dataset_name = dataset_name    
-        # If the data is too large, then take random 1000 samples, because SHAP explainer is computationally expensive.
-        if len(data) > 1000:
-            data_sample = data.sample(1000)
-        else:
-            data_sample = data.copy()
-            
-        explainer = shap.Explainer(self.model, data_sample)
-
-        shap_values = explainer(data_sample)
-        
-        # Create SHAP bar plot
-        shap_plot = shap.plots.bar(shap_values, max_display=15, show=False)
-
-        # Save the plot
-        os.makedirs(f'Results/{self.dataset_name}/XAI/XGBoost', exist_ok=True)
-        plt.savefig(f'Results/{self.dataset_name}/XAI/XGBoost/global_feature_importance_shap.png', dpi=300, bbox_inches='tight')
-        plt.close()
-
-        return 
-    
-    def show_feature_importance_by_classes_shap(self, X, y):
+        super().__init__(model, cache_directory=cache_directory, random_state=random_state, max_rows=max_rows)
+        self.chunk_size = chunk_size
+        self.background = background
+
+    def contributions(self, data):
         '''
-        This method returns the feature importance by classes using SHAP library and plots the bar graph.
-        It takes the data on which the importance is calculated.
+        This method returns the TreeSHAP contributions of the features for the rows of data (n_rows x (n_features + 1), float32,
+        the base value in the last column), computed by the booster (pred_contribs=True) in chunks of chunk_size rows.
+        They are the values of shap.TreeExplainer(model) (feature_perturbation='tree_path_dependent'),
+        and also work for the models trained on category columns, which SHAP library does not support.
+        With a background, they are the interventional values against it (see SHAPBackground.contributions).
         '''
-        data_1 = X[y == 1]
-        data_2 = X[y == 0]
-        
-        # if the data is too large, then take random 1000 samples, because SHAP explainer is computationally expensive.
-        if len(data_1) > 1000:
-            data_sample_1 = data_1.sample(1000)
-        else:
-            data_sample_1 = data_1.copy()
-
-        if len(data_2) > 1000:
-            data_sample_2 = data_2.sample(1000)
-        else:
-            data_sample_2 = data_2.copy()
-
-        explainer = shap.Explainer(self.model, data_sample_1)
-
-        shap_values_1 = explainer(data_sample_1)
+        import xgboost as xgb  # the XAI libraries are imported when they are used, importing them takes seconds
 
-        explainer = shap.Explainer(self.model, data_sample_2)
-        
-        shap_values_2 = explainer(data_sample_2)
-         
-        # change titles and display plots, change color
-        print("Feature Importance for Class 1 using SHAP")
-        shap.plots.bar(shap_values_1, max_display=10)
+        if self.background is not None:
+            return SHAPBackground.contributions(self.model, data, *self.background)
 
-        print("Feature Importance for Class 0 using SHAP")
-        shap.plots.bar(shap_values_2, max_display=10)
+        booster = self.model.get_booster()
+        feature_type_extractor = FeatureTypeExtractor()
+        contributions = np.empty((len(data), data.shape[1] + 1), dtype=np.float32)
+        for start in range(0, len(data), self.chunk_size):
+            chunk = feature_type_extractor.to_dense(data.iloc[start:start + self.chunk_size])
+            contributions[start:start + len(chunk)] = booster.predict(xgb.DMatrix(chunk, enable_categorical=True), pred_contribs=True)
+        return contributions
 
-        plt.show()
-
-        return
-        
-    def save_violin_summary_plot_shap(self, data, dataset_name):
+    def model_fingerprint(self):
         '''
-        This method returns the summary plot using SHAP library and plots the violin plot.
-        It takes the data on which the violin plot is plotted.
+        This method returns the booster saved in the JSON format (the default binary one cannot save the models with categorical splits),
+        and the background of the SHAP values if one is given.
         '''
-        self.dataset_name = dataset_name
-
-        # If the data is too large, then take random 1000 samples, because SHAP explainer is computationally expensive.
-        if len(data) > 1000:
-            data_sample = data.sample(1000)
-        else:
-            data_sample = data.copy()
-
-        explainer = shap.Explainer(self.model, data_sample)
+        booster = bytes(self.model.get_booster().save_raw('json'))
+        return booster if self.background is None else [booster, *self.background]
 
-        shap_values = explainer(data_sample)
-
-        # Create SHAP violin plot
-        shap_plot = shap.plots.violin(shap_values, max_display=15, show=False)
-
-        # Save the plot
-        os.makedirs(f'Results/{self.dataset_name}/XAI/XGBoost', exist_ok=True)
-        plt.savefig(f'Results/{self.dataset_name}/XAI/XGBoost/violin_summary_plot_shap.png', dpi=300, bbox_inches='tight')
-        plt.close()
-
-        return
-        
     def save_feature_importance_plot(self, dataset_name, max_features=15):
         '''
         Plots the feature importance using the model's `feature_importances_` attribute.
@@ -119,6 +73,17 @@ class ExplainXGBoost:
         # get feature names
         feature_names = self.model.get_booster().feature_names
 
+        self.plot_feature_importance(feature_names, importances, f'Results/{self.dataset_name}/XAI/XGBoost/feature_importance.png', max_features)
+        return
+
+    @staticmethod
+    def plot_feature_importance(feature_names, importances, path, max_features=15):
+        '''
+        Plots the bar graph of the max_features most important features and saves it to path.
+        '''
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
         feature_importance_df = pd.DataFrame({
             'Feature': feature_names,
             'Importance': importances
@@ -127,19 +92,21 @@ class ExplainXGBoost:
         # limit to top max_features
         feature_importance_df = feature_importance_df.head(max_features)
 
-        # plot the feature importances
-        plt.figure(figsize=(8, 4))
-        plt.barh(feature_importance_df['Feature'], feature_importance_df['Importance'], color='#7D50DD')
-        plt.xlabel('Importance')
-        plt.ylabel('Feature')
-        plt.title('Feature Importance')
-        plt.gca().invert_yaxis()
+        # plot the feature importances (on an Agg canvas, without the global state of pyplot)
+        fig = Figure(figsize=(8, 4))
+        FigureCanvasAgg(fig)
+        ax = fig.subplots()
+        ax.barh(feature_importance_df['Feature'], feature_importance_df['Importance'], color='#7D50DD')
+        ax.set_xlabel('Importance')
+        ax.set_ylabel('Feature')
+        ax.set_title('Feature Importance')
+        ax.invert_yaxis()
 
         # save the plot
-        plt.savefig(f'Results/{self.dataset_name}/XAI/XGBoost/feature_importance.png', dpi=300, bbox_inches='tight')
-        plt.close()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fig.savefig(path, dpi=300, bbox_inches='tight')
 
-        return
+        return path
 
 
 
@@ -0,0 +1,168 @@
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+import time
+import numpy as np
+import pandas as pd
+from ..preprocessing.feature_type_extractor import FeatureTypeExtractor
+
+
+def _model_input(rows, columns, categories, use_frame):
+    '''
+    Returns the rows (a float32 array, the category columns as their codes) in the form the model was trained on:
+    a DataFrame with the category columns restored if the model knows the names of its features, otherwise the array itself.
+    '''
+    if not use_frame:
+        return rows
+    frame = pd.DataFrame(rows, columns=columns, copy=False)
+    for position, column_categories in categories.items():
+        frame[columns[position]] = pd.Categorical.from_codes(rows[:, position].astype(int), categories=column_categories)
+    return frame
+
+
+def _score(metric, y, probabilities):
+    '''
+    Returns the metric (roc_auc, accuracy or f1, as the tuners compute them) of the predicted probabilities of the class 1.
+    '''
+    from sklearn.metrics import roc_auc_score, accuracy_score, f1_score
+
+    if metric == 'roc_auc':
+        return roc_auc_score(y, probabilities)
+    predictions = (probabilities > 0.5).astype(int)  # the class predicted by predict for the two classes
+    if metric == 'accuracy':
+        return accuracy_score(y, predictions)
+    return f1_score(y, predictions, average='weighted')
+
+
+def _permuted_scores(model, rows, y, groups, group_ids, n_repeats, metric, random_state, max_batch_rows, model_input):
+    '''
+    Runs in a worker process (or in the main one): returns the scores of the model on the rows with the columns of every group
+    permuted (n_groups x n_repeats). The permuted copies of the rows are written into one preallocated array, several groups
+    and repeats per prediction, only the columns of the group change in its copy and are restored after the prediction.
+    '''
+    n_rows = len(rows)
+    batch_size = max(1, min(max_batch_rows // n_rows, len(groups) * n_repeats))
+    batch = np.tile(rows, (batch_size, 1))  # preallocated once, the copies are reused by all the batches
+
+    tasks = []
+    for group, group_id in zip(groups, group_ids):
+        generator = np.random.default_rng([random_state, group_id])  # the same permutations for any split of the groups
+        tasks.extend((group, generator.permutation(n_rows)) for _ in range(n_repeats))
+
+    scores = np.empty(len(tasks))
+    for start in range(0, len(tasks), batch_size):
+        chunk = tasks[start:start + batch_size]
+        for k, (group, permutation) in enumerate(chunk):
+            batch[k * n_rows:(k + 1) * n_rows, group] = rows[permutation[:, None], group]
+        probabilities = model.predict_proba(_model_input(batch[:len(chunk) * n_rows], *model_input))[:, 1]
+        for k, (group, permutation) in enumerate(chunk):
+            scores[start + k] = _score(metric, y, probabilities[k * n_rows:(k + 1) * n_rows])
+            batch[k * n_rows:(k + 1) * n_rows, group] = rows[:, group]
+    return scores.reshape(len(groups), n_repeats)
+
+
+class PermutationImportance:
+    '''
+    Computes the permutation importance of the features for any fitted classifier with predict_proba (the best XGBoost,
+    Random Forest and Decision Tree models): the decrease of the metric when the values of a feature are shuffled between the rows.
+
+    The one-hot columns of a categorical feature are permuted together as one feature (see feature_groups), so its importance
+    is the one of the feature, not split between its categories. The prediction of the unchanged rows is computed once,
+    the permuted copies are predicted in batches of max_batch_rows rows, and the features are split between n_jobs worker processes
+    (spawned, so they are safe after the OpenMP threads of XGBoost ran in the main process; a script using n_jobs > 1 must be
+    guarded with if __name__ == '__main__', as for BatchRunner).
+    '''
+    def __init__(self, n_jobs=None, n_repeats=5, max_rows=5000, random_state=42, max_batch_rows=200000):
+        '''
+        Args:
+            - n_jobs - the number of worker processes, the number of CPUs if None, with 1 the features are permuted in the main process
+            - n_repeats - the number of permutations of every feature, the importance is their mean
+            - max_rows - the importance is computed on a seeded sample of max_rows rows of the data, on all of them if None
+            - random_state - the seed of the sample and of the permutations
+            - max_batch_rows - the number of rows predicted at once (the permuted copies of the rows of several features and repeats)
+        '''
+        self.n_jobs = n_jobs if n_jobs is not None else os.cpu_count()
+        self.n_repeats = n_repeats
+        self.max_rows = max_rows
+        self.random_state = random_state
+        self.max_batch_rows = max_batch_rows
+        self.runtime_s = None  # the wall time of the last call of importances
+
+    @staticmethod
+    def feature_groups(columns, encoded_features=None):
+        '''
+        Returns the features permuted together, feature -> its columns: the one-hot columns of every feature of encoded_features
+        (feature -> categories, e.g. decisions['one_hot_features'] of the preprocessing, the columns <feature>_<category> made by
+        FeatureTypeExtractor.one_hot_encode) and every other column alone, in the order of the columns.
+        '''
+        owners = {}
+        for feature, categories in (encoded_features or {}).items():
+            for category in categories:
+                owners.setdefault(f'{feature}_{category}', feature)
+
+        groups = {}
+        for column in columns:
+            feature = owners.get(column, column)
+            groups.setdefault(feature, []).append(column)
+        return groups
+
+    def sample(self, X, y):
+        '''
+        Returns the rows the importance is computed on (dense, as a float32 array with the category columns as their codes), their labels
+        and the categories of the category columns (position -> categories): all the rows, or a seeded sample of max_rows rows.
+        '''
+        positions = np.arange(len(X))
+        if self.max_rows is not None and len(X) > self.max_rows:
+            positions = np.sort(np.random.RandomState(self.random_state).choice(len(X), self.max_rows, replace=False))
+        X = FeatureTypeExtractor().to_dense(X.take(positions))
+
+        categories = {position: X[column].cat.categories for position, column in enumerate(X.columns)
+                      if isinstance(X[column].dtype, pd.CategoricalDtype)}
+        rows = np.empty(X.shape, dtype=np.float32)  # the trees of scikit-learn and XGBoost split on float32 values
+        for position, column in enumerate(X.columns):
+            rows[:, position] = X[column].cat.codes if position in categories else X[column]
+        return rows, np.asarray(y)[positions], categories
+
+    def importances(self, model, X, y, metric='roc_auc', groups=None):
+        '''
+        Returns the permutation importance of the features (a DataFrame sorted by importance): the feature, the number of its columns,
+        the mean and the standard deviation of the decrease of the metric over the n_repeats permutations.
+
+        Args:
+            - model - the fitted model, predict_proba gives the probability of the class 1
+            - X, y - the data the model is evaluated on (the columns it was trained on) and the labels
+            - metric - 'roc_auc', 'accuracy' or 'f1' (weighted), as the tuners
+            - groups - the features, feature -> its columns (see feature_groups), every column alone if None
+        '''
+        start = time.perf_counter()
+        groups = groups if groups is not None else {column: [column] for column in X.columns}
+        rows, labels, categories = self.sample(X, y)
+        # the model is given a DataFrame if it was trained on one (its feature names are checked), the category columns need one
+        model_input = (list(X.columns), categories, len(categories) > 0 or hasattr(model, 'feature_names_in_'))
+
+        baseline = _score(metric, labels, model.predict_proba(_model_input(rows, *model_input))[:, 1])  # predicted once
+        positions = {column: position for position, column in enumerate(X.columns)}
+        column_groups = [np.array([positions[column] for column in columns]) for columns in groups.values()]
+
+        parts = [part for part in np.array_split(np.arange(len(column_groups)), max(1, min(self.n_jobs, len(column_groups)))) if len(part) > 0]
+        arguments = [(model, rows, labels, [column_groups[i] for i in part], part.tolist(), self.n_repeats, metric, self.random_state,
+                      self.max_batch_rows, model_input) for part in parts]
+        if self.n_jobs <= 1 or len(parts) == 1:
+            scores = [_permuted_scores(*part_arguments) for part_arguments in arguments]
+        else:
+            from ..batch_runner import _start_worker
+
+            # spawned, not forked: a worker forked after the OpenMP threads of XGBoost ran in this process deadlocks in its first prediction;
+            # the threads of every worker are limited to its share of the CPUs
+            with ProcessPoolExecutor(max_workers=len(parts), mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=_start_worker, initargs=(max(1, (os.cpu_count() or 1) // len(parts)),)) as executor:
+                scores = list(executor.map(_permuted_scores, *zip(*arguments)))
+        decrease = baseline - np.concatenate(scores) if len(scores) > 0 else np.empty((0, self.n_repeats))
+
+        self.runtime_s = time.perf_counter() - start
+        return pd.DataFrame({
+            'feature': list(groups),
+            'columns': [len(columns) for columns in groups.values()],
+            'importance_mean': decrease.mean(axis=1),
+            'importance_std': decrease.std(axis=1),
+        }).sort_values('importance_mean', ascending=False, kind='stable').reset_index(drop=True)
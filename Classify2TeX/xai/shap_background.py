@@ -0,0 +1,188 @@
+import time
+import numpy as np
+import pandas as pd
+from ..preprocessing.feature_type_extractor import FeatureTypeExtractor
+
+
+class SHAPBackground:
+    '''
+    Summarizes the background data of interventional TreeSHAP into a few weighted points.
+
+    Interventional TreeSHAP explains a row against every row of the background and averages the results, so its cost grows
+    with the background, about linearly up to a hundred rows (shap.Explainer(model, sample) used 1000 rows of the data).
+    The background is replaced by n_points weighted points:
+    - kmeans - the centroids of the k-means clusters of the rows, weighted by the fraction of the rows in their cluster,
+      the values rounded to the nearest value of the column (as shap.kmeans), so one-hot and discrete columns keep valid values,
+    - stratified - the same number of clusters per class as its share of the rows, each represented by its row closest to the centroid,
+      so the background has the class balance of the data and only real rows.
+    The SHAP values are the weighted mean of the values against every point (see contributions), tradeoff measures the time
+    and the attribution error against a background of raw rows.
+    '''
+    METHODS = ['kmeans', 'stratified']
+    MAX_FIT_ROWS = 20000  # the clusters are fitted on a seeded sample of the rows, all the rows are assigned to them
+
+    def __init__(self, method='kmeans', n_points=32, random_state=42):
+        '''
+        Args:
+            - method - 'kmeans' (weighted centroids) or 'stratified' (weighted representative rows of every class)
+            - n_points - the number of points of the background
+            - random_state - the seed of the clustering and of the samples
+        '''
+        if method not in self.METHODS:
+            raise ValueError(f'method should be one of {self.METHODS}, got {method!r}.')
+        self.method = method
+        self.n_points = n_points
+        self.random_state = random_state
+
+    @staticmethod
+    def to_array(X):
+        '''
+        Returns the rows of X as a dense float array, as TreeSHAP reads them.
+        '''
+        return FeatureTypeExtractor().to_dense(X).to_numpy(dtype=float)
+
+    def summarize(self, X, y=None):
+        '''
+        Returns the summarized background of X: the points (a DataFrame with the columns of X) and their weights (summing to 1).
+        y (the labels of the rows) is needed by the stratified method.
+        '''
+        values = self.to_array(X)
+        if self.method == 'kmeans':
+            points, weights = self._clusters(values, min(self.n_points, len(values)), representatives=False)
+        else:
+            if y is None:
+                raise ValueError('The stratified background needs the labels of the rows.')
+            labels = np.asarray(y)
+            classes, counts = np.unique(labels, return_counts=True)
+            points, weights = [], []
+            for label, count in zip(classes, counts):
+                n_class_points = min(count, max(1, round(self.n_points * count / len(labels))))
+                class_points, class_weights = self._clusters(values[labels == label], n_class_points, representatives=True)
+                points.append(class_points)
+                weights.append(class_weights * count / len(labels))
+            points, weights = np.concatenate(points), np.concatenate(weights)
+        return pd.DataFrame(points, columns=X.columns), weights
+
+    def _clusters(self, values, n_clusters, representatives):
+        '''
+        Returns the points and the weights of the k-means clusters of the values: the centroids rounded to the values of their columns,
+        or the rows closest to the centroids if representatives is True.
+        '''
+        from sklearn.cluster import KMeans
+
+        scale = values.std(axis=0)
+        scale[scale == 0] = 1  # the columns are standardized, so the large ones do not decide the clusters alone
+        scaled = np.nan_to_num(values / scale)
+        generator = np.random.RandomState(self.random_state)
+        fit_rows = scaled[generator.choice(len(scaled), self.MAX_FIT_ROWS, replace=False)] if len(scaled) > self.MAX_FIT_ROWS else scaled
+        kmeans = KMeans(n_clusters=n_clusters, n_init=3, random_state=self.random_state).fit(fit_rows)
+        assignment = kmeans.predict(scaled)
+        sizes = np.bincount(assignment, minlength=n_clusters)
+
+        if representatives:
+            distances = ((scaled - kmeans.cluster_centers_[assignment]) ** 2).sum(axis=1)
+            order = np.lexsort((distances, assignment))  # by cluster, the closest row first
+            first = np.searchsorted(assignment[order], np.arange(n_clusters))
+            points = values[order[np.minimum(first, len(order) - 1)]]
+        else:
+            points = kmeans.cluster_centers_ * scale
+            for column in range(values.shape[1]):
+                column_values = np.unique(values[:, column][~np.isnan(values[:, column])])
+                if len(column_values) > 0:
+                    upper = np.minimum(np.searchsorted(column_values, points[:, column]), len(column_values) - 1)
+                    lower = np.maximum(upper - 1, 0)
+                    closer_lower = np.abs(points[:, column] - column_values[lower]) <= np.abs(column_values[upper] - points[:, column])
+                    points[:, column] = column_values[np.where(closer_lower, lower, upper)]
+
+        keep = sizes > 0  # a cluster of the sample can get no row of the data
+        return points[keep], sizes[keep] / sizes.sum()
+
+    @staticmethod
+    def contributions(model, data, points, weights=None):
+        '''
+        Returns the interventional TreeSHAP contributions of the features for the rows of data against the weighted background
+        (n_rows x (n_features + 1), the base value in the last column, as pred_contribs=True of XGBoost), in the raw output of the model
+        (the log-odds for XGBoost, the probability of the class 1 for scikit-learn trees). SHAP averages over the background without
+        weights, so every point is explained separately and the values are summed with their weights (the values against a background
+        are linear in it). Without weights, the points are one unweighted background.
+        '''
+        import shap
+
+        rows = SHAPBackground.to_array(data)
+        background = SHAPBackground.to_array(points)
+        explainer = shap.TreeExplainer(model, background, feature_perturbation='interventional')
+        if weights is None:
+            return SHAPBackground._with_base_value(explainer.shap_values(rows, check_additivity=False), explainer.expected_value)
+
+        contributions = np.zeros((len(rows), rows.shape[1] + 1))
+        for k, weight in enumerate(weights):
+            # the explainer reads its background when the values are computed, so the parsed trees are reused for every point
+            explainer.data, explainer.data_missing = background[k:k + 1], np.isnan(background[k:k + 1])
+            contributions += weight * SHAPBackground._with_base_value(explainer.shap_values(rows, check_additivity=False),
+                                                                      explainer.model.predict(background[k:k + 1]))
+        return contributions
+
+    @staticmethod
+    def _with_base_value(values, base_value):
+        '''
+        Returns the SHAP values of the class 1 (a list or the last axis of an array for scikit-learn models) with the base value
+        in the last column.
+        '''
+        values = values[1] if isinstance(values, list) else values[..., 1] if values.ndim == 3 else values
+        contributions = np.empty((len(values), values.shape[1] + 1))
+        contributions[:, :-1] = values
+        contributions[:, -1] = np.asarray(base_value).reshape(-1)[-1]
+        return contributions
+
+    def tradeoff(self, model, X, y, sizes=(8, 16, 32, 64), n_rows=200, reference_rows=1000):
+        '''
+        Returns the accuracy and the time of the summarized backgrounds (both methods, every size), of random samples of the rows
+        of the same sizes (as shap.sample) and of path-dependent TreeSHAP (no background), against a background of reference_rows raw rows of X (a DataFrame, one row per background): the time of
+        the summary and of explaining n_rows rows, and the agreement of the SHAP values of these rows with the reference ones
+        (the mean absolute error relative to the mean |SHAP value|, the rank correlation of the global importances, mean |SHAP value|,
+        and the overlap of the 10 most important features).
+        '''
+        import shap
+
+        generator = np.random.RandomState(self.random_state)
+        rows = X.take(generator.choice(len(X), min(n_rows, len(X)), replace=False))
+        reference_background = X.take(generator.choice(len(X), min(reference_rows, len(X)), replace=False))
+
+        start = time.perf_counter()
+        reference = self.contributions(model, rows, reference_background)[:, :-1]
+        reference_time = time.perf_counter() - start
+        reference_importance = pd.Series(np.abs(reference).mean(axis=0), index=X.columns)
+        top = min(10, len(X.columns))
+
+        def compare(background, points, summary_time, function):
+            start = time.perf_counter()
+            values = function()[:, :-1]
+            explain_time = time.perf_counter() - start
+            importance = pd.Series(np.abs(values).mean(axis=0), index=X.columns)
+            return {
+                'background': background,
+                'points': points,
+                'summary time [s]': summary_time,
+                'explain time [s]': explain_time,
+                'speedup': reference_time / explain_time,
+                'relative error': np.abs(values - reference).mean() / np.abs(reference).mean(),
+                'importance rank corr': importance.corr(reference_importance, method='spearman'),
+                'top 10 overlap': len(set(importance.nlargest(top).index) & set(reference_importance.nlargest(top).index)) / top,
+            }
+
+        results = [{'background': 'raw rows (reference)', 'points': len(reference_background), 'summary time [s]': 0.0,
+                    'explain time [s]': reference_time, 'speedup': 1.0, 'relative error': 0.0, 'importance rank corr': 1.0, 'top 10 overlap': 1.0}]
+        for size in sizes:
+            points = X.take(generator.choice(len(X), min(size, len(X)), replace=False))
+            results.append(compare('random rows', len(points), 0.0, lambda: self.contributions(model, rows, points)))
+        for method in self.METHODS:
+            for size in sizes:
+                summarizer = SHAPBackground(method, size, self.random_state)
+                start = time.perf_counter()
+                points, weights = summarizer.summarize(X, y)
+                summary_time = time.perf_counter() - start
+                results.append(compare(method, len(points), summary_time, lambda: self.contributions(model, rows, points, weights)))
+
+        path_dependent = lambda: self._with_base_value(shap.TreeExplainer(model).shap_values(self.to_array(rows), check_additivity=False), 0.0)
+        results.append(compare('path-dependent (no background)', 0, 0.0, path_dependent))
+        return pd.DataFrame(results)
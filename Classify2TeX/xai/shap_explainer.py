@@ -0,0 +1,216 @@
+import pandas as pd
+import numpy as np
+import glob
+import os
+from ..preprocessing.feature_type_extractor import FeatureTypeExtractor
+from ..report.artifact_manifest import ArtifactManifest
+
+
+class SHAPExplainer:
+    '''
+    The SHAP values of a tree model and their plots, shared by ExplainXGBoost, ExplainRandomForest and ExplainDecisionTree,
+    which compute the contributions of the features for their model (see contributions).
+
+    The SHAP values are computed once per model and rows of the data (see shap_values): all the SHAP plots and the views
+    by class describe the same rows, and reuse the values kept in memory and, if cache_directory is given, on disk.
+    '''
+    MODEL_NAME = None  # the folder of the model in Results/<dataset_name>/XAI
+
+    def __init__(self, model, cache_directory=None, random_state=42, max_rows=None):
+        '''
+        Args:
+            - model - the fitted model
+            - cache_directory - the SHAP values are saved there as shap_values_<key>.npy and loaded by the next runs while the model
+              and the data do not change, e.g. Results/<dataset_name>/XAI/<MODEL_NAME>/cache (if None, they are kept only in memory)
+            - random_state - the seed of the sample of the rows explained by SHAP, if max_rows is given
+            - max_rows - the SHAP values are computed for a random sample of max_rows rows of the data, if None all the rows are explained
+        '''
+        self.model = model
+        self.cache_directory = cache_directory
+        self.random_state = random_state
+        self.max_rows = max_rows
+        self._shap_cache = {}  # key of the model and the rows -> shap.Explanation
+
+    def contributions(self, data):
+        '''
+        This method returns the contributions of the features to the predictions for the rows of data (n_rows x (n_features + 1),
+        the base value in the last column, as pred_contribs=True of XGBoost).
+        '''
+        raise NotImplementedError
+
+    def explain(self, data):
+        '''
+        This method returns the SHAP values (shap.Explanation) of the model for the given data (see contributions),
+        the categories are shown by their codes.
+        '''
+        return self.to_explanation(self.contributions(data), data)
+
+    @staticmethod
+    def to_explanation(contributions, data):
+        '''
+        This method returns the shap.Explanation of the contributions (one row per row of data, one column per feature
+        and the base value in the last column, as pred_contribs=True), the categories of the data are shown by their codes.
+        '''
+        import shap
+
+        category_columns = [column for column in data.columns if isinstance(data[column].dtype, pd.CategoricalDtype)]
+        data_codes = data.assign(**{column: data[column].cat.codes for column in category_columns})
+
+        return shap.Explanation(
+            values=contributions[:, :-1],  # the last column is the bias term
+            base_values=contributions[:, -1],
+            data=data_codes.to_numpy(dtype=float),
+            feature_names=list(data.columns)
+        )
+
+    def model_fingerprint(self):
+        '''
+        This method returns what identifies the fitted model in the key of its SHAP values (the model itself, hashed by its pickle).
+        '''
+        return self.model
+
+    def shap_key(self, sample):
+        '''
+        This method returns the key of the SHAP values of the model for the sample (a hash of the model and of the sample).
+        '''
+        return ArtifactManifest(self.cache_directory or '.').key(self.model_fingerprint(), sample)
+
+    def shap_values(self, data):
+        '''
+        This method returns the SHAP values (shap.Explanation) of the rows of the data (all of them, or the seeded sample of max_rows rows,
+        see shap_sample), computed only the first time (see explain_cached).
+        '''
+        return self.explain_cached(self.shap_sample(data, random_state=self.random_state))
+
+    def explain_cached(self, sample):
+        '''
+        This method returns the SHAP values of the sample, as explain. They are computed once: kept in memory by the instance
+        and saved to <cache_directory>/shap_values_<key>.npy (the contributions with the base value in the last column),
+        which is loaded instead of computing them again while the model and the sample do not change.
+        '''
+        key = self.shap_key(sample)
+        if key in self._shap_cache:
+            return self._shap_cache[key]
+
+        path = os.path.join(self.cache_directory, f'shap_values_{key[:16]}.npy') if self.cache_directory is not None else None
+        if path is not None and os.path.exists(path):
+            contributions = np.load(path)
+        else:
+            contributions = self.contributions(sample)
+            if path is not None:
+                os.makedirs(self.cache_directory, exist_ok=True)
+                for stale_path in glob.glob(os.path.join(self.cache_directory, 'shap_values_*.npy')):
+                    os.remove(stale_path)  # the values of the previous models
+                np.save(path, contributions)
+
+        self._shap_cache[key] = self.to_explanation(contributions, sample)
+        return self._shap_cache[key]
+
+    def shap_sample(self, data, random_state=None):
+        '''
+        This method returns the rows of the data explained by SHAP (with dense columns, SHAP plots do not support sparse ones):
+        all of them, or a random sample of max_rows rows. The same random_state gives the same sample.
+        '''
+        return FeatureTypeExtractor().to_dense(data.take(self.sample_positions(len(data), random_state)))
+
+    def sample_positions(self, n_rows, random_state=None):
+        '''
+        This method returns the positions of the rows of shap_sample (the rows drawn by DataFrame.sample if there are more than max_rows).
+        '''
+        if self.max_rows is not None and n_rows > self.max_rows:
+            return np.random.RandomState(random_state).choice(n_rows, self.max_rows, replace=False)
+        return np.arange(n_rows)
+
+    def explain_sample(self, data, random_state=None):
+        '''
+        This method returns the SHAP values of the rows of the data explained by SHAP (see shap_sample),
+        the ones of the instance's random_state if random_state is None (computed once, see shap_values).
+        '''
+        if random_state is None or random_state == self.random_state:
+            return self.shap_values(data)
+        return self.explain(self.shap_sample(data, random_state))
+
+    def save_global_feature_importance_shap(self, data, dataset_name):
+        '''
+        This method returns the global feature importance using SHAP library and plots the bar graph.
+        It takes the data on which the importance is calculated.
+        '''
+        self.dataset_name = dataset_name    
+        shap_values = self.shap_values(data)  # the same values as the violin plot
+        self.plot_global_feature_importance_shap(shap_values, f'Results/{self.dataset_name}/XAI/{self.MODEL_NAME}/global_feature_importance_shap.png')
+        return 
+
+    @staticmethod
+    def plot_global_feature_importance_shap(shap_values, path):
+        '''
+        This method plots the bar graph of the global feature importance from the SHAP values and saves it to path.
+        It draws with pyplot (SHAP plots do not take axes), so in the main process it uses the global pyplot figure,
+        and it can run as a job of FigureRenderer.
+        '''
+        import shap
+        import matplotlib.pyplot as plt
+
+        # Create SHAP bar plot
+        shap_plot = shap.plots.bar(shap_values, max_display=15, show=False)
+
+        # Save the plot
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        plt.savefig(path, dpi=300, bbox_inches='tight')
+        plt.close()
+
+        return path
+    
+    def show_feature_importance_by_classes_shap(self, X, y):
+        '''
+        This method returns the feature importance by classes using SHAP library and plots the bar graph.
+        It takes the data on which the importance is calculated. The SHAP values of the sample of the data (see shap_values),
+        the same as in the other SHAP plots, are split by the class of the rows.
+        '''
+        import shap
+        import matplotlib.pyplot as plt
+
+        shap_values = self.shap_values(X)
+        labels = np.asarray(y)[self.sample_positions(len(X), self.random_state)]
+
+        shap_values_1 = shap_values[labels == 1]
+
+        shap_values_2 = shap_values[labels == 0]
+         
+        # change titles and display plots, change color
+        print("Feature Importance for Class 1 using SHAP")
+        shap.plots.bar(shap_values_1, max_display=10)
+
+        print("Feature Importance for Class 0 using SHAP")
+        shap.plots.bar(shap_values_2, max_display=10)
+
+        plt.show()
+
+        return
+        
+    def save_violin_summary_plot_shap(self, data, dataset_name):
+        '''
+        This method returns the summary plot using SHAP library and plots the violin plot.
+        It takes the data on which the violin plot is plotted.
+        '''
+        self.dataset_name = dataset_name
+        shap_values = self.shap_values(data)  # the same values as the bar plot
+        self.plot_violin_summary_shap(shap_values, f'Results/{self.dataset_name}/XAI/{self.MODEL_NAME}/violin_summary_plot_shap.png')
+        return
+
+    @staticmethod
+    def plot_violin_summary_shap(shap_values, path):
+        '''
+        This method plots the violin summary plot of the SHAP values and saves it to path (with pyplot, as plot_global_feature_importance_shap).
+        '''
+        import shap
+        import matplotlib.pyplot as plt
+
+        # Create SHAP violin plot
+        shap_plot = shap.plots.violin(shap_values, max_display=15, show=False)
+
+        # Save the plot
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        plt.savefig(path, dpi=300, bbox_inches='tight')
+        plt.close()
+
+        return path
@@ -0,0 +1,57 @@
+'''
+Compares XGBoost trained on one-hot/label encoded categorical features with XGBoost handling them natively
+(category dtype, enable_categorical=True) on the bundled datasets. Both modes use tree_method='hist' (needed by the native
+categorical support), so the only difference between them is how the categorical features are handled.
+
+Usage (from the repository root):
+    python -m benchmarks.compare_categorical_modes [n_iter]
+'''
+import sys
+import time
+import warnings
+import contextlib
+import io
+import pandas as pd
+from Classify2TeX.preprocessing.data_preprocessor import DataPreprocessor
+from Classify2TeX.optimization.models.xgboost_random_search import XGBoostRandomSearch
+
+DATASETS = {
+    'Titanic': ('datasets/titanic_data.csv', 'Survived'),
+    'PlacementData': ('datasets/Placement_Data_Full_Class.csv', 'status'),
+    'Customers': ('datasets/customers.csv', 'Target'),
+    'AustraliaWeather': ('datasets/weatherAUS.csv', 'RainTomorrow'),
+}
+
+
+def run_mode(dataframe, target_column_name, native_categorical, n_iter):
+    '''
+    Preprocesses the dataset in the given mode and runs the XGBoost random search, returns the timings and the best metrics.
+    '''
+    with contextlib.redirect_stdout(io.StringIO()):  # silence the preprocessing and tuning logs
+        preprocessed_data = DataPreprocessor(dataframe, target_column_name, native_categorical=native_categorical).preprocess()
+        tuner = XGBoostRandomSearch(preprocessed_data, n_iter=n_iter, cv=5, random_state=42, n_repeats=1, enable_categorical=native_categorical,
+                                    tree_method='hist')
+        start = time.perf_counter()
+        results, _ = tuner.get_results()
+        fit_time = time.perf_counter() - start
+
+    best = results.loc[results['roc_auc'].idxmax()]
+    return {
+        'mode': 'native' if native_categorical else 'one-hot',
+        'n_columns': preprocessed_data.shape[1] - 1,
+        'fit_time_s': round(fit_time, 2),
+        'roc_auc': round(best['roc_auc'], 4),
+        'f1': round(best['f1'], 4),
+        'accuracy': round(best['accuracy'], 4),
+    }
+
+
+if __name__ == '__main__':
+    warnings.filterwarnings('ignore')
+    n_iter = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    rows = []
+    for dataset_name, (path, target_column_name) in DATASETS.items():
+        dataframe = pd.read_csv(path)
+        for native_categorical in [False, True]:
+            rows.append({'dataset': dataset_name, **run_mode(dataframe, target_column_name, native_categorical, n_iter)})
+    print(pd.DataFrame(rows).to_string(index=False))
@@ -0,0 +1,54 @@
+'''
+Measures how long importing the modules of Classify2TeX takes, each in a fresh interpreter (the median of a few runs),
+and which heavy dependencies they load. Importing Classify2TeX should stay within the budget and load none of HEAVY_MODULES,
+they are imported when the preprocessing, the tuning, the report or the XAI need them.
+Exits with status 1 if the budget is exceeded or a heavy dependency is loaded by the import.
+
+Usage (from the repository root):
+    python -m benchmarks.import_time [budget_s] [n_runs]
+'''
+import statistics
+import subprocess
+import sys
+import pandas as pd
+
+BUDGET_S = 1.0  # for importing Classify2TeX, pandas alone takes about 0.3 s
+HEAVY_MODULES = ['sklearn', 'xgboost', 'shap', 'dtreeviz', 'pylatex', 'seaborn', 'matplotlib', 'imblearn', 'scipy']
+MODULES = [
+    'Classify2TeX.classify_2_tex',
+    'Classify2TeX.batch_runner',
+    'Classify2TeX.preprocessing.preprocessing_pipeline',
+    'Classify2TeX.report.report_generator',
+]
+MEASURE = '''
+import sys, time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+print(' '.join(module for module in {heavy!r} if module in sys.modules))
+'''
+
+
+def measure(module, n_runs):
+    '''
+    Returns the median import time of the module in n_runs fresh interpreters and the heavy dependencies it loads.
+    '''
+    times = []
+    for _ in range(n_runs):
+        output = subprocess.run([sys.executable, '-c', MEASURE.format(module=module, heavy=HEAVY_MODULES)],
+                                capture_output=True, text=True, check=True).stdout.splitlines()
+        times.append(float(output[0]))
+    return {'module': module, 'import_time_s': round(statistics.median(times), 3), 'heavy_modules_loaded': output[1] if len(output) > 1 else ''}
+
+
+if __name__ == '__main__':
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else BUDGET_S
+    n_runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    results = pd.DataFrame([measure(module, n_runs) for module in MODULES])
+    print(results.to_string(index=False))
+
+    package = results.iloc[0]
+    within_budget = package['import_time_s'] <= budget and package['heavy_modules_loaded'] == ''
+    print(f"\nimport {package['module']}: {package['import_time_s']} s (budget {budget} s), "
+          f"heavy dependencies loaded: {package['heavy_modules_loaded'] or 'none'} -> {'OK' if within_budget else 'OVER BUDGET'}")
+    sys.exit(0 if within_budget else 1)
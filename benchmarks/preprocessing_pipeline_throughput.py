@@ -0,0 +1,47 @@
+'''
+Measures how many rows per second the fitted PreprocessingPipeline transforms on the bundled datasets
+(each dataset is repeated to about n_rows rows, the pipeline is fitted on the original dataset).
+
+Usage (from the repository root):
+    python -m benchmarks.preprocessing_pipeline_throughput [n_rows]
+'''
+import sys
+import time
+import warnings
+import contextlib
+import io
+import pandas as pd
+from Classify2TeX.preprocessing.preprocessing_pipeline import PreprocessingPipeline
+from benchmarks.compare_categorical_modes import DATASETS
+
+
+def run_mode(dataframe, target_column_name, settings, n_rows):
+    '''
+    Fits the pipeline with the given settings and returns the transform time and throughput on a batch of about n_rows rows.
+    '''
+    with contextlib.redirect_stdout(io.StringIO()):  # silence the preprocessing logs
+        pipeline = PreprocessingPipeline(**settings).fit(dataframe, target_column_name)
+
+    batch = pd.concat([dataframe] * max(1, n_rows // len(dataframe)), ignore_index=True)
+    start = time.perf_counter()
+    X = pipeline.transform(batch)
+    transform_time = time.perf_counter() - start
+
+    return {
+        'mode': ', '.join(settings) if settings else 'default',
+        'n_rows': len(batch),
+        'n_columns': X.shape[1],
+        'transform_time_s': round(transform_time, 3),
+        'rows_per_s': int(len(batch) / transform_time),
+    }
+
+
+if __name__ == '__main__':
+    warnings.filterwarnings('ignore')
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    rows = []
+    for dataset_name, (path, target_column_name) in DATASETS.items():
+        dataframe = pd.read_csv(path)
+        for settings in [{}, {'sparse_one_hot': True}, {'native_categorical': True}]:
+            rows.append({'dataset': dataset_name, **run_mode(dataframe, target_column_name, settings, n_rows)})
+    print(pd.DataFrame(rows).to_string(index=False))
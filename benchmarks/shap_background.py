@@ -0,0 +1,37 @@
+'''
+Compares the summarized SHAP backgrounds of SHAPBackground (weighted k-means centroids and weighted representative rows of every class)
+with random samples of the rows and with path-dependent TreeSHAP (no background) for an XGBoost model fitted on every bundled dataset:
+the time of the summary and of explaining 200 rows, and the agreement of their interventional SHAP values with the ones against
+a background of 1000 raw rows (the background of the previous ExplainXGBoost), see SHAPBackground.tradeoff.
+
+Usage (from the repository root):
+    python -m benchmarks.shap_background [n_points ...]
+'''
+import sys
+import warnings
+import contextlib
+import io
+import pandas as pd
+from xgboost import XGBClassifier
+from Classify2TeX.preprocessing.data_preprocessor import DataPreprocessor
+from Classify2TeX.xai.shap_background import SHAPBackground
+from benchmarks.compare_categorical_modes import DATASETS
+
+
+def run(dataframe, target_column_name, sizes):
+    '''
+    Fits XGBoost on the preprocessed dataset and returns the trade-off table of its SHAP backgrounds.
+    '''
+    with contextlib.redirect_stdout(io.StringIO()):  # silence the preprocessing logs
+        preprocessed_data = DataPreprocessor(dataframe, target_column_name).preprocess()
+    X, y = preprocessed_data.drop(columns=['target']), preprocessed_data['target']
+    model = XGBClassifier(random_state=42).fit(X, y)
+    return SHAPBackground(random_state=42).tradeoff(model, X, y, sizes=sizes)
+
+
+if __name__ == '__main__':
+    warnings.filterwarnings('ignore')
+    sizes = [int(size) for size in sys.argv[1:]] or [8, 16, 32, 64]
+    for dataset_name, (path, target_column_name) in DATASETS.items():
+        print(f'\n{dataset_name}')
+        print(run(pd.read_csv(path), target_column_name, sizes).round(3).to_string(index=False))
@@ -0,0 +1,99 @@
+'''
+Compares the SHAP values of XGBoost computed by SHAP library (shap.Explainer on a sample of 1000 rows, the previous path of ExplainXGBoost)
+with the TreeSHAP contributions computed by the booster (pred_contribs=True, ExplainXGBoost.contributions) on the bundled datasets,
+each repeated to about n_rows rows.
+
+For the same rows, the booster's contributions are the values of shap.TreeExplainer(model) (tree_path_dependent): the table shows
+their largest difference and whether the SHAP bar and violin plots drawn from both are identical images. The old path
+(interventional TreeSHAP with the sample as background) gives slightly different values, the table shows the rank correlation
+of the global importances (mean |SHAP value|) and the overlap of the 15 most important features.
+
+Usage (from the repository root):
+    python -m benchmarks.xgboost_shap_contributions [n_rows]
+'''
+import sys
+import os
+import time
+import warnings
+import contextlib
+import io
+import tempfile
+import numpy as np
+import pandas as pd
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.image
+import shap
+from xgboost import XGBClassifier
+from Classify2TeX.preprocessing.data_preprocessor import DataPreprocessor
+from Classify2TeX.preprocessing.feature_type_extractor import FeatureTypeExtractor
+from Classify2TeX.xai.explain_xgboost import ExplainXGBoost
+from benchmarks.compare_categorical_modes import DATASETS
+
+
+def timed(function, *args):
+    '''
+    Returns the result of the function and its wall time in seconds.
+    '''
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def same_plots(first, second):
+    '''
+    Returns True if the SHAP bar plots and the violin plots of both explanations are identical images.
+    '''
+    with tempfile.TemporaryDirectory() as directory:
+        for plot in [ExplainXGBoost.plot_global_feature_importance_shap, ExplainXGBoost.plot_violin_summary_shap]:
+            images = []
+            for i, explanation in enumerate([first, second]):
+                np.random.seed(0)  # the violin plot jitters the points
+                images.append(matplotlib.image.imread(plot(explanation, os.path.join(directory, f'{i}.png'))))
+            if images[0].shape != images[1].shape or not np.array_equal(images[0], images[1]):
+                return False
+    return True
+
+
+def run(dataframe, target_column_name, n_rows):
+    '''
+    Fits XGBoost on the preprocessed dataset and compares the SHAP paths, returns the timings and the agreement of the values.
+    '''
+    with contextlib.redirect_stdout(io.StringIO()):  # silence the preprocessing logs
+        preprocessed_data = DataPreprocessor(dataframe, target_column_name).preprocess()
+    X = FeatureTypeExtractor().to_dense(preprocessed_data.drop(columns=['target']))
+    model = XGBClassifier(random_state=42).fit(X, preprocessed_data['target'])
+    X_large = pd.concat([X] * max(1, n_rows // len(X)), ignore_index=True)
+
+    sampled = ExplainXGBoost(model, random_state=42, max_rows=1000)
+    sample = sampled.shap_sample(X_large, random_state=42)
+    old, old_time = timed(lambda: shap.Explainer(model, sample)(sample))
+    tree, tree_time = timed(lambda: shap.TreeExplainer(model)(sample))
+    native, native_time = timed(sampled.explain, sample)
+    native_all, native_all_time = timed(ExplainXGBoost(model).explain, X_large)
+
+    importance_old = pd.Series(np.abs(old.values).mean(axis=0), index=X.columns)
+    importance_all = pd.Series(np.abs(native_all.values).mean(axis=0), index=X.columns)
+    top = min(15, len(X.columns))
+    return {
+        'n_rows': len(X_large),
+        'n_columns': X.shape[1],
+        'shap_explainer_1000_s': round(old_time, 3),
+        'shap_tree_1000_s': round(tree_time, 3),
+        'native_1000_s': round(native_time, 3),
+        'native_all_rows_s': round(native_all_time, 3),
+        'native_rows_per_s': int(len(X_large) / native_all_time),
+        'max_abs_diff_vs_tree': float(np.abs(native.values - tree.values).max()),
+        'identical_plots_vs_tree': same_plots(native, tree),
+        'importance_rank_corr_vs_old': round(importance_old.corr(importance_all, method='spearman'), 3),
+        'top_features_overlap_vs_old': f'{len(set(importance_old.nlargest(top).index) & set(importance_all.nlargest(top).index))}/{top}',
+    }
+
+
+if __name__ == '__main__':
+    warnings.filterwarnings('ignore')
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    rows = []
+    for dataset_name, (path, target_column_name) in DATASETS.items():
+        rows.append({'dataset': dataset_name, **run(pd.read_csv(path), target_column_name, n_rows)})
+    print(pd.DataFrame(rows).T.to_string(header=False))
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+import pytest
+from Classify2TeX.report.eda_statistics import EDAStatistics
+
+
+def streamed_data():
+    # the later rows widen the range of the first ones, so the fine bins are widened while the data is streamed
+    rng = np.random.default_rng(0)
+    integers = np.concatenate([rng.integers(0, 3, 1000), rng.integers(0, 100, 3000)]).astype(np.float64)
+    integers[::7] = np.nan
+    return pd.DataFrame({
+        'integers': integers,
+        'floats': np.concatenate([rng.normal(size=1000), rng.normal(5, 10, 3000)]),
+        'constant': np.full(4000, 3.0),
+    })
+
+
+@pytest.mark.parametrize('chunk_size', [50, 333, 4000])
+def test_discrete_histogram_matches_numpy(chunk_size):
+    data = streamed_data()
+    statistics = EDAStatistics(chunk_size=chunk_size).fit(data)
+    for column in ['integers', 'constant']:
+        counts, edges = statistics.histogram(column)
+        expected_counts, expected_edges = np.histogram(data[column].dropna(), bins=statistics.bins)
+        np.testing.assert_array_equal(counts, expected_counts)
+        np.testing.assert_allclose(edges, expected_edges)
+
+
+@pytest.mark.parametrize('chunk_size', [50, 333, 4000])
+def test_continuous_histogram_close_to_numpy(chunk_size):
+    data = streamed_data()
+    statistics = EDAStatistics(chunk_size=chunk_size).fit(data)
+    counts, _ = statistics.histogram('floats')
+    expected_counts, _ = np.histogram(data['floats'], bins=statistics.bins)
+    assert counts.sum() == pytest.approx(len(data))
+    # only the values in the fine bins straddling an edge can be counted in the neighbouring bin
+    assert np.abs(counts - expected_counts).max() <= 0.001 * len(data)
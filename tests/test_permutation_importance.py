@@ -0,0 +1,34 @@
+import os
+import pathlib
+import subprocess
+import sys
+import textwrap
+
+# the OpenMP threads of XGBoost run in the main process before the worker processes are started; it runs in a subprocess,
+# so a deadlock of the workers fails the test with a timeout instead of hanging the test run
+SCRIPT = textwrap.dedent('''
+    import numpy as np
+    import pandas as pd
+    from xgboost import XGBClassifier
+    from Classify2TeX.xai.permutation_importance import PermutationImportance
+
+    if __name__ == '__main__':
+        rng = np.random.default_rng(0)
+        X = pd.DataFrame(rng.normal(size=(2000, 6)), columns=list('abcdef'))
+        y = (X['a'] + X['b'] > 0).astype(int)
+        model = XGBClassifier(n_jobs=2, n_estimators=20, random_state=42).fit(X, y)
+        model.predict_proba(X)
+
+        parallel = PermutationImportance(n_jobs=2).importances(model, X, y)
+        sequential = PermutationImportance(n_jobs=1).importances(model, X, y)
+        pd.testing.assert_frame_equal(parallel, sequential)
+        assert set(parallel['feature'].head(2)) == {'a', 'b'}
+''')
+
+
+def test_worker_processes_after_multithreaded_xgboost(tmp_path):
+    script = tmp_path / 'permutation_importance_workers.py'
+    script.write_text(SCRIPT)
+    result = subprocess.run([sys.executable, str(script)], capture_output=True, text=True, timeout=180,
+                            env={**os.environ, 'PYTHONPATH': str(pathlib.Path(__file__).resolve().parents[1])})
+    assert result.returncode == 0, result.stderr
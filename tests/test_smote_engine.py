@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+from Classify2TeX.preprocessing.smote_engine import SMOTEEngine
+
+
+def imbalanced_data(n_majority=200, n_minority=20):
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({'a': rng.normal(size=n_majority + n_minority), 'b': rng.integers(0, 5, n_majority + n_minority)})
+    y = pd.Series([0] * n_majority + [1] * n_minority, name='target')
+    return X, y
+
+
+@pytest.mark.parametrize('max_index_size', [1, 2, 3, 5])
+def test_index_not_larger_than_k_neighbors(max_index_size):
+    X, y = imbalanced_data()
+    X_resampled, y_resampled = SMOTEEngine(k_neighbors=5, max_index_size=max_index_size).fit_resample(X, y)
+    assert (y_resampled == 1).sum() == (y_resampled == 0).sum()
+    assert X_resampled.dtypes.equals(X.dtypes)
+
+
+def test_minority_smaller_than_k_neighbors():
+    X, y = imbalanced_data(n_minority=3)
+    X_resampled, y_resampled = SMOTEEngine(k_neighbors=5).fit_resample(X, y)
+    assert (y_resampled == 1).sum() == (y_resampled == 0).sum()
+
+
+def test_default_seed_is_reproducible():
+    X, y = imbalanced_data()
+    first, _ = SMOTEEngine(max_index_size=10).fit_resample(X, y)
+    second, _ = SMOTEEngine(max_index_size=10).fit_resample(X, y)
+    pd.testing.assert_frame_equal(first, second)
+
+
+def test_preprocessing_passes_the_smote_settings(monkeypatch):
+    from Classify2TeX.preprocessing.data_preprocessor import DataPreprocessor
+
+    engines = []
+    fit_resample = SMOTEEngine.fit_resample
+    monkeypatch.setattr(SMOTEEngine, 'fit_resample', lambda self, X, y: engines.append(self) or fit_resample(self, X, y))
+    X, y = imbalanced_data(n_majority=400, n_minority=20)  # extremely imbalanced, so SMOTE is applied
+    preprocessed_data = DataPreprocessor(X.assign(target=y), 'target', smote_n_jobs=2, smote_max_index_size=10).preprocess()
+
+    assert [(engine.n_jobs, engine.max_index_size) for engine in engines] == [(2, 10)]
+    assert (preprocessed_data['target'] == 1).sum() == (preprocessed_data['target'] == 0).sum()
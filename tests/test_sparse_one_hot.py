@@ -0,0 +1,40 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from Classify2TeX.classify_2_tex import Classify2TeX
+from Classify2TeX.preprocessing.feature_type_extractor import FeatureTypeExtractor
+from Classify2TeX.optimization.models.xgboost_random_search import XGBoostRandomSearch
+
+DATASETS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'datasets')
+
+
+@pytest.fixture(scope='module')
+def titanic_sparse():
+    dataframe = pd.read_csv(os.path.join(DATASETS, 'titanic_data.csv'))
+    classify = Classify2TeX(dataframe, 'Survived', n_iter=[0, 0, 0], cv=2, sparse_one_hot=True, figure_workers=0)
+    classify.perform_model_selection()
+    return dataframe, classify
+
+
+def test_sparse_one_hot_columns_are_used(titanic_sparse):
+    _, classify = titanic_sparse
+    assert FeatureTypeExtractor().has_sparse_columns(classify.optimizer.X)
+
+
+def test_xgboost_scores_new_data_as_its_training_input(titanic_sparse):
+    # XGBoost reads the zeros missing from a CSR matrix as missing values, it must be trained on the rows it is given later
+    dataframe, classify = titanic_sparse
+    model = classify.optimizer.best_xgb_instance
+    training_input = XGBoostRandomSearch(classify.optimizer.dataset).X  # the features as the tuner gives them to XGBoost
+    scored = classify.preprocessing_pipeline.transform(dataframe.drop(columns=['Survived']))
+    np.testing.assert_allclose(model.predict_proba(scored)[:, 1], model.predict_proba(training_input)[:, 1], rtol=0, atol=1e-6)
+
+
+def test_scikit_learn_models_read_the_csr_zeros_as_zeros(titanic_sparse):
+    _, classify = titanic_sparse
+    feature_type_extractor = FeatureTypeExtractor()
+    X = classify.optimizer.X_train_encoded
+    for model in [classify.optimizer.best_rf_instance, classify.optimizer.best_dt_instance]:
+        np.testing.assert_array_equal(model.predict_proba(feature_type_extractor.to_model_input(X)),
+                                      model.predict_proba(feature_type_extractor.to_dense(X)))